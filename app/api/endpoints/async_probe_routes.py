@@ -0,0 +1,126 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.schemas import (
+    ProbeLaunchRequest, ProbeMoveRequest, ProbeResponse, AllProbesResponse,
+    ProbeBulkLaunchRequest, ProbeBulkLaunchResponse,
+    ProbeBatchMoveRequest, ProbeBatchMoveResponse, ProbeBatchMoveResult,
+)
+from app.api.serialization import NDJSON_MEDIA_TYPE, probe_to_ndjson
+from app.domain.models import Probe
+from app.services.async_probe_service import AsyncProbeService
+from app.services.command_executor import CommandPoolBusyError
+from app.services.probe_service import LaunchSpec, ProbeNotFoundError, InvalidCommandError, ProbeConflictError
+from .dependencies import get_async_probe_service
+from .probe_routes import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, pool_busy
+
+# Mesmas rotas de probe_routes, mas como `async def`: não ocupam o threadpool do FastAPI.
+router = APIRouter()
+
+def _to_response(probe: Probe) -> ProbeResponse:
+    return ProbeResponse(
+        id=probe.id,
+        x=probe.position.x,
+        y=probe.position.y,
+        direction=probe.current_direction
+    )
+
+@router.post("/probes", response_model=ProbeResponse, status_code=status.HTTP_201_CREATED)
+async def launch_probe(request: ProbeLaunchRequest, service: AsyncProbeService = Depends(get_async_probe_service)):
+    try:
+        probe = await service.launch_probe(
+            max_x=request.x,
+            max_y=request.y,
+            direction_str=request.direction.value,
+            plateau=request.plateau,
+            x=request.start_x,
+            y=request.start_y
+        )
+        return _to_response(probe)
+    except InvalidCommandError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/probes/launch:batch", response_model=ProbeBulkLaunchResponse, status_code=status.HTTP_201_CREATED)
+async def launch_probes_batch(request: ProbeBulkLaunchRequest, service: AsyncProbeService = Depends(get_async_probe_service)):
+    try:
+        ids = await service.launch_probes(
+            [LaunchSpec(item.x, item.y, item.direction.value, item.plateau, item.start_x, item.start_y)
+             for item in request.probes]
+        )
+        return ProbeBulkLaunchResponse(ids=ids)
+    except InvalidCommandError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/probes/{probe_id}/move", response_model=ProbeResponse)
+async def move_probe(
+    probe_id: str,
+    request: ProbeMoveRequest,
+    service: AsyncProbeService = Depends(get_async_probe_service)
+):
+    try:
+        probe = await service.move_probe(probe_id, request.commands)
+        return _to_response(probe)
+    except ProbeNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InvalidCommandError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ProbeConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except CommandPoolBusyError as e:
+        raise pool_busy(e)
+
+@router.post("/probes/move:batch", response_model=ProbeBatchMoveResponse)
+async def move_probes_batch(request: ProbeBatchMoveRequest, service: AsyncProbeService = Depends(get_async_probe_service)):
+    try:
+        report = await service.move_probes_batch(
+            [(item.probe_id, item.commands) for item in request.items],
+            atomic=request.atomic
+        )
+    except InvalidCommandError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ProbeConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except CommandPoolBusyError as e:
+        raise pool_busy(e)
+    results = [
+        ProbeBatchMoveResult(
+            probe_id=r.probe_id,
+            success=r.success,
+            probe=ProbeResponse(
+                id=r.probe_id,
+                x=r.position.x,
+                y=r.position.y,
+                direction=r.direction
+            ) if r.success else None,
+            error=r.error
+        ) for r in report.results
+    ]
+    return ProbeBatchMoveResponse(committed=report.committed, results=results)
+
+@router.get("/probes", response_model=AllProbesResponse)
+async def get_all_probes(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    after: Optional[str] = Query(None, description="Retorna apenas sondas com ID maior que este (valor de `next_after`)"),
+    format: Literal["json", "ndjson"] = Query("json", description="`ndjson` transmite uma sonda por linha"),
+    service: AsyncProbeService = Depends(get_async_probe_service)
+):
+    paginated = limit is not None or after is not None
+    if format == "ndjson" and not paginated:
+        async def lines():
+            async for probe in service.iter_probes():
+                yield probe_to_ndjson(probe)
+        return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    if paginated:
+        limit = limit or DEFAULT_PAGE_SIZE
+        probes = await service.get_probes_page(limit, after)
+    else:
+        probes = await service.get_all_probes()
+
+    if format == "ndjson":
+        return StreamingResponse((probe_to_ndjson(p) for p in probes), media_type=NDJSON_MEDIA_TYPE)
+
+    next_after = probes[-1].id if paginated and len(probes) == limit else None
+    return AllProbesResponse(probes=[_to_response(p) for p in probes], next_after=next_after)
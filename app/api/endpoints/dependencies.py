@@ -1,11 +1,246 @@
+import time
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.events import events
+from app.core.metrics import Sample, metrics
 from app.services.probe_service import ProbeService
+from app.services.command_executor import CommandExecutor
+from app.services.move_coalescer import MoveCoalescer
+from app.services.plateau_registry import PlateauRegistry
+from app.services.telemetry import TelemetryHub
+from app.services.probe_json_cache import ProbeJsonCache
+from app.services.spatial_index import SpatialIndex
+from app.api.serialization import view_to_json_bytes
+from app.services.async_probe_service import AsyncProbeService
+from app.repositories.caching_probe_repository import CachingProbeRepository
+from app.repositories.instrumented_probe_repository import InstrumentedProbeReadModel, InstrumentedProbeRepository
+from app.repositories.mmap_probe_repository import MmapProbeRepository
+from app.repositories.probe_read_model import IProbeReadModel, ProbeView
+from app.repositories.probe_repository import IProbeRepository
+from app.repositories.sharded_probe_read_model import ShardedProbeReadModel
+from app.repositories.sharded_probe_repository import ShardedProbeRepository
+from app.repositories.sqlalchemy_probe_read_model import SQLAlchemyProbeReadModel
 from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
-from app.database import SessionLocal
+from app.repositories.sqlalchemy_trajectory_repository import SQLAlchemyTrajectoryRepository
+from app.repositories.trajectory_repository import ITrajectoryRepository
+from app.repositories.async_sqlalchemy_probe_repository import AsyncSQLAlchemyProbeRepository
+from app.repositories.database_models import prepare_schema
+from app.database import (
+    get_async_session_factory, get_engine, get_session_factory, get_shard_engines, get_shard_session_factories
+)
+
+# Os objetos compartilhados são criados na primeira chamada, e não na importação deste
+# módulo; o lifespan da aplicação chama initialize() antes de aceitar requisições.
+@lru_cache(maxsize=None)
+def get_probe_repository() -> IProbeRepository:
+    probe_repo: IProbeRepository
+    if settings.repository_backend == "mmap":
+        return MmapProbeRepository(settings.mmap_path)
+    if settings.shard_count > 1:
+        probe_repo = ShardedProbeRepository(list(get_shard_session_factories()))
+    else:
+        probe_repo = SQLAlchemyProbeRepository(db_session_factory=get_session_factory())
+    if settings.cache_enabled:
+        # Com métricas, os flushes do cache também são medidos, com o backend do banco.
+        probe_repo = CachingProbeRepository(
+            InstrumentedProbeRepository(probe_repo) if metrics.enabled else probe_repo,
+            max_entries=settings.cache_max_entries,
+            flush_interval=settings.cache_flush_interval,
+            flush_threshold=settings.cache_flush_threshold,
+            max_dirty=settings.cache_max_dirty,
+        )
+    return probe_repo
+
+@lru_cache(maxsize=None)
+def get_trajectory_repository() -> Optional[ITrajectoryRepository]:
+    if not settings.trajectory_enabled:
+        return None
+    return SQLAlchemyTrajectoryRepository(
+        db_session_factory=get_session_factory(), flush_threshold=settings.trajectory_flush_threshold
+    )
+
+@lru_cache(maxsize=None)
+def get_probe_read_model() -> Optional[IProbeReadModel]:
+    """Leituras direto do banco só quando ele tem o estado mais recente (sem cache write-behind na frente)."""
+    probe_repo = get_probe_repository()
+    if isinstance(probe_repo, SQLAlchemyProbeRepository):
+        return SQLAlchemyProbeReadModel(get_engine())
+    if isinstance(probe_repo, ShardedProbeRepository):
+        return ShardedProbeReadModel(list(get_shard_engines()))
+    return None
+
+# O service recebe o repositório e o read model medidos (METRICS_ENABLED); os de cima ficam sem o
+# decorator, para que o tipo deles continue indicando o backend.
+@lru_cache(maxsize=None)
+def get_service_repository() -> IProbeRepository:
+    probe_repo = get_probe_repository()
+    return InstrumentedProbeRepository(probe_repo) if metrics.enabled else probe_repo
+
+@lru_cache(maxsize=None)
+def get_service_read_model() -> Optional[IProbeReadModel]:
+    read_model = get_probe_read_model()
+    return InstrumentedProbeReadModel(read_model) if metrics.enabled and read_model is not None else read_model
+
+@lru_cache(maxsize=None)
+def get_plateau_registry() -> PlateauRegistry:
+    return PlateauRegistry()
+
+@lru_cache(maxsize=None)
+def get_telemetry_hub() -> TelemetryHub:
+    return TelemetryHub(max_pending=settings.telemetry_max_pending)
+
+@lru_cache(maxsize=None)
+def get_probe_json_cache() -> ProbeJsonCache:
+    return ProbeJsonCache(view_to_json_bytes, max_entries=settings.json_cache_max_entries)
+
+@lru_cache(maxsize=None)
+def get_spatial_index() -> SpatialIndex:
+    return SpatialIndex(cell_size=settings.spatial_cell_size)
+
+@lru_cache(maxsize=None)
+def get_move_coalescer() -> Optional[MoveCoalescer]:
+    if settings.move_coalesce_window <= 0:
+        return None
+    return MoveCoalescer(window=settings.move_coalesce_window, max_batch=settings.move_coalesce_max_batch)
+
+@lru_cache(maxsize=None)
+def get_command_executor() -> Optional[CommandExecutor]:
+    if settings.command_pool_workers <= 0:
+        return None
+    return CommandExecutor(threshold=settings.command_pool_threshold, workers=settings.command_pool_workers,
+                           max_queue=settings.command_pool_max_queue)
+
+def schema_engines() -> list[Engine]:
+    """Bancos cujo schema é preparado na inicialização: o principal e, se houver, os shards."""
+    return [get_engine(), *get_shard_engines()]
+
+def rebuild_plateaus() -> int:
+    """Reconstrói os índices de ocupação a partir das sondas persistidas."""
+    return get_plateau_registry().rebuild(get_probe_repository().iter_all())
 
-probe_repo = SQLAlchemyProbeRepository(db_session_factory=SessionLocal)
+def component_metrics() -> Iterator[Sample]:
+    """Contadores mantidos pelos componentes compartilhados, lidos a cada GET /metrics (só dos que já existem)."""
+    yield "mars_events_dropped_total", "counter", "Eventos descartados com a fila cheia.", (), events.dropped
+    if get_probe_json_cache.cache_info().currsize:
+        json_cache = get_probe_json_cache()
+        help_text = "Leituras do JSON em cache das sondas, por resultado."
+        yield "mars_json_cache_requests_total", "counter", help_text, (("result", "hit"),), json_cache.hits
+        yield "mars_json_cache_requests_total", "counter", help_text, (("result", "miss"),), json_cache.misses
+    if get_telemetry_hub.cache_info().currsize:
+        hub = get_telemetry_hub()
+        yield "mars_telemetry_subscribers", "gauge", "Assinantes de telemetria conectados.", (), hub.subscribers
+        yield "mars_telemetry_published_total", "counter", "Poses publicadas na telemetria.", (), hub.published
+    if get_move_coalescer.cache_info().currsize and get_move_coalescer() is not None:
+        coalescer = get_move_coalescer()
+        yield "mars_coalescer_requests_total", "counter", "Movimentos recebidos pelo coalescedor.", (), coalescer.requests
+        yield "mars_coalescer_groups_total", "counter", "Gravações feitas pelo coalescedor.", (), coalescer.groups
+    if get_command_executor.cache_info().currsize and get_command_executor() is not None:
+        executor = get_command_executor()
+        help_text = "Sequências longas de comandos enviadas ao pool de processos, por resultado."
+        yield "mars_command_pool_total", "counter", help_text, (("result", "executed"),), executor.offloaded
+        yield "mars_command_pool_total", "counter", help_text, (("result", "rejected"),), executor.rejected
+
+def rebuild_spatial_index() -> int:
+    """Reconstrói o índice das consultas de sondas mais próximas a partir das sondas persistidas."""
+    read_model = get_probe_read_model()
+    if read_model is not None:
+        return get_spatial_index().rebuild(read_model.iter_all())
+    return get_spatial_index().rebuild(ProbeView.from_probe(p) for p in get_probe_repository().iter_all())
+
+def initialize() -> dict:
+    """
+    Chamada uma vez pelo lifespan, antes da primeira requisição: prepara o schema,
+    cria os repositórios, aquece o cache (CACHE_WARMUP) e reconstrói os planaltos e o
+    índice espacial. Retorna a duração de cada etapa, em milissegundos.
+    """
+    timings = {}
+    started = last = time.perf_counter()
+
+    def lap(name: str) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        timings[f"{name}_ms"] = round((now - last) * 1000, 3)
+        last = now
+
+    prepare_schema(schema_engines(), settings.schema_init)
+    lap("schema")
+    probe_repo = get_probe_repository()
+    get_trajectory_repository()
+    get_probe_read_model()
+    metrics.register_collector(component_metrics)
+    lap("repositories")
+    warmed = 0
+    if settings.cache_warmup and isinstance(probe_repo, CachingProbeRepository):
+        warmed = probe_repo.warm()
+    lap("cache_warmup")
+    plateau_probes = rebuild_plateaus()
+    lap("plateaus")
+    indexed_probes = rebuild_spatial_index()
+    lap("spatial_index")
+
+    summary = {
+        "schema_init": settings.schema_init,
+        "cache_warmed": warmed,
+        "plateau_probes": plateau_probes,
+        "indexed_probes": indexed_probes,
+        **timings,
+        "total_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    events.info("app.initialized", **summary)
+    return summary
 
 def get_probe_service() -> ProbeService:
     """
     Função de dependência que cria e retorna uma instância de ProbeService, injetando o repositório singleton.
     """
-    return ProbeService(probe_repository=probe_repo)
\ No newline at end of file
+    return ProbeService(
+        probe_repository=get_service_repository(),
+        trajectory_repository=get_trajectory_repository(),
+        checkpoint_interval=settings.trajectory_checkpoint_interval,
+        plateau_registry=get_plateau_registry(),
+        read_model=get_service_read_model(),
+        max_retries=settings.move_max_retries,
+        retry_backoff=settings.move_retry_backoff,
+        coalescer=get_move_coalescer(),
+        stream_checkpoint_interval=settings.stream_checkpoint_interval,
+        telemetry=get_telemetry_hub(),
+        json_cache=get_probe_json_cache(),
+        executor=get_command_executor(),
+        spatial_index=get_spatial_index()
+    )
+
+def close_repositories() -> None:
+    """
+    Chamada no desligamento da aplicação: grava o que estiver pendente no cache e no
+    histórico e encerra o pool de processos dos comandos.
+    """
+    if get_probe_repository.cache_info().currsize:
+        probe_repo = get_probe_repository()
+        if isinstance(probe_repo, (CachingProbeRepository, MmapProbeRepository)):
+            probe_repo.close()
+    if get_trajectory_repository.cache_info().currsize:
+        trajectory_repo = get_trajectory_repository()
+        if trajectory_repo is not None:
+            trajectory_repo.close()
+    if get_command_executor.cache_info().currsize and get_command_executor() is not None:
+        get_command_executor().close()
+
+@lru_cache(maxsize=None)
+def get_async_probe_repository() -> AsyncSQLAlchemyProbeRepository:
+    return AsyncSQLAlchemyProbeRepository(db_session_factory=get_async_session_factory())
+
+def get_async_probe_service() -> AsyncProbeService:
+    """
+    Equivalente assíncrono de get_probe_service. O repositório é criado na primeira
+    chamada, para que o engine assíncrono só exista quando a pilha assíncrona for usada.
+    """
+    return AsyncProbeService(
+        probe_repository=get_async_probe_repository(),
+        max_retries=settings.move_max_retries,
+        retry_backoff=settings.move_retry_backoff,
+        executor=get_command_executor()
+    )
@@ -1,18 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from typing import Iterable, Literal, Optional
 
-from app.api.schemas import ProbeLaunchRequest, ProbeMoveRequest, ProbeResponse, AllProbesResponse
-from app.services.probe_service import ProbeService, ProbeNotFoundError, InvalidCommandError
-from .dependencies import get_probe_service
+import anyio
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+
+from app.api.schemas import (
+    ProbeLaunchRequest, ProbeMoveRequest, ProbeResponse, AllProbesResponse,
+    ProbeBulkLaunchRequest, ProbeBulkLaunchResponse,
+    ProbeBatchMoveRequest, ProbeBatchMoveResponse, ProbeBatchMoveResult, ProbePoseResponse,
+    ProbePlanRequest, ProbePlanResponse, ProbeStreamMoveResponse, NearestProbeResponse, NearestProbesResponse,
+)
+from app.api.serialization import NDJSON_MEDIA_TYPE, etag_matches, join_probe_list
+from app.domain.models import Position
+from app.core.config import settings
+from app.repositories.probe_read_model import ProbeView, Region
+from app.services.probe_service import (
+    LaunchSpec, ProbeService, ProbeNotFoundError, InvalidCommandError, ProbeConflictError,
+    StreamMoveError, StreamProgress,
+)
+from app.services.command_executor import CommandPoolBusyError
+from app.services.probe_json_cache import ProbeJsonCache
+from app.services.telemetry import SSE_MEDIA_TYPE, TelemetryHub, sse_event
+from .dependencies import get_probe_json_cache, get_probe_service, get_telemetry_hub
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_NEAREST = 1000
+# Região x0,y0,x1,y1 do parâmetro `within`.
+REGION_PATTERN = r"^-?\d+,-?\d+,-?\d+,-?\d+$"
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def parse_region(within: str) -> Region:
+    """Converte `x0,y0,x1,y1` (já validado por REGION_PATTERN) em uma região; os cantos podem vir em qualquer ordem."""
+    x0, y0, x1, y1 = map(int, within.split(","))
+    return Region(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+def pool_busy(error: CommandPoolBusyError) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error), headers={"Retry-After": "1"})
+
 @router.post("/probes", response_model=ProbeResponse, status_code=status.HTTP_201_CREATED)
 def launch_probe(request: ProbeLaunchRequest, service: ProbeService = Depends(get_probe_service)):
     try:
         probe = service.launch_probe(
             max_x=request.x,
             max_y=request.y,
-            direction_str=request.direction.value
+            direction_str=request.direction.value,
+            plateau=request.plateau,
+            x=request.start_x,
+            y=request.start_y
         )
 
         return ProbeResponse(
@@ -24,6 +65,17 @@ def launch_probe(request: ProbeLaunchRequest, service: ProbeService = Depends(ge
     except InvalidCommandError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@router.post("/probes/launch:batch", response_model=ProbeBulkLaunchResponse, status_code=status.HTTP_201_CREATED)
+def launch_probes_batch(request: ProbeBulkLaunchRequest, service: ProbeService = Depends(get_probe_service)):
+    try:
+        ids = service.launch_probes(
+            [LaunchSpec(item.x, item.y, item.direction.value, item.plateau, item.start_x, item.start_y)
+             for item in request.probes]
+        )
+        return ProbeBulkLaunchResponse(ids=ids)
+    except InvalidCommandError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.post("/probes/{probe_id}/move", response_model=ProbeResponse)
 def move_probe(
     probe_id: str,
@@ -42,16 +94,232 @@ def move_probe(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except InvalidCommandError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ProbeConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except CommandPoolBusyError as e:
+        raise pool_busy(e)
 
-@router.get("/probes", response_model=AllProbesResponse)
-def get_all_probes(service: ProbeService = Depends(get_probe_service)):
-    probes = service.get_all_probes()
-    probe_responses = [
-        ProbeResponse(
-            id=p.id,
-            x=p.position.x,
-            y=p.position.y,
-            direction=p.current_direction
-        ) for p in probes
+def _stream_response(progress: StreamProgress) -> dict:
+    return ProbeStreamMoveResponse(
+        id=progress.probe_id,
+        executed=progress.executed,
+        checkpoints=progress.checkpoints,
+        x=progress.position.x,
+        y=progress.position.y,
+        direction=progress.direction
+    ).model_dump(mode="json")
+
+@router.post("/probes/{probe_id}/move:stream", response_model=ProbeStreamMoveResponse)
+async def move_probe_stream(
+    probe_id: str,
+    request: Request,
+    checkpoint_every: Optional[int] = Query(None, ge=1, le=1_000_000, description="Comandos entre gravações da pose"),
+    service: ProbeService = Depends(get_probe_service)
+):
+    """
+    Executa uma fita de comandos enviada no corpo (texto puro, L/R/M; espaços e
+    quebras de linha são ignorados) à medida que ela chega, sem carregá-la inteira.
+    """
+    stream = None
+    try:
+        stream = await run_in_threadpool(service.open_command_stream, probe_id, checkpoint_every)
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(stream.feed, chunk)
+        progress = await run_in_threadpool(stream.close)
+    except ProbeNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except StreamMoveError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "offset": e.offset, "probe": _stream_response(e.progress)}
+        )
+    except ProbeConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    finally:
+        if stream is not None and not stream.finished:
+            # Cliente desconectado ou erro inesperado: a pose não gravada sai do índice de ocupação.
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(stream.abort)
+    return _stream_response(progress)
+
+@router.post("/probes/{probe_id}/plan", response_model=ProbePlanResponse)
+def plan_probe_route(
+    probe_id: str,
+    request: ProbePlanRequest,
+    service: ProbeService = Depends(get_probe_service)
+):
+    try:
+        result = service.plan_route(
+            probe_id,
+            Position(request.x, request.y),
+            direction=request.direction,
+            obstacles=frozenset(request.obstacles),
+            execute=request.execute
+        )
+    except ProbeNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InvalidCommandError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ProbeConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except CommandPoolBusyError as e:
+        raise pool_busy(e)
+    probe = result.probe
+    return ProbePlanResponse(
+        id=probe_id,
+        commands=result.plan.commands,
+        algorithm=result.plan.algorithm,
+        executed=probe is not None,
+        probe=ProbeResponse(
+            id=probe.id,
+            x=probe.position.x,
+            y=probe.position.y,
+            direction=probe.current_direction
+        ) if probe else None
+    )
+
+@router.post("/probes/move:batch", response_model=ProbeBatchMoveResponse)
+def move_probes_batch(request: ProbeBatchMoveRequest, service: ProbeService = Depends(get_probe_service)):
+    try:
+        report = service.move_probes_batch(
+            [(item.probe_id, item.commands) for item in request.items],
+            atomic=request.atomic
+        )
+    except ProbeConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except CommandPoolBusyError as e:
+        raise pool_busy(e)
+    results = [
+        ProbeBatchMoveResult(
+            probe_id=r.probe_id,
+            success=r.success,
+            probe=ProbeResponse(
+                id=r.probe_id,
+                x=r.position.x,
+                y=r.position.y,
+                direction=r.direction
+            ) if r.success else None,
+            error=r.error
+        ) for r in report.results
     ]
-    return AllProbesResponse(probes=probe_responses)
\ No newline at end of file
+    return ProbeBatchMoveResponse(committed=report.committed, results=results)
+
+@router.get("/probes", response_model=AllProbesResponse)
+def get_all_probes(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    after: Optional[str] = Query(None, description="Retorna apenas sondas com ID maior que este (valor de `next_after`)"),
+    format: Literal["json", "ndjson"] = Query("json", description="`ndjson` transmite uma sonda por linha"),
+    within: Optional[str] = Query(None, pattern=REGION_PATTERN,
+                                  description="Apenas as sondas no retângulo `x0,y0,x1,y1` (bordas incluídas)"),
+    if_none_match: Optional[str] = Header(None, description="ETag de uma resposta anterior; sem mudanças na frota, responde 304"),
+    service: ProbeService = Depends(get_probe_service),
+    json_cache: ProbeJsonCache = Depends(get_probe_json_cache)
+):
+    # A versão é lida antes das sondas: uma gravação entre as duas leituras só torna a ETag mais antiga que o corpo.
+    etag = f'"f{service.fleet_version()}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    paginated = limit is not None or after is not None
+    if paginated:
+        limit = limit or DEFAULT_PAGE_SIZE
+    if within is not None:
+        probes: Iterable[ProbeView] = service.get_probes_within(parse_region(within), limit, after)
+    elif paginated:
+        probes = service.get_probes_page(limit, after)
+    elif format == "ndjson":
+        probes = service.iter_probes()
+    else:
+        probes = service.get_all_probes()
+
+    if format == "ndjson":
+        lines = (json_cache.get(p) + b"\n" for p in probes)
+        return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+    # O corpo é montado com o JSON em cache de cada sonda, sem validação nem serialização por sonda.
+    next_after = probes[-1].id if paginated and len(probes) == limit else None
+    body = join_probe_list(map(json_cache.get, probes), next_after)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/probes:nearest", response_model=NearestProbesResponse)
+def nearest_probes(
+    x: int = Query(..., description="Coordenada X do ponto"),
+    y: int = Query(..., description="Coordenada Y do ponto"),
+    k: int = Query(10, ge=1, le=MAX_NEAREST, description="Quantidade de sondas"),
+    service: ProbeService = Depends(get_probe_service)
+):
+    """As `k` sondas mais próximas do ponto, da mais próxima à mais distante (empates pelo ID)."""
+    return NearestProbesResponse(probes=[
+        NearestProbeResponse(id=view.id, x=view.x, y=view.y, direction=view.direction, distance=distance)
+        for distance, view in service.nearest_probes(x, y, k)
+    ])
+
+@router.get("/probes:telemetry")
+async def probe_telemetry(
+    probe_id: list[str] = Query([], description="Acompanha apenas estas sondas (pode repetir)"),
+    plateau: Optional[str] = Query(None, description="Acompanha as sondas deste planalto"),
+    service: ProbeService = Depends(get_probe_service),
+    hub: TelemetryHub = Depends(get_telemetry_hub)
+):
+    """
+    Telemetria por Server-Sent Events: um evento `snapshot` com as poses atuais e,
+    depois, um evento `pose` a cada gravação. Um consumidor lento recebe só a pose
+    mais recente de cada sonda; se ficar muito atrasado, recebe um novo `snapshot`.
+    """
+    probe_ids = frozenset(probe_id)
+    loop = asyncio.get_running_loop()
+
+    async def snapshot() -> bytes:
+        views = await run_in_threadpool(service.telemetry_snapshot, probe_ids, plateau)
+        return sse_event("snapshot", {"probes": [view._asdict() for view in views]})
+
+    async def stream():
+        # Assina antes do snapshot: uma pose gravada entre os dois chega repetida, mas nunca se perde.
+        subscription = hub.subscribe(loop, probe_ids, plateau)
+        try:
+            yield await snapshot()
+            while True:
+                try:
+                    resync, batch = await asyncio.wait_for(subscription.next_batch(), settings.telemetry_heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if resync:
+                    yield await snapshot()
+                if batch:
+                    yield b"".join(batch)
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type=SSE_MEDIA_TYPE, headers={"Cache-Control": "no-cache"})
+
+@router.get("/probes/{probe_id}", response_model=ProbeResponse)
+def get_probe(
+    probe_id: str,
+    if_none_match: Optional[str] = Header(None, description="ETag de uma resposta anterior; sem mudanças na sonda, responde 304"),
+    service: ProbeService = Depends(get_probe_service),
+    json_cache: ProbeJsonCache = Depends(get_probe_json_cache)
+):
+    try:
+        view = service.get_probe(probe_id)
+    except ProbeNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    etag = f'"v{view.version}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(content=json_cache.get(view), media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@router.get("/probes/{probe_id}/trajectory/{seq}", response_model=ProbePoseResponse)
+def get_probe_pose_at(
+    probe_id: str,
+    seq: int = Path(..., ge=0, description="Quantidade de comandos executados desde o lançamento"),
+    service: ProbeService = Depends(get_probe_service)
+):
+    try:
+        position, direction = service.get_pose_at(probe_id, seq)
+        return ProbePoseResponse(id=probe_id, seq=seq, x=position.x, y=position.y, direction=direction)
+    except ProbeNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -0,0 +1,117 @@
+import random
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.serialization import NDJSON_MEDIA_TYPE
+from app.core.events import events
+from app.core.metrics import MetricsRegistry, ProfileStore, RequestProfile, metrics, profile_request, profiles
+from app.services.telemetry import SSE_MEDIA_TYPE
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_MODES = ("wall", "cprofile")
+# Respostas em streaming (SSE, NDJSON) são medidas só até o início da resposta, não até a conexão fechar.
+STREAMING_MEDIA_TYPES = tuple(media_type.encode("latin-1") for media_type in (SSE_MEDIA_TYPE, NDJSON_MEDIA_TYPE))
+
+
+def is_streaming(headers) -> bool:
+    return any(name == b"content-type" and value.startswith(STREAMING_MEDIA_TYPES) for name, value in headers)
+
+
+def route_template(scope: Scope) -> str:
+    """Modelo da rota (ex.: /api/probes/{probe_id}), e não o caminho, para não criar uma série por sonda."""
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição em mars_http_request_seconds. Respostas
+    em streaming (SSE e NDJSON) são medidas até o `http.response.start`: a duração da
+    conexão não entra no histograma nem gera `request.slow`.
+
+    Perfis por requisição:
+    - com `profiling_enabled`, o cabeçalho `X-Profile: wall` devolve o tempo de cada
+      camada no cabeçalho Server-Timing, e `X-Profile: cprofile` também guarda as
+      funções mais custosas; o perfil fica em GET /debug/profiles (ID em X-Profile-Id);
+    - uma fração `sample_rate` das requisições é medida por camada, e as mais lentas
+      que `slow_ms` são guardadas e emitidas como evento `request.slow`.
+    """
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = metrics, store: ProfileStore = profiles,
+                 profiling_enabled: bool = False, sample_rate: float = 0.0, slow_ms: float = 250.0):
+        self.app = app
+        self.registry = registry
+        self.store = store
+        self.profiling_enabled = profiling_enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def _requested_mode(self, scope: Scope) -> Optional[str]:
+        if not self.profiling_enabled:
+            return None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                mode = value.decode("latin-1").strip().lower()
+                return mode if mode in PROFILE_MODES else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested_mode(scope)
+        sampled = requested is None and self.sample_rate > 0 and random.random() < self.sample_rate
+        mode = requested or ("wall" if sampled else None)
+        if mode is None and not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        streaming_started: Optional[float] = None
+        status_code = 500
+        profile_id = self.store.new_id() if requested else None
+
+        with profile_request(mode) if mode else nullcontext() as profile:
+            async def send_with_status(message: Message) -> None:
+                nonlocal status_code, streaming_started
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if is_streaming(message.get("headers", [])):
+                        streaming_started = time.perf_counter()
+                    if requested:
+                        timing = profile.server_timing(time.perf_counter() - started)
+                        message = {**message, "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", timing.encode("latin-1")),
+                            (b"x-profile-id", str(profile_id).encode("latin-1")),
+                        ]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                elapsed = (streaming_started or time.perf_counter()) - started
+                route = route_template(scope)
+                self.registry.observe("mars_http_request_seconds", elapsed,
+                                      method=scope["method"], route=route, status=str(status_code))
+                if profile is not None and (requested or elapsed * 1000 >= self.slow_ms):
+                    self._keep(profile_id, profile, scope, route, status_code, elapsed)
+
+    def _keep(self, profile_id: Optional[int], profile: RequestProfile, scope: Scope,
+              route: str, status_code: int, elapsed: float) -> None:
+        entry = {
+            "id": profile_id if profile_id is not None else self.store.new_id(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "mode": profile.mode,
+            "duration_ms": round(elapsed * 1000, 3),
+            "layers_ms": {layer: round(seconds * 1000, 3) for layer, seconds in profile.layers.items()},
+            "functions": profile.top_functions(),
+        }
+        self.store.add(entry)
+        if elapsed * 1000 >= self.slow_ms:
+            events.warning("request.slow", **{key: value for key, value in entry.items() if key != "functions"})
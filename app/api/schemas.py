@@ -1,14 +1,40 @@
-from pydantic import BaseModel, Field
+from typing import Optional
+
+from pydantic import BaseModel, Field, field_validator
 from app.domain.state import Direction
 
 class ProbeLaunchRequest(BaseModel):
     x: int = Field(..., ge=0, description="Coordenada X máxima da malha")
     y: int = Field(..., ge=0, description="Coordenada Y máxima da malha")
     direction: Direction # Pydantic valida automaticamente se o valor é um dos membros do Enum
+    plateau: Optional[str] = Field(None, min_length=1, max_length=64, description="Planalto compartilhado com outras sondas")
+    start_x: int = Field(0, ge=0, description="Coordenada X inicial da sonda")
+    start_y: int = Field(0, ge=0, description="Coordenada Y inicial da sonda")
+
+    @field_validator("plateau")
+    @classmethod
+    def plateau_fits_in_64_bytes(cls, value: Optional[str]) -> Optional[str]:
+        # max_length conta caracteres; o registro do repositório mmap guarda até 64 bytes em UTF-8.
+        if value is not None and len(value.encode("utf-8")) > 64:
+            raise ValueError("O nome do planalto deve ter no máximo 64 bytes em UTF-8.")
+        return value
+
+class ProbeBulkLaunchRequest(BaseModel):
+    probes: list[ProbeLaunchRequest] = Field(..., min_length=1, max_length=10_000)
+
+class ProbeBulkLaunchResponse(BaseModel):
+    ids: list[str] = Field(..., description="IDs das sondas lançadas, na ordem da requisição")
 
 class ProbeMoveRequest(BaseModel):
     commands: str = Field(..., min_length=1, description="Sequência de comandos (L, R, M)")
 
+class ProbePlanRequest(BaseModel):
+    x: int = Field(..., ge=0, description="Coordenada X do alvo")
+    y: int = Field(..., ge=0, description="Coordenada Y do alvo")
+    direction: Optional[Direction] = Field(None, description="Direção final desejada; se omitida, qualquer uma serve")
+    obstacles: list[tuple[int, int]] = Field(default_factory=list, max_length=10_000, description="Células (x, y) a evitar")
+    execute: bool = Field(False, description="Se verdadeiro, executa o plano em seguida")
+
 class ProbeResponse(BaseModel):
     id: str
     x: int
@@ -19,5 +45,52 @@ class ProbeResponse(BaseModel):
         # Permite que Pydantic leia os dados de um objeto
         from_attributes = True
 
+class ProbePlanResponse(BaseModel):
+    id: str
+    commands: str = Field(..., description="Sequência de comandos mais curta até o alvo")
+    algorithm: str = Field(..., description="`closed_form` (malha livre no caminho) ou `astar`")
+    executed: bool
+    probe: Optional[ProbeResponse] = Field(None, description="Pose final, se o plano foi executado")
+
+class ProbeStreamMoveResponse(BaseModel):
+    id: str
+    executed: int = Field(..., description="Comandos executados da fita")
+    checkpoints: int = Field(..., description="Quantas vezes a pose foi gravada durante a fita")
+    x: int
+    y: int
+    direction: Direction
+
+class ProbePoseResponse(BaseModel):
+    id: str
+    seq: int = Field(..., description="Quantidade de comandos executados desde o lançamento")
+    x: int
+    y: int
+    direction: Direction
+
 class AllProbesResponse(BaseModel):
-    probes: list[ProbeResponse]
\ No newline at end of file
+    probes: list[ProbeResponse]
+    next_after: Optional[str] = Field(None, description="Cursor para a próxima página (parâmetro `after`); nulo na última página")
+
+class NearestProbeResponse(ProbeResponse):
+    distance: float = Field(..., description="Distância euclidiana até o ponto consultado")
+
+class NearestProbesResponse(BaseModel):
+    probes: list[NearestProbeResponse]
+
+class ProbeBatchMoveItem(BaseModel):
+    probe_id: str
+    commands: str = Field(..., min_length=1, description="Sequência de comandos (L, R, M)")
+
+class ProbeBatchMoveRequest(BaseModel):
+    items: list[ProbeBatchMoveItem] = Field(..., min_length=1)
+    atomic: bool = Field(False, description="Se verdadeiro, qualquer falha faz com que nenhuma sonda seja alterada")
+
+class ProbeBatchMoveResult(BaseModel):
+    probe_id: str
+    success: bool
+    probe: Optional[ProbeResponse] = None
+    error: Optional[str] = None
+
+class ProbeBatchMoveResponse(BaseModel):
+    committed: bool = Field(..., description="Indica se as alterações do lote foram persistidas")
+    results: list[ProbeBatchMoveResult]
@@ -0,0 +1,36 @@
+import json
+
+from typing import Iterable, Optional
+
+from app.domain.models import Probe
+from app.repositories.probe_read_model import ProbeView
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def probe_to_ndjson(probe: Probe) -> str:
+    """Serializa a sonda como uma linha NDJSON, com os mesmos campos de ProbeResponse."""
+    return json.dumps({
+        "id": probe.id,
+        "x": probe.position.x,
+        "y": probe.position.y,
+        "direction": probe.current_direction.value,
+    }) + "\n"
+
+
+def view_to_json_bytes(view: ProbeView) -> bytes:
+    """JSON de uma sonda da listagem, com os mesmos campos de ProbeResponse."""
+    return json.dumps({"id": view.id, "x": view.x, "y": view.y, "direction": view.direction}).encode()
+
+
+def join_probe_list(encoded: Iterable[bytes], next_after: Optional[str] = None) -> bytes:
+    """Corpo de AllProbesResponse montado a partir do JSON já codificado de cada sonda."""
+    return b'{"probes": [' + b", ".join(encoded) + b'], "next_after": ' + json.dumps(next_after).encode() + b"}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o cabeçalho If-None-Match (lista de ETags, fracas ou não, ou *) com a ETag atual."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate == "*" or candidate.removeprefix("W/") == etag for candidate in candidates)
@@ -0,0 +1,162 @@
+import os
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Presets de engine do banco, escolhidos por DATABASE_PRESET. Cada valor pode ser sobrescrito pela variável própria.
+# - durability: cada commit é sincronizado com o disco (fsync) antes de retornar; nada confirmado se perde.
+# - throughput: WAL com synchronous=NORMAL não corrompe o banco, mas uma queda de energia (não do
+#   processo) pode desfazer os últimos commits; cache e mmap maiores e mais conexões no pool.
+DATABASE_PRESETS: dict[str, dict[str, str]] = {
+    "durability": {
+        "SQLITE_JOURNAL_MODE": "WAL",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_CACHE_SIZE": "-16000",
+        "SQLITE_MMAP_SIZE": "0",
+        "DATABASE_POOL_SIZE": "5",
+    },
+    "throughput": {
+        "SQLITE_JOURNAL_MODE": "WAL",
+        "SQLITE_SYNCHRONOUS": "NORMAL",
+        "SQLITE_CACHE_SIZE": "-262144",
+        "SQLITE_MMAP_SIZE": "1073741824",
+        "DATABASE_POOL_SIZE": "20",
+    },
+}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Configurações da aplicação, lidas das variáveis de ambiente (ou de um arquivo .env)."""
+    database_url: str
+    async_database_url: str
+    api_mode: str
+    database_preset: str
+    sqlite_journal_mode: str
+    sqlite_synchronous: str
+    sqlite_cache_size: int
+    sqlite_mmap_size: int
+    database_pool_size: int
+    schema_init: str
+    shard_count: int
+    shard_database_url_template: str
+    move_max_retries: int
+    move_retry_backoff: float
+    move_coalesce_window: float
+    move_coalesce_max_batch: int
+    command_pool_workers: int
+    command_pool_threshold: int
+    command_pool_max_queue: int
+    stream_checkpoint_interval: int
+    telemetry_max_pending: int
+    telemetry_heartbeat: float
+    repository_backend: str
+    mmap_path: str
+    cache_enabled: bool
+    cache_max_entries: int
+    cache_flush_interval: float
+    cache_flush_threshold: int
+    cache_max_dirty: int
+    cache_warmup: bool
+    json_cache_max_entries: int
+    spatial_cell_size: int
+    events_level: str
+    events_sample_rate: float
+    events_queue_size: int
+    metrics_enabled: bool
+    profiling_enabled: bool
+    profile_sample_rate: float
+    profile_slow_ms: float
+    profile_store_size: int
+    trajectory_enabled: bool
+    trajectory_checkpoint_interval: int
+    trajectory_flush_threshold: int
+
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        database_preset = os.getenv("DATABASE_PRESET", "durability").lower()
+        if database_preset not in DATABASE_PRESETS:
+            raise ValueError(f"DATABASE_PRESET inválido: '{database_preset}'. Use {', '.join(DATABASE_PRESETS)}.")
+        preset = DATABASE_PRESETS[database_preset]
+
+        return cls(
+            database_url=os.getenv("DATABASE_URL", "sqlite:///./mars_probe.db"),
+            database_preset=database_preset,
+            # PRAGMAs aplicados a cada conexão SQLite. SQLITE_CACHE_SIZE negativo é em KiB; SQLITE_MMAP_SIZE em bytes.
+            sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", preset["SQLITE_JOURNAL_MODE"]).upper(),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", preset["SQLITE_SYNCHRONOUS"]).upper(),
+            sqlite_cache_size=int(os.getenv("SQLITE_CACHE_SIZE", preset["SQLITE_CACHE_SIZE"])),
+            sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", preset["SQLITE_MMAP_SIZE"])),
+            database_pool_size=int(os.getenv("DATABASE_POOL_SIZE", preset["DATABASE_POOL_SIZE"])),
+            # Na inicialização: "migrate" cria/atualiza o schema (sob lock); "verify" só confere, para
+            # quando as migrações rodam em um passo próprio antes de subir os workers.
+            schema_init=os.getenv("SCHEMA_INIT", "migrate").lower(),
+            # SHARD_COUNT > 1 distribui as sondas entre vários bancos pelo hash do ID; {shard} vira o número do shard.
+            shard_count=int(os.getenv("SHARD_COUNT", "1")),
+            shard_database_url_template=os.getenv("SHARD_DATABASE_URL_TEMPLATE", "sqlite:///./mars_probe_shard{shard}.db"),
+            # O driver assíncrono é escolhido pela URL, ex.: sqlite+aiosqlite, postgresql+asyncpg.
+            async_database_url=os.getenv("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./mars_probe.db"),
+            # "sync" usa as rotas def + SQLAlchemy síncrono; "async" usa as rotas async def + driver assíncrono.
+            api_mode=os.getenv("API_MODE", "sync").lower(),
+            # Movimentos gravam com compare-and-swap; em conflito, tentam de novo com espera exponencial.
+            move_max_retries=int(os.getenv("MOVE_MAX_RETRIES", "5")),
+            move_retry_backoff=float(os.getenv("MOVE_RETRY_BACKOFF_SECONDS", "0.002")),
+            # Agrupa movimentos simultâneos da mesma sonda em uma gravação; janela 0 desativa o agrupamento.
+            move_coalesce_window=float(os.getenv("MOVE_COALESCE_WINDOW_SECONDS", "0")),
+            move_coalesce_max_batch=int(os.getenv("MOVE_COALESCE_MAX_BATCH", "32")),
+            # Sequências com COMMAND_POOL_THRESHOLD comandos ou mais rodam em um pool de processos; além de
+            # COMMAND_POOL_WORKERS em execução e COMMAND_POOL_MAX_QUEUE na fila, respondem 503. 0 workers desativa.
+            command_pool_workers=int(os.getenv("COMMAND_POOL_WORKERS", "2")),
+            command_pool_threshold=int(os.getenv("COMMAND_POOL_THRESHOLD", "20000")),
+            command_pool_max_queue=int(os.getenv("COMMAND_POOL_MAX_QUEUE", "8")),
+            # Fitas de comandos (move:stream) gravam a pose a cada tantos comandos.
+            stream_checkpoint_interval=int(os.getenv("STREAM_CHECKPOINT_INTERVAL", "4096")),
+            # Telemetria (SSE): sondas pendentes por assinante antes de um novo snapshot e intervalo do keep-alive.
+            telemetry_max_pending=int(os.getenv("TELEMETRY_MAX_PENDING", "10000")),
+            telemetry_heartbeat=float(os.getenv("TELEMETRY_HEARTBEAT_SECONDS", "15")),
+            # "sql" guarda as sondas no banco; "mmap" em um arquivo de registros fixos mapeado em memória.
+            repository_backend=os.getenv("REPOSITORY_BACKEND", "sql").lower(),
+            mmap_path=os.getenv("MMAP_PATH", "./mars_probe.rec"),
+            # Cache write-behind na frente do banco (ver CachingProbeRepository).
+            cache_enabled=_env_bool("CACHE_ENABLED", False),
+            cache_max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+            cache_flush_interval=float(os.getenv("CACHE_FLUSH_INTERVAL_SECONDS", "1.0")),
+            cache_flush_threshold=int(os.getenv("CACHE_FLUSH_THRESHOLD", "500")),
+            cache_max_dirty=int(os.getenv("CACHE_MAX_DIRTY", "5000")),
+            # Carrega até CACHE_MAX_ENTRIES sondas no cache durante a inicialização.
+            cache_warmup=_env_bool("CACHE_WARMUP", False),
+            # JSON já codificado de cada sonda, reaproveitado nas leituras e listagens; 0 desativa.
+            json_cache_max_entries=int(os.getenv("JSON_CACHE_MAX_ENTRIES", "100000")),
+            # Lado, em células, dos baldes do índice em memória das consultas de sondas mais próximas.
+            spatial_cell_size=int(os.getenv("SPATIAL_CELL_SIZE", "64")),
+            # Eventos de domínio e repositório (ver app/core/events.py). DEBUG inclui cada comando executado.
+            events_level=os.getenv("EVENTS_LEVEL", "WARNING"),
+            events_sample_rate=float(os.getenv("EVENTS_SAMPLE_RATE", "1.0")),
+            events_queue_size=int(os.getenv("EVENTS_QUEUE_SIZE", "10000")),
+            # Histogramas de latência e contadores em GET /metrics (formato do Prometheus).
+            metrics_enabled=_env_bool("METRICS_ENABLED", True),
+            # PROFILING_ENABLED aceita o cabeçalho X-Profile (wall ou cprofile) e expõe GET /debug/profiles.
+            # Uma fração PROFILE_SAMPLE_RATE das requisições é medida por camada; as mais lentas que
+            # PROFILE_SLOW_MS são guardadas (as PROFILE_STORE_SIZE mais recentes).
+            profiling_enabled=_env_bool("PROFILING_ENABLED", False),
+            profile_sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            profile_slow_ms=float(os.getenv("PROFILE_SLOW_MS", "250")),
+            profile_store_size=int(os.getenv("PROFILE_STORE_SIZE", "50")),
+            # Histórico de trajetórias: comandos por checkpoint e trechos por gravação em lote.
+            trajectory_enabled=_env_bool("TRAJECTORY_ENABLED", True),
+            trajectory_checkpoint_interval=int(os.getenv("TRAJECTORY_CHECKPOINT_INTERVAL", "1024")),
+            trajectory_flush_threshold=int(os.getenv("TRAJECTORY_FLUSH_THRESHOLD", "256")),
+        )
+
+
+settings = Settings.from_env()
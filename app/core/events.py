@@ -0,0 +1,140 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import settings
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+
+class JsonEventFormatter(logging.Formatter):
+    """Formata cada evento como uma linha JSON: horário, nível, nome do evento e campos."""
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, default=str)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta o evento (e conta o descarte) quando a fila está cheia, em vez de bloquear."""
+    def __init__(self, event_queue: queue.Queue):
+        super().__init__(event_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Os campos já são estruturados; não é preciso formatar a mensagem na thread de quem emite.
+        return record
+
+
+class EventSink:
+    """
+    Coletor de eventos estruturados do domínio e dos repositórios.
+
+    Os eventos abaixo do nível configurado são descartados com uma única comparação;
+    nos trechos quentes, use `enabled(level)` antes de montar os campos. Os eventos
+    aceitos passam por amostragem (`sample_rate`) e vão para uma fila limitada, que é
+    esvaziada por uma thread própria; quem emite nunca espera pela escrita.
+    """
+    def __init__(self, level: int = WARNING, sample_rate: float = 1.0, queue_size: int = 10_000,
+                 handler: Optional[logging.Handler] = None, name: str = "mars_probe.events"):
+        self._logger = logging.getLogger(name)
+        self._logger.propagate = False
+        self._logger.setLevel(DEBUG)
+        self._handler = handler
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._queue_handler = _DroppingQueueHandler(self._queue)
+        self._listener: Optional[QueueListener] = None
+        self._start_lock = threading.Lock()
+        self.level = level
+        self.sample_rate = sample_rate
+
+    def configure(self, level: Optional[int] = None, sample_rate: Optional[float] = None,
+                  handler: Optional[logging.Handler] = None) -> None:
+        if handler is not None:
+            self.stop()
+            self._handler = handler
+        if level is not None:
+            self.level = level
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+
+    @property
+    def dropped(self) -> int:
+        return self._queue_handler.dropped
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def emit(self, level: int, event: str, **fields) -> None:
+        if level < self.level:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if self._listener is None:
+            self._start()
+        self._logger.log(level, event, extra={"fields": fields})
+
+    def debug(self, event: str, **fields) -> None:
+        self.emit(DEBUG, event, **fields)
+
+    def info(self, event: str, **fields) -> None:
+        self.emit(INFO, event, **fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self.emit(WARNING, event, **fields)
+
+    def error(self, event: str, **fields) -> None:
+        self.emit(ERROR, event, **fields)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._listener is not None:
+                return
+            handler = self._handler
+            if handler is None:
+                handler = logging.StreamHandler(sys.stderr)
+                handler.setFormatter(JsonEventFormatter())
+            self._logger.handlers = [self._queue_handler]
+            self._listener = QueueListener(self._queue, handler, respect_handler_level=True)
+            self._listener.start()
+
+    def stop(self) -> None:
+        """Esvazia a fila e para a thread de escrita. Um novo evento a inicia de novo."""
+        with self._start_lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+
+def _parse_level(name: str) -> int:
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Nível de eventos inválido: '{name}'.")
+    return level
+
+
+events = EventSink(
+    level=_parse_level(settings.events_level),
+    sample_rate=settings.events_sample_rate,
+    queue_size=settings.events_queue_size,
+)
+atexit.register(events.stop)
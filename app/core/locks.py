@@ -0,0 +1,24 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class StripedLock:
+    """
+    Conjunto fixo de locks, escolhidos pelo hash da chave. Operações em chaves
+    diferentes quase sempre pegam locks diferentes e seguem em paralelo, sem um
+    lock por chave. Várias chaves são bloqueadas sempre na mesma ordem, sem deadlock.
+    """
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    @contextmanager
+    def hold(self, keys: Iterable[str]) -> Iterator[None]:
+        indexes = sorted({hash(key) % len(self._locks) for key in keys})
+        for index in indexes:
+            self._locks[index].acquire()
+        try:
+            yield
+        finally:
+            for index in reversed(indexes):
+                self._locks[index].release()
@@ -0,0 +1,284 @@
+import bisect
+import cProfile
+import functools
+import io
+import itertools
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.core.config import settings
+
+# Limites dos buckets dos histogramas de latência, em segundos.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[tuple[str, str], ...]
+# Amostra devolvida pelos coletores: (nome, tipo, ajuda, rótulos, valor).
+Sample = tuple[str, str, str, Labels, float]
+
+
+class _ThreadShard:
+    """Agregados de uma thread. Só a própria thread escreve; a exportação lê cópias."""
+    __slots__ = ("histograms", "counters")
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, Labels], list] = {}
+        self.counters: dict[tuple[str, Labels], float] = {}
+
+
+class RequestProfile:
+    """
+    Perfil de uma requisição: tempo acumulado em cada camada (rota, service,
+    repositório, domínio; os tempos de camadas aninhadas se sobrepõem) e, no modo
+    "cprofile", as funções mais custosas abaixo do service.
+    """
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.layers: dict[str, float] = {}
+        self.profiler = cProfile.Profile() if mode == "cprofile" else None
+        self._profiling = False
+
+    def add(self, layer: str, elapsed: float) -> None:
+        self.layers[layer] = self.layers.get(layer, 0.0) + elapsed
+
+    def run(self, function: Callable, *args, **kwargs):
+        """Executa `function` sob o cProfile, a não ser que ele já esteja ativo (chamadas aninhadas)."""
+        if self.profiler is None or self._profiling:
+            return function(*args, **kwargs)
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # A partir do Python 3.12 só um profiler pode estar ativo no processo.
+            return function(*args, **kwargs)
+        self._profiling = True
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._profiling = False
+            self.profiler.disable()
+
+    def server_timing(self, total: float) -> str:
+        """Cabeçalho Server-Timing, com as durações em milissegundos."""
+        entries = [f"total;dur={total * 1000:.3f}"]
+        entries.extend(f"{layer};dur={elapsed * 1000:.3f}" for layer, elapsed in self.layers.items())
+        return ", ".join(entries)
+
+    def top_functions(self, limit: int = 25) -> list[dict]:
+        if self.profiler is None:
+            return []
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        ordered = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {"function": f"{path}:{line}({name})", "calls": calls, "total_ms": round(total * 1000, 3),
+             "cumulative_ms": round(cumulative * 1000, 3)}
+            for (path, line, name), (_, calls, total, cumulative, _) in ordered
+        ]
+
+
+_active_profile: ContextVar[Optional[RequestProfile]] = ContextVar("mars_request_profile", default=None)
+
+
+@contextmanager
+def profile_request(mode: str) -> Iterator[RequestProfile]:
+    """Ativa o perfil no contexto da requisição; o threadpool do FastAPI herda o contexto."""
+    profile = RequestProfile(mode)
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Histogramas de latência e contadores, exportados no formato texto do Prometheus.
+
+    Cada thread grava nos seus próprios dicionários, sem locks; a exportação soma as
+    cópias de todas as threads. O lock só é usado quando uma thread grava pela
+    primeira vez. Os valores lidos durante uma gravação podem estar um incremento
+    atrasados, o que não importa para métricas.
+    """
+    def __init__(self, enabled: bool = True, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards: list[_ThreadShard] = []
+        self._lock = threading.Lock()
+        self._help: dict[str, str] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Coletores são chamados a cada exportação, para valores mantidos por outros componentes."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def _shard(self) -> _ThreadShard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _ThreadShard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(labels.items()))
+        histograms = self._shard().histograms
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Um contador por bucket, mais o bucket +Inf e a soma.
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(labels.items()))
+        counters = self._shard().counters
+        counters[key] = counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, layer: Optional[str] = None, **labels: str) -> Iterator[None]:
+        """Mede o bloco no histograma `name` e, se a requisição estiver sendo perfilada, na camada `layer`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(name, elapsed, **labels)
+            profile = _active_profile.get()
+            if profile is not None and layer is not None:
+                profile.add(layer, elapsed)
+
+    def timed(self, name: str, layer: str, profile_boundary: bool = False, **labels: str) -> Callable:
+        """
+        Decorator que mede cada chamada com o rótulo `method` igual ao nome da função.
+        Com `profile_boundary`, é ali que o cProfile de uma requisição perfilada começa.
+        """
+        def decorator(function: Callable) -> Callable:
+            method_labels = {**labels, "method": function.__name__}
+            layer_name = f"{layer}.{function.__name__}"
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled and _active_profile.get() is None:
+                    return function(*args, **kwargs)
+                with self.timer(name, layer_name, **method_labels):
+                    profile = _active_profile.get()
+                    if profile_boundary and profile is not None:
+                        return profile.run(function, *args, **kwargs)
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> tuple[dict, dict]:
+        """Soma dos histogramas e contadores de todas as threads."""
+        with self._lock:
+            shards = list(self._shards)
+        histograms: dict[tuple[str, Labels], list] = {}
+        counters: dict[tuple[str, Labels], float] = {}
+        for shard in shards:
+            for key, histogram in shard.histograms.copy().items():
+                total = histograms.get(key)
+                if total is None:
+                    histograms[key] = list(histogram)
+                else:
+                    for index, value in enumerate(list(histogram)):
+                        total[index] += value
+            for key, value in shard.counters.copy().items():
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render(self) -> str:
+        histograms, counters = self.snapshot()
+        lines: list[str] = []
+
+        def header(name: str, kind: str, help_text: Optional[str] = None) -> None:
+            lines.append(f"# HELP {name} {help_text or self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name in sorted({name for name, _ in histograms}):
+            header(name, "histogram")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), histogram):
+                    cumulative += count
+                    bucket = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{_format_labels(labels, bucket)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        for name in sorted({name for name, _ in counters}):
+            header(name, "counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        collected: dict[str, list[Sample]] = {}
+        for collector in self._collectors:
+            for sample in collector():
+                collected.setdefault(sample[0], []).append(sample)
+        for name, samples in sorted(collected.items()):
+            header(name, samples[0][1], samples[0][2])
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for _, _, _, labels, value in samples)
+
+        return "\n".join(lines) + "\n"
+
+
+class ProfileStore:
+    """Os perfis de requisição mais recentes, para GET /debug/profiles."""
+    def __init__(self, max_entries: int = 50):
+        self._entries: deque[dict] = deque(maxlen=max_entries)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, entry: dict) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._entries))
+
+
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
+metrics.describe("mars_http_request_seconds", "Duração das requisições HTTP, por rota, método e status.")
+metrics.describe("mars_service_seconds", "Duração das chamadas ao ProbeService, por método.")
+metrics.describe("mars_repository_seconds", "Duração das chamadas ao repositório e ao read model, por backend e método.")
+metrics.describe("mars_domain_seconds", "Duração da execução de sequências de comandos no domínio.")
+metrics.describe("mars_commands_executed_total", "Comandos executados pelas sondas.")
+metrics.describe("mars_invalid_moves_total", "Movimentos recusados por sair da malha ou colidir com outra sonda.")
+metrics.describe("mars_move_retries_total", "Novas tentativas de gravação depois de um conflito de versão.")
+
+profiles = ProfileStore(max_entries=settings.profile_store_size)
@@ -1,11 +1,118 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./mars_probe.db"
+from app.core.config import Settings, settings
+
+DATABASE_URL = settings.database_url
+
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def sqlite_pragmas(config: Settings) -> list[str]:
+    """PRAGMAs executados em cada nova conexão SQLite, a partir das configurações."""
+    if config.sqlite_journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE inválido: '{config.sqlite_journal_mode}'.")
+    if config.sqlite_synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS inválido: '{config.sqlite_synchronous}'.")
+    return [
+        f"PRAGMA journal_mode={config.sqlite_journal_mode}",
+        f"PRAGMA synchronous={config.sqlite_synchronous}",
+        f"PRAGMA cache_size={int(config.sqlite_cache_size)}",
+        f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}",
+    ]
+
+
+def apply_sqlite_pragmas(engine: Engine, config: Settings) -> None:
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def engine_options(url: str, config: Settings) -> dict:
+    """Argumentos do create_engine: pool e, no SQLite, o uso da conexão por várias threads."""
+    parsed = make_url(url)
+    options = {}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # O SQLite em memória usa um pool próprio, sem pool_size.
+            return options
+    options["pool_size"] = config.database_pool_size
+    return options
+
+
+def create_configured_engine(url: str, config: Settings = settings) -> Engine:
+    engine = create_engine(url, **engine_options(url, config))
+    if engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine, config)
+    return engine
+
+
+def create_configured_async_engine(url: str, config: Settings = settings) -> AsyncEngine:
+    options = engine_options(url, config)
+    options.pop("connect_args", None)
+    engine = create_async_engine(url, **options)
+    if engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine.sync_engine, config)
+    return engine
+
+
+Base = declarative_base()
+
+
+def shard_urls(template: str, shard_count: int) -> list[str]:
+    """URLs dos shards, trocando {shard} no modelo pelo número de cada um."""
+    if shard_count < 1:
+        raise ValueError(f"SHARD_COUNT inválido: {shard_count}.")
+    if shard_count > 1 and "{shard}" not in template:
+        raise ValueError("SHARD_DATABASE_URL_TEMPLATE precisa conter '{shard}'.")
+    return [template.format(shard=index) for index in range(shard_count)]
+
+
+def create_shard_engines(template: str, shard_count: int, config: Settings = settings) -> list[Engine]:
+    return [create_configured_engine(url, config) for url in shard_urls(template, shard_count)]
+
+
+# Engines e fábricas de sessão são criados na primeira chamada (normalmente no lifespan da
+# aplicação), e não na importação: importar os módulos não abre nem cria bancos.
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    return create_configured_engine(DATABASE_URL)
+
+
+@lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@lru_cache(maxsize=None)
+def get_shard_engines() -> tuple[Engine, ...]:
+    """Com SHARD_COUNT > 1 as sondas ficam nos shards; o banco principal guarda o restante (ex.: trajetórias)."""
+    if settings.shard_count <= 1:
+        return ()
+    return tuple(create_shard_engines(settings.shard_database_url_template, settings.shard_count))
+
+
+@lru_cache(maxsize=None)
+def get_shard_session_factories() -> tuple[sessionmaker, ...]:
+    return tuple(sessionmaker(autocommit=False, autoflush=False, bind=shard) for shard in get_shard_engines())
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_async_session_factory() -> async_sessionmaker:
+    """
+    Cria (uma única vez) o engine assíncrono e sua fábrica de sessões. É preguiçoso
+    para que o driver assíncrono só seja carregado quando a pilha assíncrona for usada.
+    """
+    async_engine = create_configured_async_engine(settings.async_database_url)
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.domain.state import Direction
+
+# Ordem horária das direções: girar à direita soma 1, girar à esquerda subtrai 1.
+DIRECTION_ORDER: tuple[Direction, ...] = (Direction.NORTH, Direction.EAST, Direction.SOUTH, Direction.WEST)
+DIRECTION_INDEX: dict[Direction, int] = {direction: index for index, direction in enumerate(DIRECTION_ORDER)}
+
+# Deslocamento (dx, dy) de um passo em cada direção, na mesma ordem de DIRECTION_ORDER.
+DIRECTION_VECTORS: tuple[tuple[int, int], ...] = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+COMMAND_CACHE_SIZE = 1024
+
+
+def _rotate(x: int, y: int, quarter_turns: int) -> tuple[int, int]:
+    """Gira o vetor (x, y) em quartos de volta no sentido horário."""
+    for _ in range(quarter_turns % 4):
+        x, y = y, -x
+    return x, y
+
+
+@dataclass(frozen=True)
+class CompiledCommands:
+    """
+    Transformação líquida de uma sequência de comandos, calculada para uma sonda
+    que parte de (0, 0) apontando para o Norte. Guarda a rotação final, o
+    deslocamento e a caixa que envolve todo o caminho percorrido.
+    """
+    rotation: int
+    dx: int
+    dy: int
+    min_x: int
+    min_y: int
+    max_x: int
+    max_y: int
+
+    def displacement(self, start: int) -> tuple[int, int]:
+        """Deslocamento final para uma sonda que parte na direção de índice `start`."""
+        return _rotate(self.dx, self.dy, start)
+
+    def bounds(self, start: int) -> tuple[int, int, int, int]:
+        """Caixa (min_x, min_y, max_x, max_y) do caminho para a direção inicial `start`."""
+        ax, ay = _rotate(self.min_x, self.min_y, start)
+        bx, by = _rotate(self.max_x, self.max_y, start)
+        return min(ax, bx), min(ay, by), max(ax, bx), max(ay, by)
+
+    def apply(self, x: int, y: int, start: int) -> tuple[int, int, int]:
+        """Pose final (x, y, índice da direção) sem verificar os limites da malha."""
+        dx, dy = self.displacement(start)
+        return x + dx, y + dy, (start + self.rotation) % 4
+
+
+def compile_uncached(commands: str) -> CompiledCommands:
+    """
+    Compila a sequência de comandos (L, R, M) em uma única transformação, sem cache.
+    Útil para trechos que dificilmente se repetem, como os de um histórico.
+    """
+    heading = 0
+    x = y = 0
+    min_x = min_y = max_x = max_y = 0
+
+    for offset, command in enumerate(commands):
+        if command == 'M':
+            step_x, step_y = DIRECTION_VECTORS[heading]
+            x += step_x
+            y += step_y
+            if x < min_x:
+                min_x = x
+            elif x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            elif y > max_y:
+                max_y = y
+        elif command == 'L':
+            heading = (heading - 1) % 4
+        elif command == 'R':
+            heading = (heading + 1) % 4
+        else:
+            raise ValueError(f"Comando inválido na posição {offset}: '{command}'.")
+
+    return CompiledCommands(rotation=heading, dx=x, dy=y, min_x=min_x, min_y=min_y, max_x=max_x, max_y=max_y)
+
+
+# Sequências iguais (comuns entre controladores) são reaproveitadas pelo cache LRU.
+compile_commands = lru_cache(maxsize=COMMAND_CACHE_SIZE)(compile_uncached)
@@ -1,8 +1,14 @@
 import uuid
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
 
+from app.core.events import DEBUG, events
+from app.domain.commands import DIRECTION_INDEX, DIRECTION_ORDER, DIRECTION_VECTORS, compile_commands, compile_uncached
 from app.domain.state import IDirectionState, DIRECTION_STATE_MAP, Direction
 
+if TYPE_CHECKING:
+    from app.domain.plateau import Plateau
+
 class InvalidMoveError(Exception):
     pass
 
@@ -29,7 +35,8 @@ class Grid:
 
 class Probe:
     """Classe sobre a Sonda em si, contem todos metodos para o gerenciamento de uma Sonda."""
-    def __init__(self, grid: Grid, initial_direction: Direction, probe_id: str = None, initial_position: Position = Position(0, 0)):
+    def __init__(self, grid: Grid, initial_direction: Direction, probe_id: str = None, initial_position: Position = Position(0, 0),
+                 plateau_name: Optional[str] = None, version: int = 0):
 
         if not grid.is_valid_position(initial_position):
             raise InvalidMoveError(f"A posição inicial {initial_position} está fora da malha.")
@@ -38,6 +45,11 @@ class Probe:
         self.position: Position = initial_position
         self.direction_state: IDirectionState = DIRECTION_STATE_MAP[initial_direction]
         self.grid: Grid = grid
+        # Nome do planalto compartilhado (persistido) e o índice de ocupação dele, anexado pelo serviço.
+        self.plateau_name: Optional[str] = plateau_name
+        self.occupancy: Optional['Plateau'] = None
+        # Versão lida do armazenamento; a gravação condicional só acontece se ela ainda for a atual.
+        self.version: int = version
 
     @property
     def current_direction(self) -> Direction:
@@ -45,11 +57,13 @@ class Probe:
 
     def turn_left(self):
         self.direction_state = self.direction_state.turn_left()
-        print(f"Sonda {self.id} virou para a esquerda. Nova direção: {self.current_direction.value}")
+        if events.enabled(DEBUG):
+            events.debug("probe.turned_left", probe_id=self.id, direction=self.current_direction.value)
 
     def turn_right(self):
         self.direction_state = self.direction_state.turn_right()
-        print(f"Sonda {self.id} virou para a direita. Nova direção: {self.current_direction.value}")
+        if events.enabled(DEBUG):
+            events.debug("probe.turned_right", probe_id=self.id, direction=self.current_direction.value)
 
     def move(self):
         next_x, next_y = self.direction_state.move(self.position.x, self.position.y)
@@ -57,6 +71,92 @@ class Probe:
 
         if not self.grid.is_valid_position(next_position):
             raise InvalidMoveError(f"Movimento para {next_position} é inválido e ultrapassa os limites da malha.")
+        if self.occupancy is not None and self.occupancy.is_occupied(next_position):
+            raise InvalidMoveError(f"Movimento para {next_position} é inválido: a posição está ocupada por outra sonda.")
 
+        if self.occupancy is not None:
+            self.occupancy.relocate(self.position, next_position)
         self.position = next_position
-        print(f"Sonda {self.id} moveu-se para {self.position}. Direção: {self.current_direction.value}")
\ No newline at end of file
+        if events.enabled(DEBUG):
+            events.debug("probe.moved", probe_id=self.id, x=self.position.x, y=self.position.y,
+                         direction=self.current_direction.value)
+
+    def execute(self, commands: str, cache: bool = True):
+        """
+        Executa a sequência inteira de comandos de uma só vez, a partir da sua
+        transformação compilada. Se algum passo sair da malha (ou, em um planalto
+        compartilhado, entrar em uma célula ocupada), a sonda não é alterada.
+        Trechos que não se repetem (como os de uma fita longa) devem usar `cache=False`.
+        """
+        compiled = compile_commands(commands) if cache else compile_uncached(commands)
+        start = DIRECTION_INDEX[self.current_direction]
+        min_x, min_y, max_x, max_y = compiled.bounds(start)
+        x, y = self.position.x, self.position.y
+
+        lower_corner = Position(x=x + min_x, y=y + min_y)
+        upper_corner = Position(x=x + max_x, y=y + max_y)
+        if not (self.grid.is_valid_position(lower_corner) and self.grid.is_valid_position(upper_corner)):
+            next_position = self._first_invalid_position(commands)
+            raise InvalidMoveError(f"Movimento para {next_position} é inválido e ultrapassa os limites da malha.")
+
+        dx, dy = compiled.displacement(start)
+        final_position = Position(x=x + dx, y=y + dy)
+        if self.occupancy is not None:
+            # Com outras sondas no planalto, cada passo precisa ser conferido no índice de ocupação.
+            if self.occupancy.occupied_count > 1:
+                self._check_collisions(commands)
+            self.occupancy.relocate(self.position, final_position)
+        self.position = final_position
+        self.direction_state = DIRECTION_STATE_MAP[DIRECTION_ORDER[(start + compiled.rotation) % 4]]
+        if events.enabled(DEBUG):
+            events.debug("probe.executed", probe_id=self.id, commands=len(commands), x=self.position.x,
+                         y=self.position.y, direction=self.current_direction.value)
+
+    def place(self, position: Position, direction: Direction) -> None:
+        """Aplica uma pose já validada fora da sonda (ex.: calculada em outro processo)."""
+        if self.occupancy is not None:
+            self.occupancy.relocate(self.position, position)
+        self.position = position
+        self.direction_state = DIRECTION_STATE_MAP[direction]
+
+    def step(self, command: str) -> None:
+        """Executa um único comando (L, R ou M)."""
+        if command == 'L':
+            self.turn_left()
+        elif command == 'R':
+            self.turn_right()
+        else:
+            self.move()
+
+    def _check_collisions(self, commands: str) -> None:
+        """Percorre o caminho consultando o índice de ocupação; a célula inicial pertence à própria sonda."""
+        heading = DIRECTION_INDEX[self.current_direction]
+        x, y = self.position.x, self.position.y
+        for command in commands:
+            if command == 'L':
+                heading = (heading - 1) % 4
+            elif command == 'R':
+                heading = (heading + 1) % 4
+            else:
+                step_x, step_y = DIRECTION_VECTORS[heading]
+                x, y = x + step_x, y + step_y
+                next_position = Position(x=x, y=y)
+                if next_position != self.position and self.occupancy.is_occupied(next_position):
+                    raise InvalidMoveError(f"Movimento para {next_position} é inválido: a posição está ocupada por outra sonda.")
+
+    def _first_invalid_position(self, commands: str) -> Position:
+        """Refaz o caminho passo a passo para encontrar a primeira posição fora da malha."""
+        heading = DIRECTION_INDEX[self.current_direction]
+        x, y = self.position.x, self.position.y
+        for command in commands:
+            if command == 'L':
+                heading = (heading - 1) % 4
+            elif command == 'R':
+                heading = (heading + 1) % 4
+            else:
+                step_x, step_y = DIRECTION_VECTORS[heading]
+                x, y = x + step_x, y + step_y
+                next_position = Position(x=x, y=y)
+                if not self.grid.is_valid_position(next_position):
+                    return next_position
+        raise AssertionError("A caixa do caminho excede a malha, mas nenhum passo é inválido.")
@@ -0,0 +1,191 @@
+import bisect
+import heapq
+import itertools
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AbstractSet, Optional
+
+from app.domain.commands import DIRECTION_INDEX, DIRECTION_VECTORS
+from app.domain.models import Grid, InvalidMoveError, Position
+from app.domain.state import Direction
+
+PLAN_CACHE_SIZE = 1024
+
+# Limite de estados expandidos pelo A*; acima dele o planejamento desiste.
+MAX_PLAN_EXPANSIONS = 2_000_000
+
+CLOSED_FORM = "closed_form"
+ASTAR = "astar"
+
+# Comandos para girar de uma direção para outra, indexados pela diferença (destino - origem) % 4.
+_TURNS = ("", "R", "RR", "L")
+
+Legs = tuple[tuple[int, int], ...]
+
+
+class NoPathError(InvalidMoveError):
+    pass
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Sequência de comandos mais curta até o alvo e o algoritmo que a encontrou."""
+    commands: str
+    algorithm: str
+
+
+def _legs(x: int, y: int, goal_x: int, goal_y: int) -> list[Legs]:
+    """
+    Ordens possíveis dos trechos retos (direção, passos) até o alvo: sem obstáculos,
+    um caminho mínimo anda só nas direções que aproximam do alvo e gira no máximo
+    uma vez entre elas, então basta comparar "X antes de Y" com "Y antes de X".
+    """
+    legs = []
+    if goal_x != x:
+        legs.append((1 if goal_x > x else 3, abs(goal_x - x)))
+    if goal_y != y:
+        legs.append((0 if goal_y > y else 2, abs(goal_y - y)))
+    return [tuple(legs), tuple(reversed(legs))] if len(legs) == 2 else [tuple(legs)]
+
+
+def _leg_commands(heading: int, legs: Legs, goal_heading: Optional[int]) -> str:
+    commands = []
+    for direction, steps in legs:
+        commands.append(_TURNS[(direction - heading) % 4] + "M" * steps)
+        heading = direction
+    if goal_heading is not None:
+        commands.append(_TURNS[(goal_heading - heading) % 4])
+    return "".join(commands)
+
+
+def _leg_cost(heading: int, legs: Legs, goal_heading: Optional[int]) -> int:
+    cost = 0
+    for direction, steps in legs:
+        cost += len(_TURNS[(direction - heading) % 4]) + steps
+        heading = direction
+    if goal_heading is not None:
+        cost += len(_TURNS[(goal_heading - heading) % 4])
+    return cost
+
+
+def _relaxed_cost(x: int, y: int, heading: int, goal_x: int, goal_y: int, goal_heading: Optional[int]) -> int:
+    """Custo exato na malha vazia; com obstáculos, nunca superestima (heurística admissível e consistente)."""
+    return min(_leg_cost(heading, legs, goal_heading) for legs in _legs(x, y, goal_x, goal_y))
+
+
+def _leg_is_clear(x: int, y: int, legs: Legs, obstacles: AbstractSet[tuple[int, int]]) -> bool:
+    """Confere cada obstáculo contra os trechos retos, sem percorrer as células do caminho."""
+    for direction, steps in legs:
+        step_x, step_y = DIRECTION_VECTORS[direction]
+        end_x, end_y = x + step_x * steps, y + step_y * steps
+        low_x, high_x = sorted((x + step_x, end_x))
+        low_y, high_y = sorted((y + step_y, end_y))
+        if any(low_x <= ox <= high_x and low_y <= oy <= high_y for ox, oy in obstacles):
+            return False
+        x, y = end_x, end_y
+    return True
+
+
+def _axis(limit: int, fixed: tuple[int, ...], obstacle_values) -> list[int]:
+    values = set(fixed)
+    for value in obstacle_values:
+        values.update((value - 1, value, value + 1))
+    return sorted(value for value in values if 0 <= value <= limit)
+
+
+def _astar(grid: Grid, start: tuple[int, int, int], goal_x: int, goal_y: int, goal_heading: Optional[int],
+           obstacles: AbstractSet[tuple[int, int]], max_expansions: int) -> str:
+    """
+    A* sobre (x, y, direção) em uma malha comprimida: só as linhas e colunas da
+    origem, do alvo, das bordas e das vizinhas de cada obstáculo. Deslizar um
+    trecho reto de um caminho mínimo até encostar em um obstáculo (ou na borda)
+    não aumenta o custo, então sempre há um caminho mínimo sobre essas linhas.
+    Entre duas linhas vizinhas não há obstáculo, e um passo da malha comprimida
+    vale tantos comandos M quanto a distância entre elas. Em empates de custo
+    estimado, expande primeiro o estado mais distante da origem.
+    """
+    x, y, heading = start
+    xs = _axis(grid.max_x, (0, grid.max_x, x, goal_x), (ox for ox, _ in obstacles))
+    ys = _axis(grid.max_y, (0, grid.max_y, y, goal_y), (oy for _, oy in obstacles))
+    start = (bisect.bisect_left(xs, x), bisect.bisect_left(ys, y), heading)
+
+    counter = itertools.count()
+    best = {start: 0}
+    came_from: dict[tuple[int, int, int], tuple[tuple[int, int, int], str]] = {}
+    frontier = [(_relaxed_cost(x, y, heading, goal_x, goal_y, goal_heading), 0, next(counter), start)]
+    expanded: set[tuple[int, int, int]] = set()
+
+    while frontier:
+        _, _, _, state = heapq.heappop(frontier)
+        if state in expanded:
+            continue
+        i, j, heading = state
+        x, y = xs[i], ys[j]
+        if x == goal_x and y == goal_y and (goal_heading is None or heading == goal_heading):
+            commands = []
+            while state in came_from:
+                state, command = came_from[state]
+                commands.append(command)
+            return "".join(reversed(commands))
+
+        expanded.add(state)
+        if len(expanded) > max_expansions:
+            raise NoPathError(f"O planejamento excedeu o limite de {max_expansions} estados.")
+
+        neighbours = [((i, j, (heading - 1) % 4), "L", 1), ((i, j, (heading + 1) % 4), "R", 1)]
+        step_x, step_y = DIRECTION_VECTORS[heading]
+        next_i, next_j = i + step_x, j + step_y
+        if 0 <= next_i < len(xs) and 0 <= next_j < len(ys) and (xs[next_i], ys[next_j]) not in obstacles:
+            steps = abs(xs[next_i] - x) + abs(ys[next_j] - y)
+            neighbours.append(((next_i, next_j, heading), "M" * steps, steps))
+        for neighbour, command, step_cost in neighbours:
+            cost = best[state] + step_cost
+            if cost < best.get(neighbour, cost + 1):
+                best[neighbour] = cost
+                came_from[neighbour] = (state, command)
+                next_i, next_j, next_heading = neighbour
+                estimate = cost + _relaxed_cost(xs[next_i], ys[next_j], next_heading, goal_x, goal_y, goal_heading)
+                heapq.heappush(frontier, (estimate, -cost, next(counter), neighbour))
+
+    raise NoPathError(f"Não há caminho até ({goal_x}, {goal_y}) que evite as células ocupadas.")
+
+
+def plan_path(grid: Grid, start: Position, heading: Direction, goal: Position,
+              goal_heading: Optional[Direction] = None,
+              obstacles: AbstractSet[tuple[int, int]] = frozenset(),
+              max_expansions: int = MAX_PLAN_EXPANSIONS) -> Plan:
+    """
+    Sequência de comandos mais curta da pose inicial até `goal` (e `goal_heading`, se
+    informada), sem passar pelas células (x, y) de `obstacles`. Se um caminho em "L"
+    mínimo estiver livre, a resposta é a fórmula fechada; caso contrário, A*. A célula
+    inicial nunca é considerada bloqueada, pois é ocupada pela própria sonda.
+    """
+    if not grid.is_valid_position(goal):
+        raise InvalidMoveError(f"O alvo {goal} está fora da malha.")
+
+    x, y, start_heading = start.x, start.y, DIRECTION_INDEX[heading]
+    goal_index = DIRECTION_INDEX[goal_heading] if goal_heading is not None else None
+    if (x, y) in obstacles:
+        obstacles = obstacles - {(x, y)}
+    if (goal.x, goal.y) in obstacles:
+        raise NoPathError(f"O alvo {goal} está ocupado.")
+
+    candidates = sorted(_legs(x, y, goal.x, goal.y), key=lambda legs: _leg_cost(start_heading, legs, goal_index))
+    minimum = _leg_cost(start_heading, candidates[0], goal_index)
+    for legs in candidates:
+        if _leg_cost(start_heading, legs, goal_index) == minimum and (
+                not obstacles or _leg_is_clear(x, y, legs, obstacles)):
+            return Plan(_leg_commands(start_heading, legs, goal_index), CLOSED_FORM)
+
+    commands = _astar(grid, (x, y, start_heading), goal.x, goal.y, goal_index, obstacles, max_expansions)
+    return Plan(commands, ASTAR)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def plan_cached(max_x: int, max_y: int, start: Position, heading: Direction, goal: Position,
+                goal_heading: Optional[Direction] = None, obstacles: frozenset[tuple[int, int]] = frozenset()) -> Plan:
+    """
+    `plan_path` com cache por (malha, pose inicial, alvo, obstáculos). Só serve para
+    obstáculos fixos: células ocupadas por outras sondas mudam a cada movimento.
+    """
+    return plan_path(Grid(max_x, max_y), start, heading, goal, goal_heading, obstacles)
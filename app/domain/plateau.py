@@ -0,0 +1,83 @@
+import threading
+
+from app.domain.models import Grid, InvalidMoveError, Position
+
+# Malhas com até esta quantidade de células usam um bitmap (1 bit por célula, 128 KiB no máximo);
+# malhas maiores usam um conjunto com apenas as células ocupadas.
+BITMAP_MAX_CELLS = 1 << 20
+
+
+class CellOccupiedError(InvalidMoveError):
+    pass
+
+
+class Plateau:
+    """
+    Planalto compartilhado por várias sondas. Mantém um índice das células ocupadas,
+    com consulta O(1), para que uma sonda não entre na célula de outra.
+
+    As operações do índice não são atômicas entre si: quem lê uma sonda, a move e
+    atualiza o índice deve fazê-lo segurando `lock`.
+    """
+    def __init__(self, name: str, grid: Grid):
+        self.name = name
+        self.grid = grid
+        self.lock = threading.RLock()
+        self._width = grid.max_x + 1
+        cells = self._width * (grid.max_y + 1)
+        self._bitmap = bytearray((cells + 7) // 8) if cells <= BITMAP_MAX_CELLS else None
+        self._cells: set[tuple[int, int]] = set()
+        self._count = 0
+
+    @property
+    def occupied_count(self) -> int:
+        return self._count
+
+    def is_occupied(self, position: Position) -> bool:
+        if self._bitmap is not None:
+            index = position.y * self._width + position.x
+            return bool(self._bitmap[index >> 3] & (1 << (index & 7)))
+        return (position.x, position.y) in self._cells
+
+    def occupied_cells(self) -> set[tuple[int, int]]:
+        """Cópia das células (x, y) ocupadas; no bitmap, percorre só os bytes não nulos."""
+        if self._bitmap is None:
+            return set(self._cells)
+        cells = set()
+        for byte_index, byte in enumerate(self._bitmap):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        index = (byte_index << 3) + bit
+                        cells.add((index % self._width, index // self._width))
+        return cells
+
+    def _set(self, position: Position, occupied: bool) -> None:
+        if self._bitmap is not None:
+            index = position.y * self._width + position.x
+            if occupied:
+                self._bitmap[index >> 3] |= 1 << (index & 7)
+            else:
+                self._bitmap[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        elif occupied:
+            self._cells.add((position.x, position.y))
+        else:
+            self._cells.discard((position.x, position.y))
+
+    def occupy(self, position: Position) -> None:
+        if not self.grid.is_valid_position(position):
+            raise InvalidMoveError(f"A posição {position} está fora do planalto '{self.name}'.")
+        if self.is_occupied(position):
+            raise CellOccupiedError(f"A posição {position} do planalto '{self.name}' já está ocupada.")
+        self._set(position, True)
+        self._count += 1
+
+    def vacate(self, position: Position) -> None:
+        if self.is_occupied(position):
+            self._set(position, False)
+            self._count -= 1
+
+    def relocate(self, old: Position, new: Position) -> None:
+        if old != new:
+            self.vacate(old)
+            self.occupy(new)
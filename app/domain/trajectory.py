@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+
+from app.domain.commands import DIRECTION_INDEX, DIRECTION_ORDER, compile_uncached
+from app.domain.models import Position
+from app.domain.state import Direction
+
+# Cada byte codifica uma sequência de comandos iguais: 2 bits para o comando e 6 bits para a repetição (1-63).
+_COMMAND_BITS = {'L': 1, 'R': 2, 'M': 3}
+_BITS_COMMAND = {code: command for command, code in _COMMAND_BITS.items()}
+MAX_RUN_LENGTH = 63
+
+
+def encode_commands(commands: str) -> bytes:
+    """Codifica a sequência em run-length: 'MMMMRMM' ocupa 3 bytes."""
+    encoded = bytearray()
+    offset = 0
+    while offset < len(commands):
+        command = commands[offset]
+        run = 1
+        while run < MAX_RUN_LENGTH and offset + run < len(commands) and commands[offset + run] == command:
+            run += 1
+        encoded.append(_COMMAND_BITS[command] << 6 | run)
+        offset += run
+    return bytes(encoded)
+
+
+def decode_commands(encoded: bytes, limit: int = -1) -> str:
+    """Decodifica a sequência. Com `limit`, devolve apenas os primeiros `limit` comandos."""
+    parts = []
+    remaining = limit
+    for byte in encoded:
+        run = byte & MAX_RUN_LENGTH
+        if 0 <= remaining < run:
+            run = remaining
+        parts.append(_BITS_COMMAND[byte >> 6] * run)
+        if remaining >= 0:
+            remaining -= run
+            if remaining == 0:
+                break
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class TrajectorySegment:
+    """
+    Trecho do histórico de uma sonda: a pose antes do trecho (checkpoint) e os
+    `count` comandos executados a partir do comando de número `start_seq`.
+    """
+    probe_id: str
+    start_seq: int
+    count: int
+    x: int
+    y: int
+    direction: Direction
+    commands: bytes
+
+    @property
+    def end_seq(self) -> int:
+        return self.start_seq + self.count
+
+    def pose_at(self, seq: int) -> tuple[Position, Direction]:
+        """Pose depois de `seq` comandos, refazendo apenas o necessário deste trecho."""
+        if not self.start_seq <= seq <= self.end_seq:
+            raise ValueError(f"A posição {seq} não pertence ao trecho {self.start_seq}-{self.end_seq}.")
+        compiled = compile_uncached(decode_commands(self.commands, seq - self.start_seq))
+        x, y, heading = compiled.apply(self.x, self.y, DIRECTION_INDEX[self.direction])
+        return Position(x=x, y=y), DIRECTION_ORDER[heading]
+
+
+def build_segments(probe_id: str, start_seq: int, position: Position, direction: Direction,
+                   commands: str, checkpoint_interval: int) -> list[TrajectorySegment]:
+    """
+    Divide os comandos executados em trechos de até `checkpoint_interval` comandos,
+    cada um com o checkpoint da pose no seu início. Sem comandos, não gera trechos.
+    """
+    segments = []
+    if not commands:
+        return segments
+    x, y, heading = position.x, position.y, DIRECTION_INDEX[direction]
+    offset = 0
+    while True:
+        chunk = commands[offset:offset + checkpoint_interval]
+        segments.append(TrajectorySegment(
+            probe_id=probe_id,
+            start_seq=start_seq + offset,
+            count=len(chunk),
+            x=x,
+            y=y,
+            direction=DIRECTION_ORDER[heading],
+            commands=encode_commands(chunk),
+        ))
+        offset += len(chunk)
+        if offset >= len(commands):
+            return segments
+        x, y, heading = compile_uncached(chunk).apply(x, y, heading)
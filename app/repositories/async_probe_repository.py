@@ -0,0 +1,108 @@
+import copy
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from app.domain.models import Probe
+
+
+class IAsyncProbeRepository(ABC):
+    """Interface assíncrona para o armazenamento de sondas, equivalente a `IProbeRepository`."""
+    @abstractmethod
+    async def save(self, probe: Probe) -> None:
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        pass
+
+    @abstractmethod
+    async def get_all(self) -> list[Probe]:
+        pass
+
+    @abstractmethod
+    async def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        """Paginação por cursor: até `limit` sondas com ID maior que `after`, ordenadas por ID."""
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 500) -> AsyncIterator[Probe]:
+        """Percorre todas as sondas, ordenadas por ID, sem carregá-las todas na memória."""
+        pass
+
+    @abstractmethod
+    async def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        """Busca várias sondas de uma vez. IDs inexistentes ficam de fora do resultado."""
+        pass
+
+    @abstractmethod
+    async def save_many(self, probes: list[Probe]) -> None:
+        """Salva várias sondas em uma única transação: ou todas são gravadas, ou nenhuma."""
+        pass
+
+    @abstractmethod
+    async def add_many(self, probes: list[Probe]) -> list[str]:
+        """Insere sondas novas em lote e retorna seus IDs, na mesma ordem."""
+        pass
+
+    @abstractmethod
+    async def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        """Compare-and-swap por versão, como `IProbeRepository.save_if_unchanged`."""
+        pass
+
+
+class AsyncInMemoryProbeRepository(IAsyncProbeRepository):
+    """
+    Implementação assíncrona em memória, usada principalmente em testes.
+    Guarda e devolve cópias, como `InMemoryProbeRepository`. Nenhum método
+    aguarda nada, então cada um roda inteiro no event loop, sem locks.
+    """
+    def __init__(self):
+        self._probes: dict[str, Probe] = {}
+
+    def _store(self, probes: list[Probe]) -> None:
+        for probe in probes:
+            current = self._probes.get(probe.id)
+            snapshot = copy.copy(probe)
+            snapshot.version = current.version + 1 if current else probe.version
+            self._probes[probe.id] = snapshot
+
+    async def save(self, probe: Probe) -> None:
+        self._store([probe])
+
+    async def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        probe = self._probes.get(probe_id)
+        return copy.copy(probe) if probe else None
+
+    async def get_all(self) -> list[Probe]:
+        return [copy.copy(probe) for probe in self._probes.values()]
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        ids = sorted(probe_id for probe_id in self._probes if after is None or probe_id > after)
+        return [copy.copy(self._probes[probe_id]) for probe_id in ids[:limit]]
+
+    async def iter_all(self, batch_size: int = 500) -> AsyncIterator[Probe]:
+        for probe_id in sorted(self._probes):
+            probe = self._probes.get(probe_id)
+            if probe:
+                yield copy.copy(probe)
+
+    async def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        return {probe_id: copy.copy(self._probes[probe_id]) for probe_id in probe_ids if probe_id in self._probes}
+
+    async def save_many(self, probes: list[Probe]) -> None:
+        self._store(probes)
+
+    async def add_many(self, probes: list[Probe]) -> list[str]:
+        self._store(probes)
+        return [probe.id for probe in probes]
+
+    async def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        unique = {probe.id: probe for probe in probes}
+        for probe_id, probe in unique.items():
+            current = self._probes.get(probe_id)
+            if current is None or current.version != probe.version:
+                return False
+        for probe_id, probe in unique.items():
+            probe.version += 1
+            self._probes[probe_id] = copy.copy(probe)
+        return True
@@ -0,0 +1,115 @@
+from typing import AsyncIterator, Dict, Optional, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .async_probe_repository import IAsyncProbeRepository
+from .database_models import ProbeDB
+from .sqlalchemy_probe_repository import (
+    CAS_UPDATE, apply_to_db, cas_rows, chunked, fleet_bump_fallback, fleet_bump_statement,
+    to_domain, to_row, upsert_rows, upsert_statement,
+)
+from app.domain.models import Probe
+
+
+class AsyncSQLAlchemyProbeRepository(IAsyncProbeRepository):
+    """
+    Implementação assíncrona do repositório com SQLAlchemy. O driver (aiosqlite,
+    asyncpg, ...) vem da URL configurada em ASYNC_DATABASE_URL.
+    """
+
+    def __init__(self, db_session_factory: async_sessionmaker):
+        self.db_session_factory = db_session_factory
+
+    async def _fetch_many(self, db: AsyncSession, probe_ids: List[str]) -> Dict[str, ProbeDB]:
+        found: Dict[str, ProbeDB] = {}
+        for chunk in chunked(probe_ids):
+            result = await db.scalars(select(ProbeDB).where(ProbeDB.id.in_(chunk)))
+            for probe_db in result:
+                found[probe_db.id] = probe_db
+        return found
+
+    @staticmethod
+    async def _bump_fleet(db: AsyncSession) -> None:
+        """Incrementa a versão da frota na transação de `db`, para que as listagens da pilha síncrona vejam a gravação."""
+        statement = fleet_bump_statement(db.get_bind().dialect.name)
+        if statement is not None:
+            await db.execute(statement)
+        else:
+            connection = await db.connection()
+            await connection.run_sync(fleet_bump_fallback)
+
+    async def save(self, probe: Probe) -> None:
+        await self.save_many([probe])
+
+    async def save_many(self, probes: List[Probe]) -> None:
+        if not probes:
+            return
+        async with self.db_session_factory() as db:
+            statement = upsert_statement(db.get_bind().dialect.name)
+            if statement is not None:
+                await db.execute(statement, upsert_rows(probes))
+            else:
+                existing = await self._fetch_many(db, [probe.id for probe in probes])
+                for probe in probes:
+                    existing[probe.id] = apply_to_db(db, probe, existing.get(probe.id))
+                await db.flush()
+            await self._bump_fleet(db)
+            await db.commit()
+
+    async def save_if_unchanged(self, probes: List[Probe]) -> bool:
+        if not probes:
+            return True
+        rows = cas_rows(probes)
+        async with self.db_session_factory() as db:
+            connection = await db.connection()
+            if connection.dialect.supports_sane_multi_rowcount:
+                updated = (await connection.execute(CAS_UPDATE, rows)).rowcount
+            else:
+                updated = sum([(await connection.execute(CAS_UPDATE, row)).rowcount for row in rows])
+            if updated != len(rows):
+                await db.rollback()
+                return False
+            await self._bump_fleet(db)
+            await db.commit()
+        for probe in {probe.id: probe for probe in probes}.values():
+            probe.version += 1
+        return True
+
+    async def add_many(self, probes: List[Probe]) -> List[str]:
+        rows = [to_row(probe) for probe in probes]
+        if rows:
+            async with self.db_session_factory() as db:
+                await db.execute(insert(ProbeDB), rows)
+                await self._bump_fleet(db)
+                await db.commit()
+        return [row["id"] for row in rows]
+
+    async def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        async with self.db_session_factory() as db:
+            probe_db = await db.get(ProbeDB, probe_id)
+            if probe_db:
+                return to_domain(probe_db)
+            return None
+
+    async def get_all(self) -> List[Probe]:
+        async with self.db_session_factory() as db:
+            result = await db.scalars(select(ProbeDB))
+            return [to_domain(p) for p in result]
+
+    async def get_page(self, limit: int, after: Optional[str] = None) -> List[Probe]:
+        query = select(ProbeDB).order_by(ProbeDB.id).limit(limit)
+        if after is not None:
+            query = query.where(ProbeDB.id > after)
+        async with self.db_session_factory() as db:
+            return [to_domain(p) for p in await db.scalars(query)]
+
+    async def iter_all(self, batch_size: int = 500) -> AsyncIterator[Probe]:
+        query = select(ProbeDB).order_by(ProbeDB.id).execution_options(yield_per=batch_size)
+        async with self.db_session_factory() as db:
+            async for probe_db in await db.stream_scalars(query):
+                yield to_domain(probe_db)
+
+    async def get_many(self, probe_ids: List[str]) -> Dict[str, Probe]:
+        async with self.db_session_factory() as db:
+            return {probe_id: to_domain(p) for probe_id, p in (await self._fetch_many(db, probe_ids)).items()}
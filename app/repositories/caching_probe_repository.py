@@ -0,0 +1,238 @@
+import copy
+import threading
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from app.core.events import events
+from app.domain.models import Probe
+from .probe_repository import FleetVersion, IProbeRepository
+
+
+class CachingProbeRepository(IProbeRepository):
+    """
+    Decorator write-behind sobre outro IProbeRepository (normalmente o SQLAlchemyProbeRepository).
+
+    - As leituras são servidas de um LRU com até `max_entries` sondas.
+    - Cada `save` só altera a memória e marca a sonda como suja. As sondas sujas são
+      gravadas no repositório interno em um único `save_many`, a cada `flush_interval`
+      segundos ou assim que `flush_threshold` sondas estiverem sujas. Uma gravação
+      aceita não falha por causa do flush: o erro é registrado e as sondas continuam
+      sujas para o próximo flush periódico.
+    - Com `max_dirty` sondas sujas (o repositório interno está falhando), cada nova
+      gravação tenta um flush antes de ser aceita e, se ele falhar, é recusada com o erro.
+    - `close()` grava tudo o que estiver pendente; deve ser chamado no desligamento.
+
+    Limite de perda em caso de queda do processo: apenas as alterações ainda não
+    gravadas, ou seja, normalmente até `flush_threshold` sondas e os últimos
+    `flush_interval` segundos de movimentos (mais a duração de um flush em andamento).
+    Com o repositório interno falhando, até `max_dirty` sondas.
+    """
+    def __init__(self, inner: IProbeRepository, max_entries: int = 10_000,
+                 flush_interval: float = 1.0, flush_threshold: int = 500, max_dirty: int = 5000):
+        self._inner = inner
+        self._max_entries = max_entries
+        self._flush_threshold = flush_threshold
+        self._max_dirty = max(max_dirty, flush_threshold)
+        self._entries: OrderedDict[str, Probe] = OrderedDict()
+        self._dirty: dict[str, Probe] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # As leituras passam pelo cache, então a versão da frota é a das gravações feitas nele.
+        self._fleet = FleetVersion()
+
+        if flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, args=(flush_interval,), name="probe-cache-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _remember(self, probe: Probe) -> None:
+        """Coloca a sonda no LRU, descartando as menos usadas. Deve ser chamado com o lock."""
+        self._entries[probe.id] = probe
+        self._entries.move_to_end(probe.id)
+        while len(self._entries) > self._max_entries:
+            # Sondas sujas continuam em `_dirty` até o flush, então podem sair do LRU.
+            self._entries.popitem(last=False)
+
+    def _lookup(self, probe_id: str) -> Optional[Probe]:
+        """Busca na memória. Deve ser chamado com o lock."""
+        probe = self._dirty.get(probe_id)
+        if probe is None:
+            probe = self._entries.get(probe_id)
+            if probe is not None:
+                self._entries.move_to_end(probe_id)
+        return probe
+
+    def warm(self) -> int:
+        """Preenche o LRU com as primeiras `max_entries` sondas do repositório interno. Retorna quantas."""
+        loaded = 0
+        for probe in self._inner.iter_all():
+            if loaded >= self._max_entries:
+                break
+            with self._lock:
+                if probe.id not in self._dirty and probe.id not in self._entries:
+                    self._remember(probe)
+            loaded += 1
+        return loaded
+
+    def save(self, probe: Probe) -> None:
+        self.save_many([probe])
+
+    def save_many(self, probes: list[Probe]) -> None:
+        self._make_room(len(probes))
+        self._load_missing({probe.id for probe in probes})
+        with self._lock:
+            for probe in probes:
+                current = self._lookup(probe.id)
+                snapshot = copy.copy(probe)
+                snapshot.version = current.version + 1 if current else probe.version
+                self._mark_dirty(snapshot)
+            self._fleet.bump()
+            should_flush = len(self._dirty) >= self._flush_threshold
+
+        if should_flush:
+            self._flush_accepted()
+
+    def _load_missing(self, probe_ids) -> None:
+        """
+        Traz para a memória as sondas gravadas que saíram do LRU. As versões que o cache
+        entrega seguem a do repositório interno, e o flush grava a versão do cache (ver
+        IProbeRepository.save_many): assim a versão de uma sonda nunca volta.
+        """
+        with self._lock:
+            missing = [probe_id for probe_id in probe_ids if self._lookup(probe_id) is None]
+        if missing:
+            self.get_many(missing)
+
+    def _make_room(self, count: int) -> None:
+        """Backpressure: com `max_dirty` sondas sujas, grava antes de aceitar mais; um erro recusa a gravação."""
+        if len(self._dirty) + count > self._max_dirty:
+            self.flush()
+
+    def _flush_accepted(self) -> None:
+        """Flush pelo limite, com a gravação já aceita: uma falha fica para o flush periódico."""
+        try:
+            self.flush()
+        except Exception as e:
+            events.error("repository.cache_flush_failed", dirty=self.dirty_count, error=str(e))
+
+    def _mark_dirty(self, snapshot: Probe) -> None:
+        """Deve ser chamado com o lock."""
+        self._dirty[snapshot.id] = snapshot
+        self._remember(snapshot)
+
+    def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        # O cache é a fonte da verdade do processo: a versão é comparada com a da memória.
+        unique = {probe.id: probe for probe in probes}
+        self._make_room(len(unique))
+        self._load_missing(unique)
+
+        with self._lock:
+            for probe_id, probe in unique.items():
+                current = self._lookup(probe_id)
+                if current is None or current.version != probe.version:
+                    return False
+            for probe in unique.values():
+                probe.version += 1
+                self._mark_dirty(copy.copy(probe))
+            self._fleet.bump()
+            should_flush = len(self._dirty) >= self._flush_threshold
+
+        if should_flush:
+            self._flush_accepted()
+        return True
+
+    def add_many(self, probes: list[Probe]) -> list[str]:
+        # Inserções em lote já são uma única escrita; vão direto para o repositório interno.
+        ids = self._inner.add_many(probes)
+        with self._lock:
+            for probe in probes:
+                self._remember(copy.copy(probe))
+            self._fleet.bump()
+        return ids
+
+    def fleet_version(self) -> int:
+        return self._fleet.value
+
+    def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        with self._lock:
+            probe = self._lookup(probe_id)
+        if probe is None:
+            probe = self._inner.get_by_id(probe_id)
+            if probe is None:
+                return None
+            with self._lock:
+                probe = self._lookup(probe_id) or probe
+                self._remember(probe)
+        return copy.copy(probe)
+
+    def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        found: dict[str, Probe] = {}
+        with self._lock:
+            for probe_id in probe_ids:
+                probe = self._lookup(probe_id)
+                if probe is not None:
+                    found[probe_id] = probe
+
+        missing = [probe_id for probe_id in probe_ids if probe_id not in found]
+        if missing:
+            loaded = self._inner.get_many(missing)
+            with self._lock:
+                for probe_id, probe in loaded.items():
+                    probe = self._lookup(probe_id) or probe
+                    self._remember(probe)
+                    found[probe_id] = probe
+
+        return {probe_id: copy.copy(found[probe_id]) for probe_id in probe_ids if probe_id in found}
+
+    def get_all(self) -> list[Probe]:
+        # A listagem completa vem do repositório interno; antes, grava o que estiver pendente.
+        self.flush()
+        return self._inner.get_all()
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        self.flush()
+        return self._inner.get_page(limit, after)
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        self.flush()
+        return self._inner.iter_all(batch_size)
+
+    def flush(self) -> int:
+        """Grava as sondas sujas no repositório interno. Retorna quantas foram gravadas."""
+        with self._flush_lock:
+            with self._lock:
+                pending = dict(self._dirty)
+            if not pending:
+                return 0
+
+            self._inner.save_many(list(pending.values()))
+            events.debug("repository.cache_flushed", count=len(pending))
+
+            with self._lock:
+                for probe_id, probe in pending.items():
+                    # Só limpa se a sonda não foi alterada de novo durante o flush.
+                    if self._dirty.get(probe_id) is probe:
+                        del self._dirty[probe_id]
+            return len(pending)
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # As sondas continuam sujas e serão gravadas na próxima tentativa.
+                events.error("repository.cache_flush_failed", dirty=self.dirty_count, error=str(e))
+
+    def close(self) -> None:
+        """Para o flush periódico e grava tudo o que estiver pendente."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
@@ -1,4 +1,10 @@
-from sqlalchemy import Column, Integer, String
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable
+
+from sqlalchemy import Column, Index, Integer, LargeBinary, String, UniqueConstraint, inspect, text
+from sqlalchemy.engine import Engine
 from app.database import Base
 
 class ProbeDB(Base):
@@ -6,6 +12,8 @@ class ProbeDB(Base):
     Este é o modelo ORM que representa a tabela 'probes' no banco de dados.
     """
     __tablename__ = "probes"
+    # Índice composto para as consultas por região (x entre x0 e x1, y entre y0 e y1).
+    __table_args__ = (Index("ix_probes_x_y", "x", "y"),)
 
     id = Column(String, primary_key=True, index=True)
     x = Column(Integer, nullable=False)
@@ -13,3 +21,127 @@ class ProbeDB(Base):
     direction = Column(String, nullable=False)
     max_x = Column(Integer, nullable=False)
     max_y = Column(Integer, nullable=False)
+    plateau = Column(String, nullable=True, index=True)
+    # Incrementada a cada gravação; usada para o compare-and-swap dos movimentos.
+    version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+
+class FleetStateDB(Base):
+    """
+    Linha única com a versão da frota, incrementada na mesma transação de cada
+    gravação de sondas. Serve de ETag para as listagens, entre processos.
+    """
+    __tablename__ = "fleet_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+
+class TrajectorySegmentDB(Base):
+    """
+    Histórico append-only das sondas: cada linha guarda o checkpoint da pose e um
+    trecho de comandos codificado em run-length (ver app/domain/trajectory.py).
+    """
+    __tablename__ = "probe_trajectory"
+    __table_args__ = (UniqueConstraint("probe_id", "start_seq", name="uq_probe_trajectory_seq"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    probe_id = Column(String, nullable=False)
+    start_seq = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+    x = Column(Integer, nullable=False)
+    y = Column(Integer, nullable=False)
+    direction = Column(String, nullable=False)
+    commands = Column(LargeBinary, nullable=False)
+
+
+def upgrade_schema(engine) -> None:
+    """
+    Acrescenta às tabelas existentes as colunas anuláveis, ou com valor padrão no
+    banco, e os índices criados depois delas (o `create_all` só cria tabelas novas,
+    não altera as que já existem).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                if column.server_default is not None:
+                    not_null = "" if column.nullable else " NOT NULL"
+                    default = column.server_default.arg.text
+                    connection.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{not_null} DEFAULT {default}'
+                    ))
+                elif column.nullable:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+SCHEMA_MODES = {"migrate", "verify"}
+
+_schema_lock = threading.Lock()
+
+
+@contextmanager
+def schema_lock(engine: Engine):
+    """
+    Lock para criar ou alterar o schema uma única vez quando vários workers sobem
+    juntos: um lock de processo e, em bancos SQLite em arquivo, um flock em
+    `<banco>.lock` (onde houver fcntl). Nos demais bancos, as migrações devem ser
+    executadas por um único processo (SCHEMA_INIT=verify nos workers).
+    """
+    with _schema_lock:
+        database = engine.url.database
+        if engine.dialect.name != "sqlite" or database in (None, "", ":memory:"):
+            yield
+            return
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        with open(f"{os.path.abspath(database)}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def missing_schema(engine: Engine) -> list[str]:
+    """Tabelas, colunas e índices do modelo que não existem no banco, como 'tabela' ou 'tabela.coluna'."""
+    inspector = inspect(engine)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            missing.append(table.name)
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(f"{table.name}.{index.name}" for index in table.indexes if index.name not in indexes)
+    return missing
+
+
+def prepare_schema(engines: Iterable[Engine], mode: str = "migrate") -> None:
+    """
+    Chamada na inicialização. "migrate" cria as tabelas e acrescenta as colunas que
+    faltam, sob o `schema_lock`; "verify" apenas confere e falha se faltar algo.
+    """
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"SCHEMA_INIT inválido: '{mode}'. Use {', '.join(sorted(SCHEMA_MODES))}.")
+    for engine in engines:
+        if mode == "migrate":
+            with schema_lock(engine):
+                if missing_schema(engine):
+                    Base.metadata.create_all(bind=engine)
+                    upgrade_schema(engine)
+        missing = missing_schema(engine)
+        if missing:
+            raise RuntimeError(f"Schema incompleto em {engine.url.render_as_string()}: falta {', '.join(missing)}.")
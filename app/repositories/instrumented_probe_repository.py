@@ -0,0 +1,98 @@
+from typing import Iterator, Optional
+
+from app.core.metrics import metrics
+from app.domain.models import Probe
+from .probe_read_model import IProbeReadModel, ProbeView, Region
+from .probe_repository import IProbeRepository
+
+REPOSITORY_SECONDS = "mars_repository_seconds"
+
+
+class InstrumentedProbeRepository(IProbeRepository):
+    """
+    Decorator que mede cada chamada ao repositório interno no histograma
+    mars_repository_seconds, com o backend (nome da classe interna) e o método.
+    `iter_all` não é medido: o tempo dele é o de quem consome o iterador.
+    """
+    def __init__(self, inner: IProbeRepository):
+        self.inner = inner
+        self.backend = type(inner).__name__
+
+    def _timer(self, method: str):
+        return metrics.timer(REPOSITORY_SECONDS, f"repository.{method}", backend=self.backend, method=method)
+
+    def save(self, probe: Probe) -> None:
+        with self._timer("save"):
+            self.inner.save(probe)
+
+    def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        with self._timer("get_by_id"):
+            return self.inner.get_by_id(probe_id)
+
+    def get_all(self) -> list[Probe]:
+        with self._timer("get_all"):
+            return self.inner.get_all()
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        with self._timer("get_page"):
+            return self.inner.get_page(limit, after)
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        return self.inner.iter_all(batch_size)
+
+    def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        with self._timer("get_many"):
+            return self.inner.get_many(probe_ids)
+
+    def save_many(self, probes: list[Probe]) -> None:
+        with self._timer("save_many"):
+            self.inner.save_many(probes)
+
+    def add_many(self, probes: list[Probe]) -> list[str]:
+        with self._timer("add_many"):
+            return self.inner.add_many(probes)
+
+    def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        with self._timer("save_if_unchanged"):
+            return self.inner.save_if_unchanged(probes)
+
+    def fleet_version(self) -> int:
+        with self._timer("fleet_version"):
+            return self.inner.fleet_version()
+
+
+class InstrumentedProbeReadModel(IProbeReadModel):
+    """Como InstrumentedProbeRepository, para as consultas do read model."""
+    def __init__(self, inner: IProbeReadModel):
+        self.inner = inner
+        self.backend = type(inner).__name__
+
+    def _timer(self, method: str):
+        return metrics.timer(REPOSITORY_SECONDS, f"read_model.{method}", backend=self.backend, method=method)
+
+    def get(self, probe_id: str) -> Optional[ProbeView]:
+        with self._timer("get"):
+            return self.inner.get(probe_id)
+
+    def get_all(self) -> list[ProbeView]:
+        with self._timer("get_all"):
+            return self.inner.get_all()
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[ProbeView]:
+        with self._timer("get_page"):
+            return self.inner.get_page(limit, after)
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[ProbeView]:
+        return self.inner.iter_all(batch_size)
+
+    def get_within(self, region: Region, limit: Optional[int] = None, after: Optional[str] = None) -> list[ProbeView]:
+        with self._timer("get_within"):
+            return self.inner.get_within(region, limit, after)
+
+    def get_on_plateau(self, plateau: str) -> list[ProbeView]:
+        with self._timer("get_on_plateau"):
+            return self.inner.get_on_plateau(plateau)
+
+    def fleet_version(self) -> int:
+        with self._timer("fleet_version"):
+            return self.inner.fleet_version()
@@ -0,0 +1,301 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Iterator, Optional
+
+from app.core.events import DEBUG, events
+from app.domain.commands import DIRECTION_INDEX, DIRECTION_ORDER
+from app.domain.models import Grid, Position, Probe
+from .probe_repository import FleetVersion, IProbeRepository
+
+MAGIC = b"MPRB"
+FORMAT_VERSION = 3
+# A versão 2 regravava os registros no lugar, então não tem cópias antigas: é lida como a 3.
+_READABLE_VERSIONS = (2, FORMAT_VERSION)
+MAX_ID_BYTES = 36
+MAX_PLATEAU_BYTES = 64
+
+# Cabeçalho: magic, versão, tamanho do registro, sequência, quantidade de registros e CRC32 dos campos anteriores.
+_HEADER = struct.Struct("<4sHHQQ")
+_HEADER_CRC = struct.Struct("<I")
+_HEADER_SLOT_SIZE = 32
+# Duas cópias do cabeçalho, gravadas alternadamente: se a escrita de uma for interrompida, a outra continua válida.
+DATA_OFFSET = 2 * _HEADER_SLOT_SIZE
+
+# Registro: id, planalto, x, y, max_x, max_y, direção, versão e CRC32 dos campos anteriores.
+_RECORD = struct.Struct("<36s64sqqqqBq")
+_VERSION = struct.Struct("<q")
+_VERSION_OFFSET = _RECORD.size - _VERSION.size
+_RECORD_CRC = struct.Struct("<I")
+RECORD_SIZE = _RECORD.size + _RECORD_CRC.size
+
+
+class CorruptStoreError(Exception):
+    pass
+
+
+def _encode_text(value: Optional[str], limit: int, field: str) -> bytes:
+    raw = (value or "").encode("utf-8")
+    if len(raw) > limit:
+        raise ValueError(f"O campo '{field}' tem {len(raw)} bytes; o limite do arquivo de registros é {limit}.")
+    return raw
+
+
+class MmapProbeRepository(IProbeRepository):
+    """
+    Repositório em um arquivo mapeado em memória, com um registro binário de
+    tamanho fixo (RECORD_SIZE bytes) por sonda. Em memória ficam apenas o índice
+    id -> posição do registro e a lista ordenada de ids; as sondas são montadas a
+    cada leitura, direto do mapeamento.
+
+    Leituras e atualizações acessam um único registro (O(1)). Uma atualização nunca
+    sobrescreve o registro atual da sonda: a nova versão vai para um slot livre (com
+    uma cópia antiga ou corrompida) ou para o final do arquivo, e o slot anterior fica
+    livre. Registros no final só passam a contar depois que o cabeçalho é atualizado.
+    Cada registro tem um CRC32; na abertura, registros corrompidos são ignorados e,
+    entre as cópias de uma sonda, vale a de maior versão. Assim, uma queda no meio de
+    uma gravação perde no máximo essa gravação, nunca a sonda. Além de um registro por
+    sonda, o arquivo guarda no máximo tantos slots livres quanto o maior lote gravado.
+
+    As escritas vão para o cache de páginas do sistema: sobrevivem à queda do
+    processo, e `flush()` (chamado em `close()`) as força para o disco.
+    """
+    def __init__(self, path: str, initial_capacity: int = 1024):
+        self.path = path
+        self._lock = threading.RLock()
+        self._index: dict[str, int] = {}
+        # Slots com cópias antigas ou corrompidas, reaproveitados pelas próximas gravações.
+        self._free: list[int] = []
+        self._sorted_ids: list[str] = []
+        self._sequence = 0
+        self._count = 0
+        self._fleet = FleetVersion()
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(DATA_OFFSET + max(initial_capacity, 1) * RECORD_SIZE)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._capacity = (len(self._mm) - DATA_OFFSET) // RECORD_SIZE
+
+        if exists:
+            self._load()
+        else:
+            self._write_header()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _read_header(self, slot: int) -> Optional[tuple[int, int]]:
+        offset = slot * _HEADER_SLOT_SIZE
+        magic, version, record_size, sequence, count = _HEADER.unpack_from(self._mm, offset)
+        (crc,) = _HEADER_CRC.unpack_from(self._mm, offset + _HEADER.size)
+        if magic != MAGIC or crc != zlib.crc32(self._mm[offset:offset + _HEADER.size]):
+            return None
+        if version not in _READABLE_VERSIONS or record_size != RECORD_SIZE:
+            raise CorruptStoreError(f"O arquivo '{self.path}' usa um formato de registro incompatível (versão {version}).")
+        return sequence, count
+
+    def _write_header(self) -> None:
+        """Grava a próxima sequência na cópia do cabeçalho que não é a mais recente."""
+        self._sequence += 1
+        offset = (self._sequence % 2) * _HEADER_SLOT_SIZE
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_SIZE, self._sequence, self._count)
+        self._mm[offset:offset + _HEADER.size] = header
+        _HEADER_CRC.pack_into(self._mm, offset + _HEADER.size, zlib.crc32(header))
+
+    def _load(self) -> None:
+        headers = [header for header in (self._read_header(0), self._read_header(1)) if header is not None]
+        if not headers:
+            raise CorruptStoreError(f"Nenhum cabeçalho válido em '{self.path}'.")
+        self._sequence, self._count = max(headers)
+
+        for slot in range(min(self._count, self._capacity)):
+            record = self._read_record(slot)
+            if record is None:
+                events.warning("repository.corrupt_record", backend="mmap", path=self.path, slot=slot)
+                self._free.append(slot)
+                continue
+            probe_id = record[0].rstrip(b"\0").decode("utf-8")
+            current = self._index.get(probe_id)
+            if current is not None:
+                if self._stored_version(current) >= record[-1]:
+                    self._free.append(slot)
+                    continue
+                self._free.append(current)
+            self._index[probe_id] = slot
+        self._sorted_ids = sorted(self._index)
+
+    def _read_record(self, slot: int) -> Optional[tuple]:
+        offset = DATA_OFFSET + slot * RECORD_SIZE
+        (crc,) = _RECORD_CRC.unpack_from(self._mm, offset + _RECORD.size)
+        if crc != zlib.crc32(self._mm[offset:offset + _RECORD.size]):
+            return None
+        return _RECORD.unpack_from(self._mm, offset)
+
+    @staticmethod
+    def _pack(probe: Probe, version: int) -> bytes:
+        return _RECORD.pack(
+            _encode_text(probe.id, MAX_ID_BYTES, "id"),
+            _encode_text(probe.plateau_name, MAX_PLATEAU_BYTES, "plateau"),
+            probe.position.x,
+            probe.position.y,
+            probe.grid.max_x,
+            probe.grid.max_y,
+            DIRECTION_INDEX[probe.current_direction],
+            version,
+        )
+
+    def _stored_version(self, slot: int) -> int:
+        return _VERSION.unpack_from(self._mm, DATA_OFFSET + slot * RECORD_SIZE + _VERSION_OFFSET)[0]
+
+    def _write_record(self, slot: int, body: bytes) -> None:
+        offset = DATA_OFFSET + slot * RECORD_SIZE
+        self._mm[offset:offset + _RECORD.size] = body
+        _RECORD_CRC.pack_into(self._mm, offset + _RECORD.size, zlib.crc32(body))
+
+    def _to_domain(self, slot: int) -> Probe:
+        raw_id, raw_plateau, x, y, max_x, max_y, direction, version = _RECORD.unpack_from(self._mm, DATA_OFFSET + slot * RECORD_SIZE)
+        plateau = raw_plateau.rstrip(b"\0").decode("utf-8")
+        return Probe(
+            grid=Grid(max_x=max_x, max_y=max_y),
+            initial_direction=DIRECTION_ORDER[direction],
+            probe_id=raw_id.rstrip(b"\0").decode("utf-8"),
+            initial_position=Position(x=x, y=y),
+            plateau_name=plateau or None,
+            version=version,
+        )
+
+    def _grow(self, needed: int) -> None:
+        """Dobra a capacidade do arquivo até caber `needed` registros. Deve ser chamado com o lock."""
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._mm.flush()
+        self._mm.close()
+        self._file.truncate(DATA_OFFSET + capacity * RECORD_SIZE)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._capacity = capacity
+
+    def _store(self, probes: list[Probe]) -> None:
+        """Gravação incondicional: a versão de uma sonda existente avança (ver IProbeRepository.save_many)."""
+        with self._lock:
+            # Serializa tudo antes de escrever, para que um campo inválido não deixe o lote pela metade.
+            bodies = {}
+            for probe in probes:
+                slot = self._index.get(probe.id)
+                bodies[probe.id] = self._pack(
+                    probe, max(self._stored_version(slot) + 1, probe.version) if slot is not None else probe.version
+                )
+            self._write(bodies)
+
+    def _write(self, bodies: dict[str, bytes]) -> None:
+        """Grava cada registro em um slot livre ou no final, fora do registro atual da sonda. Deve ser chamado com o lock."""
+        slots: dict[str, int] = {}
+        end = self._count
+        for probe_id in bodies:
+            if self._free:
+                slots[probe_id] = self._free.pop()
+            else:
+                slots[probe_id] = end
+                end += 1
+        if end > self._capacity:
+            self._grow(end)
+
+        for probe_id, slot in slots.items():
+            self._write_record(slot, bodies[probe_id])
+        if end > self._count:
+            # Os registros do final são gravados antes do cabeçalho que passa a contá-los.
+            self._count = end
+            self._write_header()
+
+        new_ids = []
+        for probe_id, slot in slots.items():
+            previous = self._index.get(probe_id)
+            if previous is None:
+                new_ids.append(probe_id)
+            else:
+                self._free.append(previous)
+            self._index[probe_id] = slot
+        if new_ids:
+            # A lista já está ordenada; o Timsort só intercala os novos ids.
+            self._sorted_ids.extend(new_ids)
+            self._sorted_ids.sort()
+        self._fleet.bump()
+
+    def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        unique = {probe.id: probe for probe in probes}
+        with self._lock:
+            for probe_id, probe in unique.items():
+                slot = self._index.get(probe_id)
+                if slot is None or self._stored_version(slot) != probe.version:
+                    return False
+            self._write({probe_id: self._pack(probe, probe.version + 1) for probe_id, probe in unique.items()})
+        for probe in unique.values():
+            probe.version += 1
+        return True
+
+    def save(self, probe: Probe) -> None:
+        if events.enabled(DEBUG):
+            events.debug("repository.save", backend="mmap", probe_id=probe.id)
+        self._store([probe])
+
+    def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        if events.enabled(DEBUG):
+            events.debug("repository.get_by_id", backend="mmap", probe_id=probe_id)
+        with self._lock:
+            slot = self._index.get(probe_id)
+            return self._to_domain(slot) if slot is not None else None
+
+    def get_all(self) -> list[Probe]:
+        events.debug("repository.get_all", backend="mmap")
+        with self._lock:
+            return [self._to_domain(slot) for slot in self._index.values()]
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        events.debug("repository.get_page", backend="mmap", limit=limit, after=after)
+        with self._lock:
+            start = bisect.bisect_right(self._sorted_ids, after) if after is not None else 0
+            return [self._to_domain(self._index[probe_id]) for probe_id in self._sorted_ids[start:start + limit]]
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        after = None
+        while True:
+            page = self.get_page(batch_size, after)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after = page[-1].id
+
+    def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        events.debug("repository.get_many", backend="mmap", count=len(probe_ids))
+        with self._lock:
+            return {probe_id: self._to_domain(self._index[probe_id]) for probe_id in probe_ids if probe_id in self._index}
+
+    def save_many(self, probes: list[Probe]) -> None:
+        events.debug("repository.save_many", backend="mmap", count=len(probes))
+        self._store(probes)
+
+    def add_many(self, probes: list[Probe]) -> list[str]:
+        events.debug("repository.add_many", backend="mmap", count=len(probes))
+        self._store(probes)
+        return [probe.id for probe in probes]
+
+    def fleet_version(self) -> int:
+        return self._fleet.value
+
+    def flush(self) -> None:
+        """Força as páginas alteradas para o disco (msync)."""
+        with self._lock:
+            self._mm.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm.closed:
+                return
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
@@ -0,0 +1,104 @@
+import itertools
+from abc import ABC, abstractmethod
+from typing import Iterator, NamedTuple, Optional
+
+from app.domain.models import Probe
+from .probe_repository import IProbeRepository
+
+
+class ProbeView(NamedTuple):
+    """
+    Projeção somente leitura de uma sonda, com os campos de ProbeResponse e a versão
+    (usada como ETag, fora do corpo). Não passa pelo domínio.
+    """
+    id: str
+    x: int
+    y: int
+    direction: str
+    version: int = 0
+
+    @classmethod
+    def from_probe(cls, probe: Probe) -> 'ProbeView':
+        return cls(probe.id, probe.position.x, probe.position.y, probe.current_direction.value, probe.version)
+
+
+class Region(NamedTuple):
+    """Retângulo de consulta, com as bordas incluídas."""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1
+
+
+class IProbeReadModel(ABC):
+    """Consultas das rotas de leitura. As rotas que alteram sondas continuam usando o IProbeRepository."""
+    @abstractmethod
+    def get(self, probe_id: str) -> Optional[ProbeView]:
+        pass
+
+    @abstractmethod
+    def get_all(self) -> list[ProbeView]:
+        pass
+
+    @abstractmethod
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[ProbeView]:
+        """Paginação por cursor, como em IProbeRepository.get_page."""
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 500) -> Iterator[ProbeView]:
+        pass
+
+    @abstractmethod
+    def get_within(self, region: Region, limit: Optional[int] = None, after: Optional[str] = None) -> list[ProbeView]:
+        """Sondas dentro da região, em ordem de ID; com `limit`, paginadas por cursor como em get_page."""
+        pass
+
+    @abstractmethod
+    def get_on_plateau(self, plateau: str) -> list[ProbeView]:
+        """Sondas do planalto compartilhado, em ordem de ID."""
+        pass
+
+    @abstractmethod
+    def fleet_version(self) -> int:
+        """Versão da frota, como em IProbeRepository.fleet_version."""
+        pass
+
+
+class RepositoryProbeReadModel(IProbeReadModel):
+    """
+    Read model sobre um IProbeRepository qualquer. Usado quando as leituras não podem
+    ir direto ao banco: repositório em memória, arquivo mapeado ou cache write-behind
+    com alterações ainda não gravadas.
+    """
+    def __init__(self, repository: IProbeRepository):
+        self.repository = repository
+
+    def get(self, probe_id: str) -> Optional[ProbeView]:
+        probe = self.repository.get_by_id(probe_id)
+        return ProbeView.from_probe(probe) if probe else None
+
+    def get_all(self) -> list[ProbeView]:
+        return [ProbeView.from_probe(p) for p in self.repository.get_all()]
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[ProbeView]:
+        return [ProbeView.from_probe(p) for p in self.repository.get_page(limit, after)]
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[ProbeView]:
+        return (ProbeView.from_probe(p) for p in self.repository.iter_all(batch_size))
+
+    def get_within(self, region: Region, limit: Optional[int] = None, after: Optional[str] = None) -> list[ProbeView]:
+        # Sem índice no armazenamento: percorre a frota (ver SpatialIndex para as consultas em memória).
+        views = (view for view in self.iter_all()
+                 if region.contains(view.x, view.y) and (after is None or view.id > after))
+        return list(itertools.islice(views, limit))
+
+    def get_on_plateau(self, plateau: str) -> list[ProbeView]:
+        # O IProbeRepository não consulta por planalto: percorre a frota, como get_within.
+        return [ProbeView.from_probe(p) for p in self.repository.iter_all() if p.plateau_name == plateau]
+
+    def fleet_version(self) -> int:
+        return self.repository.fleet_version()
@@ -1,6 +1,11 @@
+import copy
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterator, Optional
 
+from app.core.events import DEBUG, events
+from app.core.locks import StripedLock
 from app.domain.models import Probe
 
 class IProbeRepository(ABC):
@@ -17,24 +22,144 @@ class IProbeRepository(ABC):
     def get_all(self) -> list[Probe]:
         pass
 
+    @abstractmethod
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        """Paginação por cursor: até `limit` sondas com ID maior que `after`, ordenadas por ID."""
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        """Percorre todas as sondas, ordenadas por ID, sem carregá-las todas na memória."""
+        pass
+
+    @abstractmethod
+    def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        """Busca várias sondas de uma vez. IDs inexistentes ficam de fora do resultado."""
+        pass
+
+    @abstractmethod
+    def save_many(self, probes: list[Probe]) -> None:
+        """
+        Salva várias sondas em uma única transação: ou todas são gravadas, ou nenhuma.
+        A versão de uma sonda existente passa a ser a maior entre a armazenada + 1 e
+        `probe.version`, para que quem numera as próprias versões (o cache write-behind)
+        grave a versão que já entregou, sem que ela volte depois de uma releitura.
+        """
+        pass
+
+    @abstractmethod
+    def add_many(self, probes: list[Probe]) -> list[str]:
+        """Insere sondas novas em lote e retorna seus IDs, na mesma ordem."""
+        pass
+
+    @abstractmethod
+    def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        """
+        Compare-and-swap: grava as sondas (já existentes) somente se nenhuma foi
+        gravada desde que foi lida, ou seja, se `probe.version` ainda é a versão
+        armazenada. Tudo ou nada. Em caso de sucesso, incrementa `probe.version`.
+        """
+        pass
+
+    @abstractmethod
+    def fleet_version(self) -> int:
+        """Versão da frota: cresce a cada gravação de sondas e nunca volta, nem depois de reiniciar."""
+        pass
+
+
+class FleetVersion:
+    """
+    Contador da versão da frota para repositórios de um único processo. Começa no
+    relógio em microssegundos, para que uma versão anterior a um reinício nunca se
+    repita depois dele (a não ser com mais de um milhão de gravações por segundo).
+    """
+    def __init__(self):
+        self._value = time.time_ns() // 1000
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> None:
+        with self._lock:
+            self._value += 1
+
 
 class InMemoryProbeRepository(IProbeRepository):
     """
     Implementação do repositório que armazena as sondas em um
-    dicionário em memória.
+    dicionário em memória. Guarda e devolve cópias, para que alterações
+    em uma sonda só passem a valer depois do `save`, como em um banco de dados.
+    As gravações bloqueiam apenas a faixa de locks das sondas envolvidas.
     """
     def __init__(self):
         self._probes: dict[str, Probe] = {}
-        print("Repositório em memória inicializado.")
+        self._locks = StripedLock()
+        self._fleet = FleetVersion()
+        events.info("repository.initialized", backend="memory")
 
     def save(self, probe: Probe) -> None:
-        print(f"Salvando sonda com ID: {probe.id}")
-        self._probes[probe.id] = probe
+        if events.enabled(DEBUG):
+            events.debug("repository.save", backend="memory", probe_id=probe.id)
+        self._store([probe])
+
+    def _store(self, probes: list[Probe]) -> None:
+        """Gravação incondicional: a versão de uma sonda existente avança (ver IProbeRepository.save_many)."""
+        with self._locks.hold(probe.id for probe in probes):
+            for probe in probes:
+                current = self._probes.get(probe.id)
+                snapshot = copy.copy(probe)
+                snapshot.version = max(current.version + 1, probe.version) if current else probe.version
+                self._probes[probe.id] = snapshot
+        self._fleet.bump()
 
     def get_by_id(self, probe_id: str) -> Optional[Probe]:
-        print(f"Buscando sonda com ID: {probe_id}")
-        return self._probes.get(probe_id)
+        if events.enabled(DEBUG):
+            events.debug("repository.get_by_id", backend="memory", probe_id=probe_id)
+        probe = self._probes.get(probe_id)
+        return copy.copy(probe) if probe else None
 
     def get_all(self) -> list[Probe]:
-        print("Buscando todas as sondas...")
-        return list(self._probes.values())
\ No newline at end of file
+        events.debug("repository.get_all", backend="memory")
+        return [copy.copy(probe) for probe in self._probes.values()]
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        events.debug("repository.get_page", backend="memory", limit=limit, after=after)
+        ids = sorted(probe_id for probe_id in self._probes if after is None or probe_id > after)
+        return [copy.copy(self._probes[probe_id]) for probe_id in ids[:limit]]
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        for probe_id in sorted(self._probes):
+            probe = self._probes.get(probe_id)
+            if probe:
+                yield copy.copy(probe)
+
+    def get_many(self, probe_ids: list[str]) -> dict[str, Probe]:
+        events.debug("repository.get_many", backend="memory", count=len(probe_ids))
+        return {probe_id: copy.copy(self._probes[probe_id]) for probe_id in probe_ids if probe_id in self._probes}
+
+    def save_many(self, probes: list[Probe]) -> None:
+        events.debug("repository.save_many", backend="memory", count=len(probes))
+        self._store(probes)
+
+    def add_many(self, probes: list[Probe]) -> list[str]:
+        events.debug("repository.add_many", backend="memory", count=len(probes))
+        self._store(probes)
+        return [probe.id for probe in probes]
+
+    def save_if_unchanged(self, probes: list[Probe]) -> bool:
+        unique = {probe.id: probe for probe in probes}
+        with self._locks.hold(unique):
+            for probe_id, probe in unique.items():
+                current = self._probes.get(probe_id)
+                if current is None or current.version != probe.version:
+                    return False
+            for probe_id, probe in unique.items():
+                probe.version += 1
+                self._probes[probe_id] = copy.copy(probe)
+        self._fleet.bump()
+        return True
+
+    def fleet_version(self) -> int:
+        return self._fleet.value
@@ -0,0 +1,37 @@
+import itertools
+from typing import Iterator, List, Optional
+
+from sqlalchemy.engine import Engine
+
+from .probe_read_model import IProbeReadModel, ProbeView, Region
+from .sharded_probe_repository import merge_by_id, shard_for
+from .sqlalchemy_probe_read_model import SQLAlchemyProbeReadModel
+
+
+class ShardedProbeReadModel(IProbeReadModel):
+    """Read model com SQLAlchemy Core sobre os shards, com a mesma distribuição de ShardedProbeRepository."""
+    def __init__(self, engines: List[Engine]):
+        self.shards = [SQLAlchemyProbeReadModel(engine) for engine in engines]
+
+    def get(self, probe_id: str) -> Optional[ProbeView]:
+        return self.shards[shard_for(probe_id, len(self.shards))].get(probe_id)
+
+    def get_all(self) -> list[ProbeView]:
+        return list(self.iter_all())
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[ProbeView]:
+        pages = [shard.get_page(limit, after) for shard in self.shards]
+        return list(itertools.islice(merge_by_id(pages), limit))
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[ProbeView]:
+        return merge_by_id(shard.iter_all(batch_size) for shard in self.shards)
+
+    def get_within(self, region: Region, limit: Optional[int] = None, after: Optional[str] = None) -> list[ProbeView]:
+        matches = [shard.get_within(region, limit, after) for shard in self.shards]
+        return list(itertools.islice(merge_by_id(matches), limit))
+
+    def get_on_plateau(self, plateau: str) -> list[ProbeView]:
+        return list(merge_by_id(shard.get_on_plateau(plateau) for shard in self.shards))
+
+    def fleet_version(self) -> int:
+        return sum(shard.fleet_version() for shard in self.shards)
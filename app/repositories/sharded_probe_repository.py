@@ -0,0 +1,110 @@
+import heapq
+import itertools
+import zlib
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from app.domain.models import Probe
+from .probe_repository import IProbeRepository
+from .sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+
+T = TypeVar("T")
+
+
+def shard_for(probe_id: str, shard_count: int) -> int:
+    """Shard de uma sonda: CRC32 do ID, estável entre processos (ao contrário de hash())."""
+    return zlib.crc32(probe_id.encode()) % shard_count
+
+
+def merge_by_id(sources: Iterable[Iterable[T]], key: Callable[[T], str] = lambda item: item.id) -> Iterator[T]:
+    """Intercala sequências já ordenadas por ID em uma única sequência ordenada."""
+    return heapq.merge(*sources, key=key)
+
+
+class ShardedProbeRepository(IProbeRepository):
+    """
+    Repositório que distribui as sondas entre vários bancos (em geral, arquivos
+    SQLite), pelo hash do ID, para que as gravações não disputem um único lock de
+    escrita. Cada shard é um SQLAlchemyProbeRepository com engine e sessões próprios.
+
+    Gravações que envolvem vários shards abrem uma transação em cada um, na ordem
+    dos shards, e só confirmam quando todos concluíram; uma queda entre os commits
+    ainda pode deixar parte do lote gravada. Listagens e paginação intercalam os
+    shards pela ordem de ID.
+    """
+    def __init__(self, session_factories: List[Callable]):
+        if not session_factories:
+            raise ValueError("É preciso pelo menos um shard.")
+        self.shards = [SQLAlchemyProbeRepository(factory) for factory in session_factories]
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.shards)
+
+    def shard_of(self, probe_id: str) -> SQLAlchemyProbeRepository:
+        return self.shards[shard_for(probe_id, len(self.shards))]
+
+    def _group(self, items: Iterable[T], key: Callable[[T], str]) -> Dict[int, List[T]]:
+        groups: Dict[int, List[T]] = {}
+        for item in items:
+            groups.setdefault(shard_for(key(item), len(self.shards)), []).append(item)
+        return groups
+
+    def _write(self, probes: List[Probe], stage: Callable[[SQLAlchemyProbeRepository, object, List[Probe]], Optional[bool]]) -> bool:
+        """Executa `stage` em cada shard envolvido e confirma tudo, ou desfaz tudo se alguma etapa devolver False."""
+        groups = self._group(probes, key=lambda probe: probe.id)
+        with ExitStack() as stack:
+            sessions = {index: stack.enter_context(self.shards[index].db_session_factory()) for index in sorted(groups)}
+            for index, db in sessions.items():
+                if stage(self.shards[index], db, groups[index]) is False:
+                    for session in sessions.values():
+                        session.rollback()
+                    return False
+            for db in sessions.values():
+                db.commit()
+        return True
+
+    def save(self, probe: Probe) -> None:
+        self.shard_of(probe.id).save(probe)
+
+    def save_many(self, probes: List[Probe]) -> None:
+        if probes:
+            self._write(probes, lambda shard, db, group: shard.stage_save_many(db, group))
+
+    def save_if_unchanged(self, probes: List[Probe]) -> bool:
+        if not probes:
+            return True
+        if not self._write(probes, lambda shard, db, group: shard.stage_save_if_unchanged(db, group)):
+            return False
+        for probe in {probe.id: probe for probe in probes}.values():
+            probe.version += 1
+        return True
+
+    def add_many(self, probes: List[Probe]) -> List[str]:
+        if probes:
+            self._write(probes, lambda shard, db, group: shard.stage_add_many(db, group))
+        return [probe.id for probe in probes]
+
+    def get_by_id(self, probe_id: str) -> Optional[Probe]:
+        return self.shard_of(probe_id).get_by_id(probe_id)
+
+    def get_many(self, probe_ids: List[str]) -> Dict[str, Probe]:
+        found: Dict[str, Probe] = {}
+        for index, group in self._group(probe_ids, key=lambda probe_id: probe_id).items():
+            found.update(self.shards[index].get_many(group))
+        return found
+
+    def get_all(self) -> List[Probe]:
+        return list(self.iter_all())
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> List[Probe]:
+        # Cada shard devolve no máximo `limit` sondas; as `limit` menores do conjunto estão entre elas.
+        pages = [shard.get_page(limit, after) for shard in self.shards]
+        return list(itertools.islice(merge_by_id(pages), limit))
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        return merge_by_id(shard.iter_all(batch_size) for shard in self.shards)
+
+    def fleet_version(self) -> int:
+        # Cada gravação incrementa o contador de pelo menos um shard, então a soma também só cresce.
+        return sum(shard.fleet_version() for shard in self.shards)
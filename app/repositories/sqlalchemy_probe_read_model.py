@@ -0,0 +1,62 @@
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from .database_models import ProbeDB
+from .probe_read_model import IProbeReadModel, ProbeView, Region
+from .sqlalchemy_probe_repository import FLEET_VERSION_QUERY
+
+_probes = ProbeDB.__table__
+# Apenas as colunas da resposta, na ordem de ProbeView.
+_VIEW_COLUMNS = select(_probes.c.id, _probes.c.x, _probes.c.y, _probes.c.direction, _probes.c.version)
+
+
+class SQLAlchemyProbeReadModel(IProbeReadModel):
+    """
+    Read model com SQLAlchemy Core: cada consulta devolve tuplas de colunas, convertidas
+    direto em ProbeView, sem sessão, sem objetos ORM e sem montar o domínio.
+    """
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def get(self, probe_id: str) -> Optional[ProbeView]:
+        with self.engine.connect() as connection:
+            row = connection.execute(_VIEW_COLUMNS.where(_probes.c.id == probe_id)).first()
+        return ProbeView._make(row) if row else None
+
+    def get_all(self) -> list[ProbeView]:
+        with self.engine.connect() as connection:
+            return list(map(ProbeView._make, connection.execute(_VIEW_COLUMNS)))
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> list[ProbeView]:
+        query = _VIEW_COLUMNS.order_by(_probes.c.id).limit(limit)
+        if after is not None:
+            query = query.where(_probes.c.id > after)
+        with self.engine.connect() as connection:
+            return list(map(ProbeView._make, connection.execute(query)))
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[ProbeView]:
+        query = _VIEW_COLUMNS.order_by(_probes.c.id).execution_options(yield_per=batch_size)
+        with self.engine.connect() as connection:
+            for row in connection.execute(query):
+                yield ProbeView._make(row)
+
+    def get_within(self, region: Region, limit: Optional[int] = None, after: Optional[str] = None) -> list[ProbeView]:
+        # Varredura do índice ix_probes_x_y na faixa de x, com o filtro de y no próprio índice.
+        query = _VIEW_COLUMNS.where(
+            _probes.c.x.between(region.x0, region.x1), _probes.c.y.between(region.y0, region.y1)
+        ).order_by(_probes.c.id).limit(limit)
+        if after is not None:
+            query = query.where(_probes.c.id > after)
+        with self.engine.connect() as connection:
+            return list(map(ProbeView._make, connection.execute(query)))
+
+    def get_on_plateau(self, plateau: str) -> list[ProbeView]:
+        query = _VIEW_COLUMNS.where(_probes.c.plateau == plateau).order_by(_probes.c.id)
+        with self.engine.connect() as connection:
+            return list(map(ProbeView._make, connection.execute(query)))
+
+    def fleet_version(self) -> int:
+        with self.engine.connect() as connection:
+            return connection.execute(FLEET_VERSION_QUERY).scalar() or 0
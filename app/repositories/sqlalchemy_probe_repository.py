@@ -1,10 +1,154 @@
-from typing import Optional, List
+from typing import Dict, Iterator, Optional, List
+
+from sqlalchemy import bindparam, case, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 
 from .probe_repository import IProbeRepository
-from .database_models import ProbeDB
+from .database_models import FleetStateDB, ProbeDB
 from app.domain.models import Probe, Grid, Position
 from app.domain.state import Direction
 
+# Limite de IDs por cláusula IN, abaixo do máximo de parâmetros do SQLite.
+IN_CLAUSE_CHUNK_SIZE = 500
+
+
+def to_domain(probe_db: ProbeDB) -> Probe:
+    """Converte o modelo do banco de dados (ORM) para o modelo de domínio."""
+    grid = Grid(max_x=probe_db.max_x, max_y=probe_db.max_y)
+    position = Position(x=probe_db.x, y=probe_db.y)
+    direction_enum = Direction(probe_db.direction)
+
+    probe = Probe(
+        grid=grid,
+        initial_direction=direction_enum,
+        probe_id=probe_db.id,
+        initial_position=position,
+        plateau_name=probe_db.plateau,
+        version=probe_db.version
+    )
+    return probe
+
+
+def to_row(probe: Probe) -> dict:
+    """Converte a sonda em um dicionário com as colunas da tabela 'probes'."""
+    return {
+        "id": probe.id,
+        "x": probe.position.x,
+        "y": probe.position.y,
+        "direction": probe.current_direction.value,
+        "max_x": probe.grid.max_x,
+        "max_y": probe.grid.max_y,
+        "plateau": probe.plateau_name,
+        "version": probe.version,
+    }
+
+
+def apply_to_db(db, probe: Probe, probe_db: Optional[ProbeDB]) -> ProbeDB:
+    """Copia o estado da sonda para o registro existente ou adiciona um novo à sessão."""
+    if probe_db:
+        probe_db.x = probe.position.x
+        probe_db.y = probe.position.y
+        probe_db.direction = probe.current_direction.value
+        probe_db.max_x = probe.grid.max_x
+        probe_db.max_y = probe.grid.max_y
+        probe_db.plateau = probe.plateau_name
+        probe_db.version = max(probe_db.version + 1, probe.version)
+    else:
+        probe_db = ProbeDB(**to_row(probe))
+        db.add(probe_db)
+    return probe_db
+
+
+# Dialetos com INSERT ... ON CONFLICT DO UPDATE.
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def upsert_statement(dialect_name: str):
+    """
+    INSERT ... ON CONFLICT (id) DO UPDATE para a tabela 'probes': grava a sonda com
+    um único comando, exista ela ou não. Retorna None se o dialeto não tiver upsert.
+    """
+    dialect_insert = _UPSERT_INSERTS.get(dialect_name)
+    if dialect_insert is None:
+        return None
+    statement = dialect_insert(ProbeDB)
+    columns = {
+        column.name: statement.excluded[column.name]
+        for column in ProbeDB.__table__.columns if column.name not in ("id", "version")
+    }
+    # A maior entre a versão armazenada + 1 e a da sonda (ver IProbeRepository.save_many).
+    columns["version"] = case(
+        (statement.excluded.version > ProbeDB.version, statement.excluded.version), else_=ProbeDB.version + 1
+    )
+    return statement.on_conflict_do_update(index_elements=[ProbeDB.id], set_=columns)
+
+
+def upsert_rows(probes: List[Probe]) -> List[dict]:
+    """Linhas para o upsert, sem IDs repetidos (vale o último estado de cada sonda)."""
+    return list({probe.id: to_row(probe) for probe in probes}.values())
+
+
+_probes = ProbeDB.__table__
+# UPDATE condicional: só grava se a versão no banco ainda for a que foi lida, e a incrementa.
+CAS_UPDATE = (
+    update(_probes)
+    .where(_probes.c.id == bindparam("b_id"), _probes.c.version == bindparam("b_version"))
+    .values(
+        x=bindparam("x"), y=bindparam("y"), direction=bindparam("direction"),
+        max_x=bindparam("max_x"), max_y=bindparam("max_y"), plateau=bindparam("plateau"),
+        version=_probes.c.version + 1,
+    )
+)
+
+
+def cas_rows(probes: List[Probe]) -> List[dict]:
+    """Parâmetros do CAS_UPDATE, sem IDs repetidos."""
+    rows = []
+    for probe in {probe.id: probe for probe in probes}.values():
+        row = to_row(probe)
+        row["b_id"] = row.pop("id")
+        row["b_version"] = row.pop("version")
+        rows.append(row)
+    return rows
+
+
+def execute_cas(connection, rows: List[dict]) -> int:
+    """Executa o CAS_UPDATE e retorna quantas linhas foram atualizadas."""
+    if connection.dialect.supports_sane_multi_rowcount:
+        return connection.execute(CAS_UPDATE, rows).rowcount
+    return sum(connection.execute(CAS_UPDATE, row).rowcount for row in rows)
+
+
+def chunked(probe_ids: List[str]) -> List[List[str]]:
+    """Divide os IDs (sem repetições) em blocos que cabem em uma cláusula IN."""
+    unique_ids = list(dict.fromkeys(probe_ids))
+    return [unique_ids[start:start + IN_CLAUSE_CHUNK_SIZE] for start in range(0, len(unique_ids), IN_CLAUSE_CHUNK_SIZE)]
+
+
+FLEET_ROW_ID = 1
+
+
+def fleet_bump_statement(dialect_name: str):
+    """Incrementa a versão da frota, criando a linha na primeira gravação. None se o dialeto não tiver upsert."""
+    dialect_insert = _UPSERT_INSERTS.get(dialect_name)
+    if dialect_insert is None:
+        return None
+    return dialect_insert(FleetStateDB).values(id=FLEET_ROW_ID, version=1).on_conflict_do_update(
+        index_elements=[FleetStateDB.id], set_={"version": FleetStateDB.version + 1}
+    )
+
+
+def fleet_bump_fallback(connection) -> None:
+    """Sem upsert: UPDATE e, se a linha ainda não existir, INSERT."""
+    bumped = connection.execute(
+        update(FleetStateDB).where(FleetStateDB.id == FLEET_ROW_ID).values(version=FleetStateDB.version + 1)
+    )
+    if bumped.rowcount == 0:
+        connection.execute(insert(FleetStateDB).values(id=FLEET_ROW_ID, version=1))
+
+
+FLEET_VERSION_QUERY = select(FleetStateDB.version).where(FleetStateDB.id == FLEET_ROW_ID)
+
 
 class SQLAlchemyProbeRepository(IProbeRepository):
     """
@@ -15,49 +159,104 @@ class SQLAlchemyProbeRepository(IProbeRepository):
     def __init__(self, db_session_factory):
         self.db_session_factory = db_session_factory
 
-    def _to_domain(self, probe_db: ProbeDB) -> Probe:
-        """Converte o modelo do banco de dados (ORM) para o modelo de domínio."""
-        grid = Grid(max_x=probe_db.max_x, max_y=probe_db.max_y)
-        position = Position(x=probe_db.x, y=probe_db.y)
-        direction_enum = Direction(probe_db.direction)
-
-        probe = Probe(
-            grid=grid,
-            initial_direction=direction_enum,
-            probe_id=probe_db.id,
-            initial_position=position
-        )
-        return probe
+    def _fetch_many(self, db, probe_ids: List[str]) -> Dict[str, ProbeDB]:
+        found: Dict[str, ProbeDB] = {}
+        for chunk in chunked(probe_ids):
+            for probe_db in db.query(ProbeDB).filter(ProbeDB.id.in_(chunk)):
+                found[probe_db.id] = probe_db
+        return found
 
     def save(self, probe: Probe) -> None:
+        self.save_many([probe])
+
+    def save_many(self, probes: List[Probe]) -> None:
+        if not probes:
+            return
         with self.db_session_factory() as db:
-            probe_db = db.get(ProbeDB, probe.id)
-            if probe_db:
-                probe_db.x = probe.position.x
-                probe_db.y = probe.position.y
-                probe_db.direction = probe.current_direction.value
-                probe_db.max_x = probe.grid.max_x
-                probe_db.max_y = probe.grid.max_y
-            else:
-                probe_db = ProbeDB(
-                    id=probe.id,
-                    x=probe.position.x,
-                    y=probe.position.y,
-                    direction=probe.current_direction.value,
-                    max_x=probe.grid.max_x,
-                    max_y=probe.grid.max_y,
-                )
-                db.add(probe_db)
+            self.stage_save_many(db, probes)
+            db.commit()
+
+    def save_if_unchanged(self, probes: List[Probe]) -> bool:
+        if not probes:
+            return True
+        with self.db_session_factory() as db:
+            if not self.stage_save_if_unchanged(db, probes):
+                db.rollback()
+                return False
             db.commit()
+        for probe in {probe.id: probe for probe in probes}.values():
+            probe.version += 1
+        return True
+
+    def add_many(self, probes: List[Probe]) -> List[str]:
+        if probes:
+            with self.db_session_factory() as db:
+                self.stage_add_many(db, probes)
+                db.commit()
+        return [probe.id for probe in probes]
+
+    # As etapas abaixo só executam os comandos na sessão `db`; quem chama confirma ou desfaz a transação.
+    # Todas incrementam a versão da frota na mesma transação.
+    def stage_save_many(self, db, probes: List[Probe]) -> None:
+        statement = upsert_statement(db.get_bind().dialect.name)
+        if statement is not None:
+            db.execute(statement, upsert_rows(probes))
+        else:
+            existing = self._fetch_many(db, [probe.id for probe in probes])
+            for probe in probes:
+                existing[probe.id] = apply_to_db(db, probe, existing.get(probe.id))
+            db.flush()
+        self.stage_bump_fleet(db)
+
+    def stage_save_if_unchanged(self, db, probes: List[Probe]) -> bool:
+        """Executa o compare-and-swap; False se alguma sonda mudou (a transação deve ser desfeita)."""
+        rows = cas_rows(probes)
+        if execute_cas(db.connection(), rows) != len(rows):
+            return False
+        self.stage_bump_fleet(db)
+        return True
+
+    def stage_add_many(self, db, probes: List[Probe]) -> None:
+        db.execute(insert(ProbeDB), [to_row(probe) for probe in probes])
+        self.stage_bump_fleet(db)
+
+    @staticmethod
+    def stage_bump_fleet(db) -> None:
+        statement = fleet_bump_statement(db.get_bind().dialect.name)
+        if statement is not None:
+            db.execute(statement)
+        else:
+            fleet_bump_fallback(db.connection())
+
+    def fleet_version(self) -> int:
+        with self.db_session_factory() as db:
+            return db.execute(FLEET_VERSION_QUERY).scalar() or 0
 
     def get_by_id(self, probe_id: str) -> Optional[Probe]:
         with self.db_session_factory() as db:
             probe_db = db.get(ProbeDB, probe_id)
             if probe_db:
-                return self._to_domain(probe_db)
+                return to_domain(probe_db)
             return None
 
     def get_all(self) -> List[Probe]:
         with self.db_session_factory() as db:
             all_probes_db = db.query(ProbeDB).all()
-            return [self._to_domain(p) for p in all_probes_db]
\ No newline at end of file
+            return [to_domain(p) for p in all_probes_db]
+
+    def get_page(self, limit: int, after: Optional[str] = None) -> List[Probe]:
+        query = select(ProbeDB).order_by(ProbeDB.id).limit(limit)
+        if after is not None:
+            query = query.where(ProbeDB.id > after)
+        with self.db_session_factory() as db:
+            return [to_domain(p) for p in db.scalars(query)]
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Probe]:
+        query = select(ProbeDB).order_by(ProbeDB.id).execution_options(yield_per=batch_size)
+        with self.db_session_factory() as db:
+            for probe_db in db.scalars(query):
+                yield to_domain(probe_db)
+
+    def get_many(self, probe_ids: List[str]) -> Dict[str, Probe]:
+        with self.db_session_factory() as db:
+            return {probe_id: to_domain(p) for probe_id, p in self._fetch_many(db, probe_ids).items()}
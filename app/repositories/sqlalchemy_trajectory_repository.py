@@ -0,0 +1,143 @@
+import sys
+import threading
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from .database_models import TrajectorySegmentDB
+from .sqlalchemy_probe_repository import chunked
+from .trajectory_repository import ITrajectoryRepository
+from app.core.events import events
+from app.domain.state import Direction
+from app.domain.trajectory import TrajectorySegment
+
+
+# Tentativas de um flush quando outro processo grava trechos da mesma sonda ao mesmo tempo.
+MAX_FLUSH_ATTEMPTS = 5
+
+
+class SQLAlchemyTrajectoryRepository(ITrajectoryRepository):
+    """
+    Histórico de trajetórias no banco. Os trechos ficam em um buffer e são gravados
+    em lote (um único INSERT executemany) quando o buffer atinge `flush_threshold`,
+    antes de qualquer leitura e no `close()`.
+
+    O fim do histórico de cada sonda é guardado em memória para não consultar o
+    banco a cada movimento. Como outros processos podem ter acrescentado trechos
+    depois disso, o flush renumera os trechos de cada sonda a partir do maior
+    `end_seq` do banco, lido na mesma transação do INSERT; se outro processo gravar
+    no meio, a restrição única (probe_id, start_seq) falha e o flush tenta de novo.
+
+    Quando o flush roda, os movimentos já foram gravados: uma falha no histórico
+    não chega a quem chamou. Os trechos voltam para o buffer e são gravados no
+    próximo flush (evento `trajectory.flush_failed`).
+    """
+    def __init__(self, db_session_factory, flush_threshold: int = 256):
+        self.db_session_factory = db_session_factory
+        self._flush_threshold = flush_threshold
+        self._pending: list[TrajectorySegment] = []
+        self._end_seqs: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def append(self, segments: list[TrajectorySegment]) -> None:
+        with self._lock:
+            self._pending.extend(segments)
+            for segment in segments:
+                self._end_seqs[segment.probe_id] = segment.end_seq
+            should_flush = len(self._pending) >= self._flush_threshold
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            for attempt in range(MAX_FLUSH_ATTEMPTS):
+                try:
+                    end_seqs = self._insert(pending)
+                    break
+                except IntegrityError:
+                    if attempt == MAX_FLUSH_ATTEMPTS - 1:
+                        raise
+        except Exception as e:
+            with self._lock:
+                self._pending[:0] = pending
+            events.error("trajectory.flush_failed", segments=len(pending), error=str(e))
+            return
+        with self._lock:
+            waiting = {segment.probe_id for segment in self._pending}
+            for probe_id, end_seq in end_seqs.items():
+                if probe_id not in waiting:
+                    self._end_seqs[probe_id] = end_seq
+
+    def _insert(self, segments: list[TrajectorySegment]) -> dict[str, int]:
+        """
+        Grava os trechos em uma transação, continuando cada sonda do maior `end_seq`
+        já gravado, na ordem do buffer. Retorna o novo fim do histórico de cada sonda.
+        """
+        with self.db_session_factory() as db:
+            end_seqs = self._stored_end_seqs(db, list({segment.probe_id for segment in segments}))
+            rows = []
+            for s in segments:
+                start_seq = end_seqs.get(s.probe_id, s.start_seq)
+                end_seqs[s.probe_id] = start_seq + s.count
+                rows.append({
+                    "probe_id": s.probe_id,
+                    "start_seq": start_seq,
+                    "count": s.count,
+                    "x": s.x,
+                    "y": s.y,
+                    "direction": s.direction.value,
+                    "commands": s.commands,
+                })
+            db.execute(insert(TrajectorySegmentDB), rows)
+            db.commit()
+        return end_seqs
+
+    @staticmethod
+    def _stored_end_seqs(db, probe_ids: list[str]) -> dict[str, int]:
+        end_seq = func.max(TrajectorySegmentDB.start_seq + TrajectorySegmentDB.count)
+        found = {}
+        for chunk in chunked(probe_ids):
+            query = (
+                select(TrajectorySegmentDB.probe_id, end_seq)
+                .where(TrajectorySegmentDB.probe_id.in_(chunk))
+                .group_by(TrajectorySegmentDB.probe_id)
+            )
+            found.update(db.execute(query).all())
+        return found
+
+    def find_segment(self, probe_id: str, seq: int) -> Optional[TrajectorySegment]:
+        self.flush()
+        query = (
+            select(TrajectorySegmentDB)
+            .where(TrajectorySegmentDB.probe_id == probe_id, TrajectorySegmentDB.start_seq <= seq)
+            .order_by(TrajectorySegmentDB.start_seq.desc())
+            .limit(1)
+        )
+        with self.db_session_factory() as db:
+            row = db.scalars(query).first()
+            if row is None:
+                return None
+            return TrajectorySegment(
+                probe_id=row.probe_id,
+                start_seq=row.start_seq,
+                count=row.count,
+                x=row.x,
+                y=row.y,
+                direction=Direction(row.direction),
+                commands=row.commands,
+            )
+
+    def end_seq(self, probe_id: str) -> Optional[int]:
+        with self._lock:
+            if probe_id in self._end_seqs:
+                return self._end_seqs[probe_id]
+        segment = self.find_segment(probe_id, sys.maxsize)
+        if segment is None:
+            return None
+        with self._lock:
+            return self._end_seqs.setdefault(probe_id, segment.end_seq)
@@ -0,0 +1,50 @@
+import bisect
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.domain.trajectory import TrajectorySegment
+
+
+class ITrajectoryRepository(ABC):
+    """Interface para o histórico append-only de trajetórias das sondas."""
+    @abstractmethod
+    def append(self, segments: list[TrajectorySegment]) -> None:
+        pass
+
+    @abstractmethod
+    def find_segment(self, probe_id: str, seq: int) -> Optional[TrajectorySegment]:
+        """Trecho com o maior `start_seq` menor ou igual a `seq` (busca indexada, sem varrer o histórico)."""
+        pass
+
+    @abstractmethod
+    def end_seq(self, probe_id: str) -> Optional[int]:
+        """Quantidade de comandos já registrados da sonda, ou None se ela não tiver histórico."""
+        pass
+
+    def flush(self) -> None:
+        """Grava o que estiver pendente. Implementações sem buffer não precisam sobrescrever."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class InMemoryTrajectoryRepository(ITrajectoryRepository):
+    """Implementação em memória, com os trechos de cada sonda ordenados por `start_seq`."""
+    def __init__(self):
+        self._segments: dict[str, list[TrajectorySegment]] = {}
+        self._starts: dict[str, list[int]] = {}
+
+    def append(self, segments: list[TrajectorySegment]) -> None:
+        for segment in segments:
+            self._segments.setdefault(segment.probe_id, []).append(segment)
+            self._starts.setdefault(segment.probe_id, []).append(segment.start_seq)
+
+    def find_segment(self, probe_id: str, seq: int) -> Optional[TrajectorySegment]:
+        index = bisect.bisect_right(self._starts.get(probe_id, []), seq) - 1
+        if index < 0:
+            return None
+        return self._segments[probe_id][index]
+
+    def end_seq(self, probe_id: str) -> Optional[int]:
+        segments = self._segments.get(probe_id)
+        return segments[-1].end_seq if segments else None
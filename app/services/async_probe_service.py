@@ -0,0 +1,84 @@
+import asyncio
+from typing import AsyncIterator, Iterable, Optional
+
+from app.domain.models import Probe
+from app.repositories.async_probe_repository import IAsyncProbeRepository
+from app.services.command_executor import CommandExecutor
+from app.services.probe_service import (
+    BatchMoveReport, InvalidCommandError, LaunchSpec, ProbeConflictError, ProbeNotFoundError,
+    apply_commands, new_probe, retry_delay, run_batch,
+)
+
+
+class AsyncProbeService:
+    """
+    Versão assíncrona do ProbeService. Usa as mesmas regras de domínio, mas aguarda
+    o repositório sem ocupar uma thread do threadpool enquanto o banco responde.
+    Os comandos são executados fora do event loop (em uma thread ou, com o executor,
+    no pool de processos dele).
+
+    Não mantém índices de ocupação, então não lança nem move sondas em planaltos
+    compartilhados. Também não tem os passos que o ProbeService executa depois de
+    gravar: histórico de trajetórias, telemetria, índice espacial e cache de JSON.
+    """
+    def __init__(self, probe_repository: IAsyncProbeRepository, max_retries: int = 5, retry_backoff: float = 0.002,
+                 executor: Optional[CommandExecutor] = None):
+        self.repository = probe_repository
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.executor = executor
+
+    async def launch_probe(self, max_x: int, max_y: int, direction_str: str,
+                           plateau: Optional[str] = None, x: int = 0, y: int = 0) -> Probe:
+        new_probes = self._new_probes([LaunchSpec(max_x, max_y, direction_str, plateau, x, y)])
+        await self.repository.save(new_probes[0])
+        return new_probes[0]
+
+    async def launch_probes(self, specs: list[LaunchSpec]) -> list[str]:
+        return await self.repository.add_many(self._new_probes([LaunchSpec(*spec) for spec in specs]))
+
+    @staticmethod
+    def _new_probes(specs: list[LaunchSpec]) -> list[Probe]:
+        if any(spec.plateau for spec in specs):
+            raise InvalidCommandError("Planaltos compartilhados só estão disponíveis com API_MODE=sync.")
+        return [new_probe(spec) for spec in specs]
+
+    async def move_probe(self, probe_id: str, commands: str) -> Probe:
+        for attempt in range(self.max_retries + 1):
+            probe = await self.repository.get_by_id(probe_id)
+            if not probe:
+                raise ProbeNotFoundError(f"Sonda com ID '{probe_id}' não encontrada.")
+            self._reject_plateaus([probe])
+
+            await asyncio.to_thread(apply_commands, probe, commands, self.executor)
+
+            if await self.repository.save_if_unchanged([probe]):
+                return probe
+            await asyncio.sleep(retry_delay(attempt, self.retry_backoff))
+
+        raise ProbeConflictError(f"A sonda '{probe_id}' foi alterada por outra requisição; tente novamente.")
+
+    async def move_probes_batch(self, moves: list[tuple[str, str]], atomic: bool = False) -> BatchMoveReport:
+        for attempt in range(self.max_retries + 1):
+            probes = await self.repository.get_many([probe_id for probe_id, _ in moves])
+            self._reject_plateaus(probes.values())
+            report, changed, _ = await asyncio.to_thread(run_batch, probes, moves, atomic, self.executor)
+            if not changed or await self.repository.save_if_unchanged(changed):
+                return report
+            await asyncio.sleep(retry_delay(attempt, self.retry_backoff))
+
+        raise ProbeConflictError("Sondas do lote foram alteradas por outra requisição; tente novamente.")
+
+    @staticmethod
+    def _reject_plateaus(probes: Iterable[Probe]) -> None:
+        if any(probe.plateau_name for probe in probes):
+            raise InvalidCommandError("Sondas em planaltos compartilhados só podem ser movidas com API_MODE=sync.")
+
+    async def get_all_probes(self) -> list[Probe]:
+        return await self.repository.get_all()
+
+    async def get_probes_page(self, limit: int, after: Optional[str] = None) -> list[Probe]:
+        return await self.repository.get_page(limit, after)
+
+    def iter_probes(self) -> AsyncIterator[Probe]:
+        return self.repository.iter_all()
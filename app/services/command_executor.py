@@ -0,0 +1,104 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.core.events import events
+from app.domain.models import Grid, InvalidMoveError, Position, Probe
+from app.domain.state import Direction
+
+
+class CommandPoolBusyError(Exception):
+    """O pool de processos está cheio; o movimento deve ser repetido mais tarde (503)."""
+    pass
+
+
+def execute_remote(x: int, y: int, direction: str, max_x: int, max_y: int, commands: str) -> tuple:
+    """
+    Executada em um processo do pool. Recebe a pose, a malha e os comandos e devolve
+    só a pose final (x, y, direção) ou, se algum passo sair da malha, (mensagem,).
+    """
+    probe = Probe(grid=Grid(max_x, max_y), initial_direction=Direction(direction), initial_position=Position(x, y))
+    try:
+        probe.execute(commands, cache=False)
+    except InvalidMoveError as e:
+        return (str(e),)
+    return probe.position.x, probe.position.y, probe.current_direction.value
+
+
+class CommandExecutor:
+    """
+    Escolhe onde executar uma sequência de comandos, pelo tamanho dela.
+
+    Sequências com menos de `threshold` comandos rodam na própria thread. As maiores
+    vão para um pool de `workers` processos, criado na primeira delas, para não
+    prender o GIL do worker enquanto as outras requisições esperam. Cabem no pool
+    `workers` sequências executando mais `max_queue` na fila; além disso, o movimento
+    é recusado com CommandPoolBusyError em vez de esperar.
+
+    Em um planalto compartilhado com outras sondas, as colisões dependem do índice de
+    ocupação deste processo, então a sequência sempre roda na thread.
+    """
+    def __init__(self, threshold: int = 20_000, workers: int = 2, max_queue: int = 8):
+        self.threshold = threshold
+        self.workers = workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers > 0 else None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.offloaded = 0
+        self.rejected = 0
+
+    def _offloadable(self, probe: Probe, commands: str) -> bool:
+        if self._slots is None or len(commands) < self.threshold:
+            return False
+        return probe.occupancy is None or probe.occupancy.occupied_count <= 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: o processo da API tem várias threads, e um fork copiaria locks em uso.
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def execute(self, probe: Probe, commands: str) -> None:
+        """Executa os comandos na sonda, como Probe.execute: se algum passo for inválido, ela não é alterada."""
+        if not self._offloadable(probe, commands):
+            probe.execute(commands)
+            return
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise CommandPoolBusyError("Muitas sequências longas de comandos em execução; tente novamente.")
+        try:
+            pool = self._get_pool()
+            try:
+                result = pool.submit(
+                    execute_remote, probe.position.x, probe.position.y, probe.current_direction.value,
+                    probe.grid.max_x, probe.grid.max_y, commands
+                ).result()
+            except BrokenProcessPool:
+                # Um processo do pool morreu; o próximo movimento longo cria outro pool.
+                self._discard_pool(pool)
+                events.error("command_pool.broken", probe_id=probe.id, commands=len(commands))
+                raise CommandPoolBusyError("O pool de execução foi reiniciado; tente novamente.")
+        finally:
+            self._slots.release()
+
+        self.offloaded += 1
+        if len(result) == 1:
+            raise InvalidMoveError(result[0])
+        x, y, direction = result
+        probe.place(Position(x, y), Direction(direction))
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -0,0 +1,170 @@
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from app.domain.commands import DIRECTION_INDEX, DIRECTION_ORDER, DIRECTION_VECTORS
+from app.domain.models import Grid, Position, Probe
+from app.domain.state import Direction
+from app.repositories.probe_repository import IProbeRepository
+
+# Códigos numéricos dos comandos na matriz de comandos. NOOP preenche sequências mais curtas.
+NOOP, LEFT, RIGHT, MOVE = 0, 1, 2, 3
+COMMAND_CODES: dict[str, int] = {'L': LEFT, 'R': RIGHT, 'M': MOVE}
+# Caractere ASCII de cada código, para devolver os comandos executados ao histórico.
+_COMMAND_CHARS = np.array([0, ord('L'), ord('R'), ord('M')], dtype=np.uint8)
+
+_STEP_X = np.array([vector[0] for vector in DIRECTION_VECTORS], dtype=np.int64)
+_STEP_Y = np.array([vector[1] for vector in DIRECTION_VECTORS], dtype=np.int64)
+
+# Quantidade de colunas (ticks) processadas por bloco, para limitar a memória das somas acumuladas.
+BLOCK_SIZE = 1024
+
+
+class FleetEngine:
+    """
+    Simula uma frota inteira de sondas com arrays NumPy. Cada tick aplica um comando
+    a todas as sondas de uma vez. Uma sonda que tenta sair da malha fica marcada em
+    `out_of_bounds`, permanece na última posição válida e ignora os comandos seguintes,
+    exatamente como a `Probe` escalar que levanta `InvalidMoveError`.
+
+    O motor não consulta os índices de ocupação dos planaltos compartilhados nem grava
+    nada: a frota simulada é gravada por `ProbeService.store_fleet`, com compare-and-swap
+    sobre as versões carregadas (`versions`). Para o histórico de trajetória, o motor
+    guarda a pose inicial e uma referência a cada matriz executada.
+    """
+    def __init__(self, ids: Sequence[str], x, y, direction, max_x, max_y,
+                 plateaus: Optional[Sequence[Optional[str]]] = None, versions: Optional[Sequence[int]] = None):
+        self.ids: list[str] = list(ids)
+        self.plateaus: list[Optional[str]] = list(plateaus) if plateaus is not None else [None] * len(self.ids)
+        self.versions: list[int] = list(versions) if versions is not None else [0] * len(self.ids)
+        self.x = np.asarray(x, dtype=np.int64).copy()
+        self.y = np.asarray(y, dtype=np.int64).copy()
+        self.direction = np.asarray(direction, dtype=np.int64).copy()
+        self._start = (self.x.copy(), self.y.copy(), self.direction.copy())
+        self._runs: list[np.ndarray] = []
+        self.max_x = np.asarray(max_x, dtype=np.int64).copy()
+        self.max_y = np.asarray(max_y, dtype=np.int64).copy()
+        self.out_of_bounds = np.zeros(len(self.ids), dtype=bool)
+        self.failed_at = np.full(len(self.ids), -1, dtype=np.int64)
+        self._executed = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_probes(cls, probes: Iterable[Probe]) -> 'FleetEngine':
+        probes = list(probes)
+        return cls(
+            ids=[p.id for p in probes],
+            x=[p.position.x for p in probes],
+            y=[p.position.y for p in probes],
+            direction=[DIRECTION_INDEX[p.current_direction] for p in probes],
+            max_x=[p.grid.max_x for p in probes],
+            max_y=[p.grid.max_y for p in probes],
+            plateaus=[p.plateau_name for p in probes],
+            versions=[p.version for p in probes],
+        )
+
+    @classmethod
+    def load(cls, repository: IProbeRepository, probe_ids: Optional[Sequence[str]] = None) -> 'FleetEngine':
+        """Carrega a frota do repositório; sem `probe_ids`, carrega todas as sondas."""
+        if probe_ids is None:
+            return cls.from_probes(repository.get_all())
+        probes = repository.get_many(list(probe_ids))
+        return cls.from_probes(probes[probe_id] for probe_id in dict.fromkeys(probe_ids) if probe_id in probes)
+
+    @staticmethod
+    def encode(commands: Sequence[str]) -> np.ndarray:
+        """Converte uma sequência de comandos por sonda em uma matriz (sondas x ticks)."""
+        width = max((len(c) for c in commands), default=0)
+        matrix = np.full((len(commands), width), NOOP, dtype=np.int8)
+        lookup = np.zeros(256, dtype=np.int8)
+        for command, code in COMMAND_CODES.items():
+            lookup[ord(command)] = code
+
+        for row, sequence in enumerate(commands):
+            raw = np.frombuffer(sequence.upper().encode("ascii"), dtype=np.uint8)
+            codes = lookup[raw]
+            if np.any(codes == NOOP):
+                raise ValueError(f"A sequência de comandos da sonda {row} contém caracteres inválidos.")
+            matrix[row, :len(sequence)] = codes
+        return matrix
+
+    def tick(self, commands: np.ndarray) -> np.ndarray:
+        """Aplica um único comando por sonda. Retorna a máscara das sondas que saíram da malha neste tick."""
+        return self.run(np.asarray(commands).reshape(len(self), 1))
+
+    def run(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Aplica uma matriz de comandos (sondas x ticks). Retorna a máscara das sondas
+        que saíram da malha durante esta execução.
+        """
+        matrix = np.asarray(matrix)
+        if matrix.shape[0] != len(self):
+            raise ValueError(f"A matriz tem {matrix.shape[0]} linhas, mas a frota tem {len(self)} sondas.")
+
+        self._runs.append(matrix)
+        newly_failed = np.zeros(len(self), dtype=bool)
+        for start in range(0, matrix.shape[1], BLOCK_SIZE):
+            newly_failed |= self._run_block(matrix[:, start:start + BLOCK_SIZE], self._executed + start)
+        self._executed += matrix.shape[1]
+        return newly_failed
+
+    def _run_block(self, block: np.ndarray, offset: int) -> np.ndarray:
+        active = ~self.out_of_bounds
+        codes = np.where(active[:, None], block, NOOP)
+
+        turns = np.where(codes == LEFT, -1, 0) + np.where(codes == RIGHT, 1, 0)
+        headings = (self.direction[:, None] + np.cumsum(turns, axis=1)) % 4
+        moves = codes == MOVE
+
+        positions_x = self.x[:, None] + np.cumsum(_STEP_X[headings] * moves, axis=1)
+        positions_y = self.y[:, None] + np.cumsum(_STEP_Y[headings] * moves, axis=1)
+
+        invalid = moves & (
+            (positions_x < 0) | (positions_x > self.max_x[:, None])
+            | (positions_y < 0) | (positions_y > self.max_y[:, None])
+        )
+        failed = invalid.any(axis=1)
+        # Para as sondas que falharam, o estado final é o do tick anterior ao primeiro movimento inválido.
+        last = np.where(failed, invalid.argmax(axis=1), block.shape[1]) - 1
+        rows = np.arange(len(self))
+        has_previous = last >= 0
+        safe_last = np.maximum(last, 0)
+
+        self.x = np.where(has_previous, positions_x[rows, safe_last], self.x)
+        self.y = np.where(has_previous, positions_y[rows, safe_last], self.y)
+        self.direction = np.where(has_previous, headings[rows, safe_last], self.direction)
+
+        self.failed_at = np.where(failed, offset + last + 1, self.failed_at)
+        self.out_of_bounds |= failed
+        return failed
+
+    def to_probes(self, include_out_of_bounds: bool = False) -> list[Probe]:
+        probes = []
+        for index, probe_id in enumerate(self.ids):
+            if self.out_of_bounds[index] and not include_out_of_bounds:
+                continue
+            probes.append(Probe(
+                grid=Grid(max_x=int(self.max_x[index]), max_y=int(self.max_y[index])),
+                initial_direction=DIRECTION_ORDER[int(self.direction[index])],
+                probe_id=probe_id,
+                initial_position=Position(x=int(self.x[index]), y=int(self.y[index])),
+                plateau_name=self.plateaus[index],
+                version=self.versions[index],
+            ))
+        return probes
+
+    def executed(self) -> dict[str, tuple[Position, Direction, str]]:
+        """Pose inicial e comandos executados (sem os NOOP) de cada sonda que terminou dentro da malha."""
+        result = {}
+        start_x, start_y, start_direction = self._start
+        for index in np.flatnonzero(~self.out_of_bounds):
+            codes = np.concatenate([matrix[index] for matrix in self._runs]) if self._runs else np.empty(0, np.int8)
+            commands = _COMMAND_CHARS[codes[codes != NOOP]].tobytes().decode("ascii")
+            result[self.ids[index]] = (
+                Position(x=int(start_x[index]), y=int(start_y[index])),
+                DIRECTION_ORDER[int(start_direction[index])],
+                commands,
+            )
+        return result
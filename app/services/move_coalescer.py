@@ -0,0 +1,113 @@
+import threading
+import time
+from typing import Callable, Union
+
+from app.core.events import DEBUG, events
+from app.domain.models import Probe
+
+# Resultado de cada movimento de um grupo: a sonda na pose após os comandos, ou o erro do próprio movimento.
+MoveOutcome = Union[Probe, Exception]
+
+
+class _PendingMove:
+    __slots__ = ("commands", "arrived", "done", "outcome", "lead")
+
+    def __init__(self, commands: str):
+        self.commands = commands
+        self.arrived = time.monotonic()
+        self.done = threading.Event()
+        self.outcome: MoveOutcome = None
+        self.lead = False
+
+
+class MoveCoalescer:
+    """
+    Fila de movimentos por sonda com gravação em grupo (group commit).
+
+    O primeiro movimento de uma sonda vira o líder: espera até `window` segundos (ou
+    até `max_batch` movimentos) e executa, em ordem de chegada, todos os movimentos
+    pendentes da sonda com uma única leitura e uma única gravação. Cada chamador
+    recebe a pose depois dos seus comandos, ou o seu próprio erro. Quem chega
+    enquanto um grupo grava espera o próximo, liderado pelo primeiro da fila; assim
+    os grupos de uma sonda nunca executam fora de ordem.
+    """
+    def __init__(self, window: float = 0.002, max_batch: int = 32):
+        if max_batch < 1:
+            raise ValueError("max_batch deve ser pelo menos 1.")
+        self.window = window
+        self.max_batch = max_batch
+        self._condition = threading.Condition()
+        # Existe uma fila para a sonda enquanto ela tiver um líder reunindo ou gravando um grupo.
+        self._queues: dict[str, list[_PendingMove]] = {}
+        self.requests = 0
+        self.groups = 0
+
+    def submit(self, probe_id: str, commands: str,
+               run_group: Callable[[list[str]], list[MoveOutcome]]) -> Probe:
+        """
+        Enfileira o movimento e espera o resultado. `run_group` recebe as sequências
+        de comandos do grupo e devolve um resultado por sequência; se ela levantar
+        uma exceção, todos os movimentos do grupo recebem essa exceção.
+        """
+        move = _PendingMove(commands)
+        with self._condition:
+            self.requests += 1
+            queue = self._queues.get(probe_id)
+            if queue is None:
+                queue = self._queues[probe_id] = []
+                move.lead = True
+            queue.append(move)
+            if len(queue) >= self.max_batch:
+                self._condition.notify_all()
+
+        if not move.lead:
+            move.done.wait()
+        # Um seguidor pode ter sido promovido a líder do grupo seguinte.
+        if move.lead:
+            self._lead(probe_id, queue, run_group)
+
+        if isinstance(move.outcome, Exception):
+            raise move.outcome
+        return move.outcome
+
+    def _lead(self, probe_id: str, queue: list[_PendingMove],
+              run_group: Callable[[list[str]], list[MoveOutcome]]) -> None:
+        with self._condition:
+            deadline = queue[0].arrived + self.window
+            while len(queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            group = queue[:self.max_batch]
+            del queue[:self.max_batch]
+            self.groups += 1
+
+        try:
+            outcomes = run_group([move.commands for move in group])
+        except Exception as e:
+            outcomes = [e] * len(group)
+        for move, outcome in zip(group, outcomes):
+            move.outcome = outcome
+            move.lead = False
+        if events.enabled(DEBUG):
+            events.debug("moves.coalesced", probe_id=probe_id, size=len(group))
+
+        with self._condition:
+            successor = queue[0] if queue else None
+            if successor is not None:
+                successor.lead = True
+            else:
+                del self._queues[probe_id]
+        for move in group:
+            move.done.set()
+        if successor is not None:
+            successor.done.set()
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Movimentos por grupo executado; 1.0 significa que nenhum movimento foi agrupado."""
+        return self.requests / self.groups if self.groups else 0.0
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "groups": self.groups, "coalescing_ratio": round(self.coalescing_ratio, 3)}
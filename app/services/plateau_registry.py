@@ -0,0 +1,53 @@
+import threading
+from typing import Iterable, Optional
+
+from app.core.events import events
+from app.domain.models import Grid, Probe
+from app.domain.plateau import CellOccupiedError, Plateau
+
+
+class PlateauMismatchError(Exception):
+    pass
+
+
+class PlateauRegistry:
+    """Planaltos compartilhados conhecidos pelo processo, com seus índices de ocupação."""
+    def __init__(self):
+        self._plateaus: dict[str, Plateau] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[Plateau]:
+        return self._plateaus.get(name)
+
+    def get_or_create(self, name: str, grid: Grid) -> Plateau:
+        with self._lock:
+            plateau = self._plateaus.get(name)
+            if plateau is None:
+                plateau = self._plateaus[name] = Plateau(name, Grid(max_x=grid.max_x, max_y=grid.max_y))
+            elif plateau.grid != grid:
+                raise PlateauMismatchError(
+                    f"O planalto '{name}' tem malha {plateau.grid.max_x}x{plateau.grid.max_y}, "
+                    f"diferente de {grid.max_x}x{grid.max_y}."
+                )
+            return plateau
+
+    def rebuild(self, probes: Iterable[Probe]) -> int:
+        """Reconstrói todos os índices a partir das sondas persistidas. Retorna quantas sondas foram indexadas."""
+        plateaus: dict[str, Plateau] = {}
+        indexed = 0
+        for probe in probes:
+            if probe.plateau_name is None:
+                continue
+            plateau = plateaus.get(probe.plateau_name)
+            if plateau is None:
+                plateau = plateaus[probe.plateau_name] = Plateau(probe.plateau_name, probe.grid)
+            try:
+                plateau.occupy(probe.position)
+            except CellOccupiedError:
+                # Dados anteriores ao índice podem ter duas sondas na mesma célula; a primeira fica com ela.
+                events.warning("plateau.duplicate_cell", plateau=probe.plateau_name, probe_id=probe.id)
+                continue
+            indexed += 1
+        with self._lock:
+            self._plateaus = plateaus
+        return indexed
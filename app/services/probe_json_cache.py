@@ -0,0 +1,42 @@
+import threading
+from typing import Callable, Iterable
+
+from app.repositories.probe_read_model import ProbeView
+
+
+class ProbeJsonCache:
+    """
+    JSON de cada sonda já codificado, guardado por ID junto com a versão de que veio.
+    Uma projeção com outra versão (gravada por outro processo, por exemplo) é
+    codificada de novo; o ProbeService descarta as sondas que grava. Cheio, o
+    cache descarta as entradas mais antigas.
+    """
+    def __init__(self, encode: Callable[[ProbeView], bytes], max_entries: int = 100_000):
+        self._encode = encode
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, view: ProbeView) -> bytes:
+        entry = self._entries.get(view.id)
+        if entry is not None and entry[0] == view.version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        encoded = self._encode(view)
+        if self.max_entries > 0:
+            with self._lock:
+                if view.id not in self._entries and len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+                self._entries[view.id] = (view.version, encoded)
+        return encoded
+
+    def invalidate(self, probe_ids: Iterable[str]) -> None:
+        with self._lock:
+            for probe_id in probe_ids:
+                self._entries.pop(probe_id, None)
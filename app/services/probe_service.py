@@ -1,6 +1,28 @@
-from app.domain.models import Grid, Probe, InvalidMoveError
+import copy
+import random
+import time
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass, field
+from typing import Iterator, NamedTuple, Optional
+
+from app.core.events import INFO, events
+from app.core.locks import StripedLock
+from app.core.metrics import metrics
+from app.domain.models import Grid, Probe, Position, InvalidMoveError
 from app.domain.state import Direction
+from app.domain.plateau import CellOccupiedError, Plateau
+from app.domain.planning import Plan, plan_cached, plan_path
+from app.domain.trajectory import build_segments
+from app.repositories.probe_read_model import IProbeReadModel, ProbeView, Region, RepositoryProbeReadModel
 from app.repositories.probe_repository import IProbeRepository
+from app.repositories.trajectory_repository import ITrajectoryRepository
+from app.services.command_executor import CommandExecutor, CommandPoolBusyError
+from app.services.fleet_engine import FleetEngine
+from app.services.move_coalescer import MoveCoalescer, MoveOutcome
+from app.services.plateau_registry import PlateauMismatchError, PlateauRegistry
+from app.services.probe_json_cache import ProbeJsonCache
+from app.services.spatial_index import SpatialIndex, nearest_by_scan
+from app.services.telemetry import TelemetryHub
 
 class ProbeNotFoundError(Exception):
     pass
@@ -8,47 +30,731 @@ class ProbeNotFoundError(Exception):
 class InvalidCommandError(Exception):
     pass
 
+class ProbeConflictError(Exception):
+    pass
+
+class StreamMoveError(InvalidCommandError):
+    """Comando inválido em uma fita de comandos. `offset` é a posição dele, em bytes, no corpo da fita."""
+    def __init__(self, message: str, offset: int, progress: 'StreamProgress'):
+        super().__init__(message)
+        self.offset = offset
+        self.progress = progress
+
+# Teto da espera entre tentativas de gravação de uma sonda alterada por outra requisição.
+MAX_RETRY_DELAY_SECONDS = 0.1
+
+# Serializa, por sonda, a gravação e o registro no histórico, para que os trechos de
+# uma sonda sejam acrescentados na ordem das versões. Compartilhado por todas as
+# instâncias do serviço (uma por requisição); sondas diferentes quase nunca disputam.
+_probe_locks = StripedLock()
+
+# Mede os métodos públicos do serviço; numa requisição perfilada com cProfile, é ali que o perfil começa.
+timed = metrics.timed("mars_service_seconds", "service", profile_boundary=True)
+
+
+def retry_delay(attempt: int, backoff: float) -> float:
+    """Espera exponencial com jitter completo, limitada a MAX_RETRY_DELAY_SECONDS."""
+    return random.uniform(0, min(MAX_RETRY_DELAY_SECONDS, backoff * 2 ** attempt))
+
+@dataclass
+class BatchMoveResult:
+    """Resultado da movimentação de uma sonda dentro de um lote."""
+    probe_id: str
+    position: Optional[Position] = None
+    direction: Optional[Direction] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchMoveReport:
+    """Resultado de um lote. `committed` indica se as alterações foram persistidas."""
+    committed: bool
+    results: list[BatchMoveResult] = field(default_factory=list)
+
+
+class LaunchSpec(NamedTuple):
+    """Parâmetros de lançamento de uma sonda. Com `plateau`, a malha é compartilhada com outras sondas."""
+    max_x: int
+    max_y: int
+    direction: str
+    plateau: Optional[str] = None
+    x: int = 0
+    y: int = 0
+
+
+@dataclass
+class PlanResult:
+    """Plano calculado para a sonda e, se ele foi executado, a sonda na pose final."""
+    probe_id: str
+    plan: Plan
+    probe: Optional[Probe] = None
+
+
+@dataclass(frozen=True)
+class StreamProgress:
+    """Progresso de uma fita de comandos: comandos executados, checkpoints gravados e a pose atual."""
+    probe_id: str
+    executed: int
+    checkpoints: int
+    position: Position
+    direction: Direction
+
+
+@dataclass(frozen=True)
+class ExecutedMove:
+    """Comandos executados com sucesso e a pose da sonda antes deles, para o histórico de trajetória."""
+    probe_id: str
+    position: Position
+    direction: Direction
+    commands: str
+
+
+def parse_direction(direction_str: str) -> Direction:
+    try:
+        return Direction(direction_str.upper())
+    except ValueError:
+        raise InvalidCommandError(f"Direção inválida: '{direction_str}'. Use NORTH, EAST, SOUTH ou WEST.")
+
+
+def new_probe(spec: LaunchSpec) -> Probe:
+    try:
+        return Probe(
+            grid=Grid(max_x=spec.max_x, max_y=spec.max_y),
+            initial_direction=parse_direction(spec.direction),
+            initial_position=Position(x=spec.x, y=spec.y),
+            plateau_name=spec.plateau
+        )
+    except InvalidMoveError as e:
+        raise InvalidCommandError(str(e))
+
+def apply_commands(probe: Probe, commands: str, executor: Optional[CommandExecutor] = None) -> ExecutedMove:
+    """
+    Valida e executa a sequência de comandos na sonda, sem persistir. Com um
+    executor, as sequências longas rodam no pool de processos dele.
+    """
+    executed = ExecutedMove(probe.id, probe.position, probe.current_direction, commands.upper())
+    normalized_commands = executed.commands
+    valid_commands = {'L', 'R', 'M'}
+    if not set(normalized_commands) <= valid_commands:
+        raise InvalidCommandError("A sequência de comandos contém caracteres inválidos.")
+
+    try:
+        with metrics.timer("mars_domain_seconds", "domain.execute"):
+            if executor is not None:
+                executor.execute(probe, normalized_commands)
+            else:
+                probe.execute(normalized_commands)
+    except InvalidMoveError as e:
+        metrics.inc("mars_invalid_moves_total")
+        raise InvalidCommandError(f"A sequência de comandos '{commands}' resultou em um movimento inválido. Detalhes: {e}")
+    metrics.inc("mars_commands_executed_total", len(normalized_commands))
+    return executed
+
+
+def run_batch(probes: dict[str, Probe], moves: list[tuple[str, str]], atomic: bool,
+              executor: Optional[CommandExecutor] = None) -> tuple[BatchMoveReport, list[Probe], list[ExecutedMove]]:
+    """
+    Aplica os movimentos do lote nas sondas já carregadas. Retorna o relatório,
+    as sondas que devem ser persistidas e os movimentos executados (nenhum dos
+    dois, se o lote atômico falhou).
+    """
+    results: list[BatchMoveResult] = []
+    changed: dict[str, Probe] = {}
+    executed: list[ExecutedMove] = []
+
+    for probe_id, commands in moves:
+        probe = probes.get(probe_id)
+        try:
+            if not probe:
+                raise ProbeNotFoundError(f"Sonda com ID '{probe_id}' não encontrada.")
+            executed.append(apply_commands(probe, commands, executor))
+        except (ProbeNotFoundError, InvalidCommandError) as e:
+            results.append(BatchMoveResult(probe_id=probe_id, error=str(e)))
+            continue
+
+        changed[probe_id] = probe
+        results.append(BatchMoveResult(probe_id=probe_id, position=probe.position, direction=probe.current_direction))
+
+    committed = bool(changed) and not (atomic and any(not r.success for r in results))
+    if not committed:
+        return BatchMoveReport(committed=False, results=results), [], []
+    return BatchMoveReport(committed=True, results=results), list(changed.values()), executed
+
+
+# Bytes aceitos em uma fita de comandos; espaços e quebras de linha são ignorados.
+_TAPE_WHITESPACE = b" \t\r\n"
+_TAPE_COMMANDS = b"LRM"
+
+
+def _tape_position(chunk: bytes, index: int) -> int:
+    """Posição, em bytes, do comando de número `index` do pedaço (espaços e quebras de linha não contam)."""
+    for position, byte in enumerate(chunk):
+        if byte not in _TAPE_WHITESPACE:
+            if index == 0:
+                return position
+            index -= 1
+    return len(chunk)
+
+
+class CommandStream:
+    """
+    Executa uma fita de comandos recebida em pedaços, com memória constante: cada
+    pedaço é executado assim que chega e, a cada `checkpoint_interval` comandos, a
+    pose é gravada (com compare-and-swap) e o trecho vai para o histórico. Um
+    comando inválido interrompe a fita; os anteriores a ele ficam gravados. Uma
+    fita que não termina (nem com `close()`, nem com um erro) deve ser encerrada
+    com `abort()`, que desfaz no índice de ocupação a pose não gravada.
+    """
+    def __init__(self, service: 'ProbeService', probe: Probe, plateau: Optional[Plateau], checkpoint_interval: int):
+        self.service = service
+        self.probe = probe
+        self.plateau = plateau
+        self.checkpoint_interval = checkpoint_interval
+        self.executed = 0
+        self.checkpoints = 0
+        self.finished = False
+        # Bytes já recebidos, com espaços e quebras de linha, para a posição de um comando inválido.
+        self._received = 0
+        # Comandos desde o último checkpoint (no máximo checkpoint_interval) e a pose gravada nele.
+        self._pending: list[str] = []
+        self._pending_count = 0
+        self._saved_position = probe.position
+        self._saved_direction = probe.current_direction
+
+    @property
+    def progress(self) -> StreamProgress:
+        return StreamProgress(self.probe.id, self.executed, self.checkpoints,
+                              self.probe.position, self.probe.current_direction)
+
+    def feed(self, chunk: bytes) -> None:
+        commands = chunk.translate(None, _TAPE_WHITESPACE).upper()
+        invalid = commands.translate(None, _TAPE_COMMANDS)
+        executed_before = self.executed
+        error = self._execute((commands[:commands.index(invalid[:1])] if invalid else commands).decode("ascii"))
+        if error is None and invalid:
+            error = f"Comando inválido '{chr(invalid[0])}'."
+        if error is not None:
+            self._fail(self._received + _tape_position(chunk, self.executed - executed_before), error)
+        self._received += len(chunk)
+
+    def _execute(self, commands: str) -> Optional[str]:
+        """Executa os comandos, gravando a cada checkpoint. Retorna o erro do primeiro movimento inválido."""
+        start = 0
+        while start < len(commands):
+            part = commands[start:start + self.checkpoint_interval - self._pending_count]
+            error = self._run(part)
+            if error is not None:
+                return error
+            start += len(part)
+            if self._pending_count == self.checkpoint_interval:
+                self.checkpoint()
+        return None
+
+    def _run(self, part: str) -> Optional[str]:
+        failed = None
+        with self.plateau.lock if self.plateau else nullcontext():
+            try:
+                self.probe.execute(part, cache=False)
+            except InvalidMoveError:
+                # A execução compilada não altera a sonda: refaz passo a passo até o comando inválido.
+                for index, command in enumerate(part):
+                    try:
+                        self.probe.step(command)
+                    except InvalidMoveError as e:
+                        failed = e
+                        part = part[:index]
+                        break
+        self._pending.append(part)
+        self._pending_count += len(part)
+        self.executed += len(part)
+        metrics.inc("mars_commands_executed_total", len(part))
+        if failed is None:
+            return None
+        metrics.inc("mars_invalid_moves_total")
+        return str(failed)
+
+    def _fail(self, offset: int, message: str) -> None:
+        self.checkpoint()
+        self.finished = True
+        raise StreamMoveError(f"A fita parou no byte {offset}: {message}", offset, self.progress)
+
+    def checkpoint(self) -> None:
+        """Grava a pose atual e acrescenta ao histórico os comandos desde o último checkpoint."""
+        if not self._pending_count:
+            return
+        probe = self.probe
+        executed = ExecutedMove(probe.id, self._saved_position, self._saved_direction, "".join(self._pending))
+        with _probe_locks.hold([probe.id]):
+            try:
+                committed = self.service.repository.save_if_unchanged([probe])
+            except Exception:
+                self._rollback()
+                raise
+            if committed:
+                self.service._committed([probe], [executed])
+        if not committed:
+            self._rollback()
+            raise ProbeConflictError(f"A sonda '{probe.id}' foi alterada por outra requisição durante a fita.")
+
+        self._pending.clear()
+        self._pending_count = 0
+        self._saved_position = probe.position
+        self._saved_direction = probe.current_direction
+        self.checkpoints += 1
+        if events.enabled(INFO):
+            events.info("probe.stream_checkpoint", probe_id=probe.id, executed=self.executed,
+                        x=probe.position.x, y=probe.position.y)
+
+    def _rollback(self) -> None:
+        """
+        Tira do índice de ocupação a pose não gravada e marca a pose que está no
+        repositório, que pode ser a de outra requisição que gravou a sonda durante a
+        fita. Encerra a fita.
+        """
+        self.finished = True
+        if self.plateau is None:
+            return
+        with self.plateau.lock:
+            self.plateau.vacate(self.probe.position)
+            try:
+                stored = self.service.repository.get_by_id(self.probe.id)
+            except Exception:
+                stored = None
+            position = stored.position if stored is not None else self._saved_position
+            if not self.plateau.is_occupied(position):
+                self.plateau.occupy(position)
+
+    def close(self) -> StreamProgress:
+        self.checkpoint()
+        self.finished = True
+        return self.progress
+
+    def abort(self) -> None:
+        """Encerra uma fita interrompida: os comandos desde o último checkpoint são descartados."""
+        if not self.finished:
+            self._rollback()
+
+
 class ProbeService:
     """
     Service de Probe, gerencia todas funcionalidade como o Repositorio, Grid, Probe
     """
-    def __init__(self, probe_repository: IProbeRepository):
+    def __init__(self, probe_repository: IProbeRepository,
+                 trajectory_repository: Optional[ITrajectoryRepository] = None,
+                 checkpoint_interval: int = 1024,
+                 plateau_registry: Optional[PlateauRegistry] = None,
+                 read_model: Optional[IProbeReadModel] = None,
+                 max_retries: int = 5,
+                 retry_backoff: float = 0.002,
+                 coalescer: Optional[MoveCoalescer] = None,
+                 stream_checkpoint_interval: int = 4096,
+                 telemetry: Optional[TelemetryHub] = None,
+                 json_cache: Optional[ProbeJsonCache] = None,
+                 executor: Optional[CommandExecutor] = None,
+                 spatial_index: Optional[SpatialIndex] = None):
         self.repository = probe_repository
+        self.executor = executor
+        self.spatial_index = spatial_index
+        self.telemetry = telemetry
+        self.json_cache = json_cache
+        self.stream_checkpoint_interval = stream_checkpoint_interval
+        self.coalescer = coalescer
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.read_model = read_model if read_model is not None else RepositoryProbeReadModel(probe_repository)
+        self.trajectory = trajectory_repository
+        self.checkpoint_interval = checkpoint_interval
+        self.plateaus = plateau_registry if plateau_registry is not None else PlateauRegistry()
 
-    def launch_probe(self, max_x: int, max_y: int, direction_str: str) -> Probe:
-        try:
-            initial_direction = Direction(direction_str.upper())
-        except ValueError:
-            raise InvalidCommandError(f"Direção inválida: '{direction_str}'. Use NORTH, EAST, SOUTH ou WEST.")
+    def _committed(self, probes: list[Probe], moves: list[ExecutedMove]) -> None:
+        """Depois de cada gravação: histórico de trajetória, JSON em cache, índice espacial e poses para a telemetria."""
+        self._record(moves)
+        if self.json_cache is not None:
+            self.json_cache.invalidate(probe.id for probe in probes)
+        if self.spatial_index is not None:
+            self.spatial_index.update(ProbeView.from_probe(probe) for probe in probes)
+        if self.telemetry is not None:
+            self.telemetry.publish(probes)
 
-        grid = Grid(max_x=max_x, max_y=max_y)
-        new_probe = Probe(grid=grid, initial_direction=initial_direction)
+    def _record(self, moves: list[ExecutedMove]) -> None:
+        """Acrescenta os movimentos ao histórico de trajetória, se ele estiver ativo."""
+        if self.trajectory is None or not moves:
+            return
+        segments = []
+        next_seqs: dict[str, int] = {}
+        for move in moves:
+            if not move.commands:
+                # Um movimento vazio não gera trecho; o próximo começa no mesmo `start_seq`.
+                continue
+            start_seq = next_seqs.get(move.probe_id)
+            if start_seq is None:
+                start_seq = self.trajectory.end_seq(move.probe_id) or 0
+            segments.extend(build_segments(
+                move.probe_id, start_seq, move.position, move.direction, move.commands, self.checkpoint_interval
+            ))
+            next_seqs[move.probe_id] = start_seq + len(move.commands)
+        self.trajectory.append(segments)
 
-        self.repository.save(new_probe)
-        return new_probe
-
-    def move_probe(self, probe_id: str, commands: str) -> Probe:
+    def _get_probe(self, probe_id: str) -> Probe:
         probe = self.repository.get_by_id(probe_id)
         if not probe:
             raise ProbeNotFoundError(f"Sonda com ID '{probe_id}' não encontrada.")
+        return probe
+
+    def _plateau_for(self, probe: Probe) -> Optional[Plateau]:
+        """Planalto da sonda, criado (e com a sonda indexada) se ainda não for conhecido pelo processo."""
+        if probe.plateau_name is None:
+            return None
+        plateau = self.plateaus.get(probe.plateau_name)
+        if plateau is None:
+            plateau = self.plateaus.get_or_create(probe.plateau_name, probe.grid)
+            with plateau.lock:
+                if not plateau.is_occupied(probe.position):
+                    plateau.occupy(probe.position)
+        return plateau
+
+    def _launch_plateaus(self, probes: list[Probe]) -> dict[str, Plateau]:
+        try:
+            return {p.plateau_name: self.plateaus.get_or_create(p.plateau_name, p.grid) for p in probes if p.plateau_name}
+        except PlateauMismatchError as e:
+            raise InvalidCommandError(str(e))
+
+    @timed
+    def launch_probe(self, max_x: int, max_y: int, direction_str: str,
+                     plateau: Optional[str] = None, x: int = 0, y: int = 0) -> Probe:
+        return self._launch([LaunchSpec(max_x, max_y, direction_str, plateau, x, y)])[0]
+
+    @timed
+    def launch_probes(self, specs: list[LaunchSpec]) -> list[str]:
+        """
+        Lança várias sondas com uma única inserção em lote. Aceita LaunchSpec ou
+        tuplas (max_x, max_y, direção). Retorna os IDs gerados, na ordem das especificações.
+        """
+        return [p.id for p in self._launch([LaunchSpec(*spec) for spec in specs], bulk=True)]
+
+    def _launch(self, specs: list[LaunchSpec], bulk: bool = False) -> list[Probe]:
+        """
+        Cria e persiste as sondas. Sondas de planaltos compartilhados ocupam a
+        célula inicial, que não pode estar ocupada por outra sonda.
+        """
+        new_probes = [new_probe(spec) for spec in specs]
+        plateaus = self._launch_plateaus(new_probes)
+
+        with ExitStack() as stack:
+            for name in sorted(plateaus):
+                stack.enter_context(plateaus[name].lock)
+
+            occupied: list[Probe] = []
+            try:
+                for probe in new_probes:
+                    if probe.plateau_name:
+                        plateaus[probe.plateau_name].occupy(probe.position)
+                        occupied.append(probe)
+                if bulk:
+                    self.repository.add_many(new_probes)
+                else:
+                    self.repository.save(new_probes[0])
+            except CellOccupiedError as e:
+                self._vacate(plateaus, occupied)
+                raise InvalidCommandError(str(e))
+            except Exception:
+                self._vacate(plateaus, occupied)
+                raise
+
+        self._committed(new_probes, [])
+        return new_probes
+
+    @staticmethod
+    def _vacate(plateaus: dict[str, Plateau], probes: list[Probe]) -> None:
+        for probe in probes:
+            plateaus[probe.plateau_name].vacate(probe.position)
+
+    def _wait_before_retry(self, attempt: int) -> None:
+        metrics.inc("mars_move_retries_total")
+        time.sleep(retry_delay(attempt, self.retry_backoff))
+
+    @timed
+    def move_probe(self, probe_id: str, commands: str) -> Probe:
+        """
+        Lê a sonda, aplica os comandos e grava com compare-and-swap. Se outra requisição
+        gravou a sonda nesse meio-tempo, tenta de novo a partir do estado novo, até
+        `max_retries` vezes, e então levanta ProbeConflictError. Com um coalescedor,
+        movimentos simultâneos da mesma sonda são gravados juntos (ver MoveCoalescer).
+        Sequências longas vão para o pool de processos do executor (ver CommandExecutor).
+        """
+        if self.coalescer is not None:
+            return self.coalescer.submit(probe_id, commands, lambda group: self._move_group(probe_id, group))
+        outcome = self._move_group(probe_id, [commands])[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _move_group(self, probe_id: str, command_groups: list[str]) -> list[MoveOutcome]:
+        """
+        Executa as sequências em ordem sobre uma única leitura da sonda e grava uma vez.
+        Uma sequência inválida não altera a sonda e não impede as seguintes. Cada
+        resultado é a sonda na pose após a sua sequência (o último, a própria sonda)
+        ou o erro dela (InvalidCommandError ou, com o pool cheio, CommandPoolBusyError).
+        """
+        for attempt in range(self.max_retries + 1):
+            probe = self._get_probe(probe_id)
+            plateau = self._plateau_for(probe)
+
+            with plateau.lock if plateau else nullcontext():
+                if plateau:
+                    # Relida com o lock do planalto: outra requisição pode tê-la movido.
+                    probe = self._get_probe(probe_id)
+                    probe.occupancy = plateau
+                start = probe.position
 
-        valid_commands = {'L', 'R', 'M'}
-        if not all(command in valid_commands for command in commands.upper()):
-            raise InvalidCommandError("A sequência de comandos contém caracteres inválidos.")
+                outcomes: list[MoveOutcome] = []
+                executed: list[ExecutedMove] = []
+                for index, commands in enumerate(command_groups):
+                    try:
+                        executed.append(apply_commands(probe, commands, self.executor))
+                    except (InvalidCommandError, CommandPoolBusyError) as e:
+                        outcomes.append(e)
+                        continue
+                    outcomes.append(probe if index == len(command_groups) - 1 else copy.copy(probe))
+                if not executed:
+                    return outcomes
 
+                with _probe_locks.hold([probe_id]):
+                    try:
+                        committed = self.repository.save_if_unchanged([probe])
+                    except Exception:
+                        if plateau:
+                            plateau.relocate(probe.position, start)
+                        raise
+                    if committed:
+                        self._committed([probe], executed)
+                if not committed and plateau:
+                    plateau.relocate(probe.position, start)
+
+            if committed:
+                for outcome in outcomes:
+                    if isinstance(outcome, Probe):
+                        outcome.version = probe.version
+                return outcomes
+            self._wait_before_retry(attempt)
+
+        raise ProbeConflictError(f"A sonda '{probe_id}' foi alterada por outra requisição; tente novamente.")
+
+    @timed
+    def move_probes_batch(self, moves: list[tuple[str, str]], atomic: bool = False) -> BatchMoveReport:
+        """
+        Aplica uma lista de (probe_id, comandos) carregando todas as sondas em uma
+        única consulta e persistindo as alterações em uma única transação.
+        Sem `atomic`, a falha de um item não impede os demais. Com `atomic`,
+        qualquer falha faz com que nada seja persistido. Se alguma sonda foi
+        gravada por outra requisição, o lote inteiro é refeito, como em `move_probe`.
+        """
+        probe_ids = [probe_id for probe_id, _ in moves]
+        for attempt in range(self.max_retries + 1):
+            probes = self.repository.get_many(probe_ids)
+            plateaus = {p.plateau_name: self._plateau_for(p) for p in probes.values() if p.plateau_name}
+
+            with ExitStack() as stack:
+                for name in sorted(plateaus):
+                    stack.enter_context(plateaus[name].lock)
+                if plateaus:
+                    probes = self.repository.get_many(probe_ids)
+                    for probe in probes.values():
+                        if probe.plateau_name:
+                            probe.occupancy = plateaus[probe.plateau_name]
+                starts = {probe_id: p.position for probe_id, p in probes.items() if p.occupancy}
+
+                try:
+                    report, changed, executed = run_batch(probes, moves, atomic, self.executor)
+                except CommandPoolBusyError:
+                    self._restore(probes, starts)
+                    raise
+                if not changed:
+                    self._restore(probes, starts)
+                    return report
+
+                with _probe_locks.hold(p.id for p in changed):
+                    try:
+                        committed = self.repository.save_if_unchanged(changed)
+                    except Exception:
+                        self._restore(probes, starts)
+                        raise
+                    if committed:
+                        self._committed(changed, executed)
+                if not committed:
+                    self._restore(probes, starts)
+
+            if committed:
+                return report
+            self._wait_before_retry(attempt)
+
+        raise ProbeConflictError("Sondas do lote foram alteradas por outra requisição; tente novamente.")
+
+    @timed
+    def store_fleet(self, engine: FleetEngine) -> int:
+        """
+        Grava as sondas que o FleetEngine deixou dentro da malha, com compare-and-swap
+        sobre as versões carregadas, e roda os mesmos passos de um movimento depois da
+        gravação. Em planaltos compartilhados só as células finais são conferidas no
+        índice de ocupação. Se alguma sonda foi gravada depois do carregamento, ou se a
+        célula final de uma sonda está ocupada, nada é gravado. Retorna quantas foram gravadas.
+        """
+        probes = {probe.id: probe for probe in engine.to_probes()}
+        if not probes:
+            return 0
+        executed = engine.executed()
+        starts = {probe_id: executed[probe_id][0] for probe_id, p in probes.items() if p.plateau_name}
+        plateaus = {}
+        for probe_id in starts:
+            start = copy.copy(probes[probe_id])
+            start.place(*executed[probe_id][:2])
+            plateaus[start.plateau_name] = self._plateau_for(start)
+            probes[probe_id].occupancy = plateaus[start.plateau_name]
+
+        with ExitStack() as stack:
+            for name in sorted(plateaus):
+                stack.enter_context(plateaus[name].lock)
+            for probe_id, start in starts.items():
+                probes[probe_id].occupancy.vacate(start)
+            occupied: list[Probe] = []
+            try:
+                for probe_id in starts:
+                    probes[probe_id].occupancy.occupy(probes[probe_id].position)
+                    occupied.append(probes[probe_id])
+            except CellOccupiedError as e:
+                self._release(occupied, probes, starts)
+                raise InvalidCommandError(str(e))
+
+            changed = list(probes.values())
+            with _probe_locks.hold(probes):
+                try:
+                    committed = self.repository.save_if_unchanged(changed)
+                except Exception:
+                    self._release(changed, probes, starts)
+                    raise
+                if committed:
+                    self._committed(changed, [ExecutedMove(probe_id, *move) for probe_id, move in executed.items()])
+            if not committed:
+                self._release(changed, probes, starts)
+                raise ProbeConflictError("Sondas da frota foram alteradas depois do carregamento; carregue de novo.")
+        return len(changed)
+
+    @staticmethod
+    def _release(occupied: list[Probe], probes: dict[str, Probe], starts: dict[str, Position]) -> None:
+        """Desfaz store_fleet no índice de ocupação: libera as células finais ocupadas e volta às iniciais."""
+        for probe in occupied:
+            if probe.occupancy is not None:
+                probe.occupancy.vacate(probe.position)
+        for probe_id, start in starts.items():
+            probes[probe_id].occupancy.occupy(start)
+
+    @staticmethod
+    def _restore(probes: dict[str, Probe], starts: dict[str, Position]) -> None:
+        """Devolve ao índice de ocupação as posições do início do lote (primeiro libera tudo, depois ocupa)."""
+        for probe_id in starts:
+            probes[probe_id].occupancy.vacate(probes[probe_id].position)
+        for probe_id, start in starts.items():
+            probes[probe_id].occupancy.occupy(start)
+
+    @timed
+    def open_command_stream(self, probe_id: str, checkpoint_interval: Optional[int] = None) -> CommandStream:
+        """Prepara a execução incremental de uma fita de comandos (ver CommandStream)."""
+        probe = self._get_probe(probe_id)
+        plateau = self._plateau_for(probe)
+        if plateau:
+            with plateau.lock:
+                probe = self._get_probe(probe_id)
+                probe.occupancy = plateau
+        return CommandStream(self, probe, plateau, checkpoint_interval or self.stream_checkpoint_interval)
+
+    @timed
+    def plan_route(self, probe_id: str, target: Position, direction: Optional[Direction] = None,
+                   obstacles: frozenset[tuple[int, int]] = frozenset(), execute: bool = False) -> PlanResult:
+        """
+        Calcula a sequência de comandos mais curta da pose atual até o alvo, evitando
+        os obstáculos informados e, em planaltos compartilhados, as outras sondas.
+        Com `execute`, a sequência é aplicada em seguida como um movimento comum.
+        """
+        probe = self._get_probe(probe_id)
+        plateau = self._plateau_for(probe)
         try:
-            for command in commands.upper():
-                if command == 'L':
-                    probe.turn_left()
-                elif command == 'R':
-                    probe.turn_right()
-                elif command == 'M':
-                    probe.move()
+            if plateau is not None and plateau.occupied_count > 1:
+                # A ocupação muda a cada movimento: o plano não vai para o cache.
+                with plateau.lock:
+                    occupied = plateau.occupied_cells()
+                plan = plan_path(probe.grid, probe.position, probe.current_direction, target, direction,
+                                 occupied | obstacles)
+            else:
+                plan = plan_cached(probe.grid.max_x, probe.grid.max_y, probe.position, probe.current_direction,
+                                   target, direction, obstacles)
         except InvalidMoveError as e:
-            raise InvalidCommandError(f"A sequência de comandos '{commands}' resultou em um movimento inválido. Detalhes: {e}")
+            raise InvalidCommandError(str(e))
 
-        self.repository.save(probe)
-        return probe
+        result = PlanResult(probe_id=probe_id, plan=plan)
+        if execute:
+            result.probe = self.move_probe(probe_id, plan.commands) if plan.commands else probe
+        return result
+
+    # As consultas devolvem projeções do read model, sem montar sondas do domínio.
+    @timed
+    def get_probe(self, probe_id: str) -> ProbeView:
+        view = self.read_model.get(probe_id)
+        if view is None:
+            raise ProbeNotFoundError(f"Sonda com ID '{probe_id}' não encontrada.")
+        return view
+
+    @timed
+    def get_all_probes(self) -> list[ProbeView]:
+        return self.read_model.get_all()
+
+    @timed
+    def get_probes_page(self, limit: int, after: Optional[str] = None) -> list[ProbeView]:
+        return self.read_model.get_page(limit, after)
+
+    def iter_probes(self) -> Iterator[ProbeView]:
+        return self.read_model.iter_all()
+
+    @timed
+    def get_probes_within(self, region: Region, limit: Optional[int] = None,
+                          after: Optional[str] = None) -> list[ProbeView]:
+        return self.read_model.get_within(region, limit, after)
+
+    @timed
+    def nearest_probes(self, x: int, y: int, k: int) -> list[tuple[float, ProbeView]]:
+        """As `k` sondas mais próximas de (x, y), com a distância; sem índice espacial, percorre a frota."""
+        if self.spatial_index is not None:
+            return self.spatial_index.nearest(x, y, k)
+        return nearest_by_scan(self.read_model.iter_all(), x, y, k)
+
+    @timed
+    def fleet_version(self) -> int:
+        """Versão da frota, para a ETag das listagens. Deve ser lida antes das sondas."""
+        return self.read_model.fleet_version()
+
+    @timed
+    def telemetry_snapshot(self, probe_ids: frozenset[str] = frozenset(),
+                           plateau: Optional[str] = None) -> list[ProbeView]:
+        """Poses atuais para o início de uma assinatura de telemetria, com os mesmos filtros dela."""
+        if not probe_ids and plateau is None:
+            return self.read_model.get_all()
+        views = [view for view in map(self.read_model.get, sorted(probe_ids)) if view is not None]
+        if plateau is not None:
+            views.extend(view for view in self.read_model.get_on_plateau(plateau) if view.id not in probe_ids)
+        return views
 
-    def get_all_probes(self) -> list[Probe]:
-        return self.repository.get_all()
\ No newline at end of file
+    @timed
+    def get_pose_at(self, probe_id: str, seq: int) -> tuple[Position, Direction]:
+        """Reconstrói a pose da sonda depois de `seq` comandos, a partir do checkpoint mais próximo."""
+        segment = self.trajectory.find_segment(probe_id, seq) if self.trajectory else None
+        if segment is None and seq == 0 and self.trajectory is not None:
+            # Sem nenhum trecho, a sonda ainda não se moveu: a pose atual é a do lançamento.
+            probe = self.repository.get_by_id(probe_id)
+            if probe is not None:
+                return probe.position, probe.current_direction
+        if segment is None or seq > segment.end_seq:
+            raise ProbeNotFoundError(f"A posição {seq} não existe no histórico da sonda '{probe_id}'.")
+        return segment.pose_at(seq)
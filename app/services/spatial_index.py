@@ -0,0 +1,128 @@
+import heapq
+import math
+import threading
+from typing import Iterable, Iterator
+
+from app.repositories.probe_read_model import ProbeView
+
+
+def nearest_by_scan(views: Iterable[ProbeView], x: int, y: int, k: int) -> list[tuple[float, ProbeView]]:
+    """As `k` sondas mais próximas de (x, y), percorrendo todas; empates pelo ID."""
+    ranked = heapq.nsmallest(k, ((((v.x - x) ** 2 + (v.y - y) ** 2), v.id, v) for v in views))
+    return [(math.sqrt(d2), view) for d2, _, view in ranked]
+
+
+class SpatialIndex:
+    """
+    Índice em memória das poses da frota para as consultas de sondas mais próximas:
+    uma grade de baldes de `cell_size` x `cell_size` células, percorrida em anéis a
+    partir do balde do ponto até que nenhum balde ainda não visto possa ter uma sonda
+    mais próxima que a k-ésima encontrada. Quando os anéis passariam a ter mais
+    baldes do que os ocupados, os baldes restantes são visitados em ordem de distância.
+
+    O ProbeService o atualiza a cada gravação confirmada e a inicialização o reconstrói
+    a partir do banco. Como os planaltos, só enxerga as gravações deste processo.
+    """
+    def __init__(self, cell_size: int = 64):
+        if cell_size < 1:
+            raise ValueError("cell_size deve ser pelo menos 1.")
+        self.cell_size = cell_size
+        self._views: dict[str, ProbeView] = {}
+        self._buckets: dict[tuple[int, int], dict[str, ProbeView]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def _bucket_key(self, x: int, y: int) -> tuple[int, int]:
+        return x // self.cell_size, y // self.cell_size
+
+    def _store(self, view: ProbeView) -> None:
+        """Deve ser chamado com o lock."""
+        old = self._views.get(view.id)
+        if old is not None:
+            if old.version > view.version:
+                return
+            key = self._bucket_key(old.x, old.y)
+            bucket = self._buckets[key]
+            del bucket[old.id]
+            if not bucket:
+                del self._buckets[key]
+        self._views[view.id] = view
+        self._buckets.setdefault(self._bucket_key(view.x, view.y), {})[view.id] = view
+
+    def update(self, views: Iterable[ProbeView]) -> None:
+        """Registra as poses gravadas; uma versão mais antiga que a indexada é ignorada."""
+        with self._lock:
+            for view in views:
+                self._store(view)
+
+    def rebuild(self, views: Iterable[ProbeView]) -> int:
+        with self._lock:
+            self._views.clear()
+            self._buckets.clear()
+            for view in views:
+                self._store(view)
+            return len(self._views)
+
+    def _ring(self, center_x: int, center_y: int, radius: int) -> Iterator[tuple[int, int]]:
+        """Baldes a exatamente `radius` baldes (distância de Chebyshev) do balde central."""
+        if radius == 0:
+            yield center_x, center_y
+            return
+        for bucket_x in range(center_x - radius, center_x + radius + 1):
+            yield bucket_x, center_y - radius
+            yield bucket_x, center_y + radius
+        for bucket_y in range(center_y - radius + 1, center_y + radius):
+            yield center_x - radius, bucket_y
+            yield center_x + radius, bucket_y
+
+    def _bucket_distance2(self, key: tuple[int, int], x: int, y: int) -> int:
+        """Menor distância (ao quadrado) de (x, y) a uma célula do balde."""
+        low_x, low_y = key[0] * self.cell_size, key[1] * self.cell_size
+        dx = x - min(max(x, low_x), low_x + self.cell_size - 1)
+        dy = y - min(max(y, low_y), low_y + self.cell_size - 1)
+        return dx * dx + dy * dy
+
+    def nearest(self, x: int, y: int, k: int) -> list[tuple[float, ProbeView]]:
+        """As `k` sondas mais próximas de (x, y), com a distância euclidiana; empates pelo ID."""
+        with self._lock:
+            if k < 1 or not self._views:
+                return []
+            candidates: list[tuple[int, str, ProbeView]] = []
+            # As k menores distâncias vistas, negadas (heap de máximo): -kth[0] é a k-ésima.
+            kth: list[int] = []
+
+            def visit(bucket: dict[str, ProbeView]) -> None:
+                for view in bucket.values():
+                    d2 = (view.x - x) ** 2 + (view.y - y) ** 2
+                    candidates.append((d2, view.id, view))
+                    if len(kth) < k:
+                        heapq.heappush(kth, -d2)
+                    elif d2 < -kth[0]:
+                        heapq.heapreplace(kth, -d2)
+
+            center_x, center_y = self._bucket_key(x, y)
+            radius = 0
+            while True:
+                for key in self._ring(center_x, center_y, radius):
+                    bucket = self._buckets.get(key)
+                    if bucket:
+                        visit(bucket)
+                # Fora dos anéis já vistos, toda sonda está a mais de radius * cell_size do ponto.
+                reach = radius * self.cell_size
+                if len(kth) == k and -kth[0] <= reach * reach or len(candidates) == len(self._views):
+                    break
+                radius += 1
+                if 8 * radius > len(self._buckets):
+                    remaining = sorted(
+                        (self._bucket_distance2(key, x, y), key) for key in self._buckets
+                        if max(abs(key[0] - center_x), abs(key[1] - center_y)) >= radius
+                    )
+                    for d2, key in remaining:
+                        if len(kth) == k and d2 > -kth[0]:
+                            break
+                        visit(self._buckets[key])
+                    break
+
+            return [(math.sqrt(d2), view) for d2, _, view in heapq.nsmallest(k, candidates)]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+from typing import Iterable, Optional
+
+from app.domain.models import Probe
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def sse_event(name: str, data: dict) -> bytes:
+    """Mensagem Server-Sent Events já codificada, pronta para ser enviada a vários consumidores."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class TelemetrySubscription:
+    """
+    Assinatura de poses de um consumidor (uma conexão SSE). Guarda só a última pose
+    pendente de cada sonda: um consumidor lento recebe as poses intermediárias
+    fundidas, e quem grava nunca espera por ele. Se as sondas pendentes passarem de
+    `max_pending`, elas são descartadas e o consumidor recebe um snapshot novo.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, probe_ids: frozenset[str] = frozenset(),
+                 plateau: Optional[str] = None, max_pending: int = 10_000):
+        self.probe_ids = probe_ids
+        self.plateau = plateau
+        self.max_pending = max_pending
+        self.coalesced = 0
+        self.resyncs = 0
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._pending: dict[str, bytes] = {}
+        self._resync = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, probe_id: str, payload: bytes) -> None:
+        """Chamado pelas threads que gravam as sondas."""
+        with self._lock:
+            was_idle = not self._pending and not self._resync
+            if probe_id in self._pending:
+                self.coalesced += 1
+            elif self._resync:
+                return
+            elif len(self._pending) >= self.max_pending:
+                self._pending.clear()
+                self._resync = True
+                self.resyncs += 1
+                return
+            self._pending[probe_id] = payload
+        if was_idle:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # O loop da conexão já foi encerrado; a assinatura está sendo removida.
+                pass
+
+    async def next_batch(self) -> tuple[bool, list[bytes]]:
+        """Espera por poses novas. Retorna (precisa de snapshot, poses pendentes)."""
+        await self._wakeup.wait()
+        with self._lock:
+            self._wakeup.clear()
+            batch = list(self._pending.values())
+            self._pending.clear()
+            resync, self._resync = self._resync, False
+        return resync, batch
+
+
+class TelemetryHub:
+    """
+    Distribui as poses gravadas pelo ProbeService às assinaturas. Cada pose é
+    serializada uma única vez e a mesma mensagem vai para todos os interessados,
+    encontrados por índices de ID de sonda e de planalto.
+    """
+    def __init__(self, max_pending: int = 10_000):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscriptions: set[TelemetrySubscription] = set()
+        self._everything: set[TelemetrySubscription] = set()
+        self._by_probe: dict[str, set[TelemetrySubscription]] = {}
+        self._by_plateau: dict[str, set[TelemetrySubscription]] = {}
+        self.published = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, probe_ids: Iterable[str] = (),
+                  plateau: Optional[str] = None) -> TelemetrySubscription:
+        """Sem filtros, a assinatura recebe todas as sondas; com IDs e planalto, a união dos dois."""
+        subscription = TelemetrySubscription(loop, frozenset(probe_ids), plateau, self.max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if not subscription.probe_ids and plateau is None:
+                self._everything.add(subscription)
+            for probe_id in subscription.probe_ids:
+                self._by_probe.setdefault(probe_id, set()).add(subscription)
+            if plateau is not None:
+                self._by_plateau.setdefault(plateau, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: TelemetrySubscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            self._everything.discard(subscription)
+            for index, keys in ((self._by_probe, subscription.probe_ids), (self._by_plateau, [subscription.plateau])):
+                for key in keys:
+                    subscribers = index.get(key)
+                    if subscribers is not None:
+                        subscribers.discard(subscription)
+                        if not subscribers:
+                            del index[key]
+
+    def publish(self, probes: Iterable[Probe]) -> None:
+        """Chamado depois de cada gravação, na ordem das versões de cada sonda."""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            for probe in probes:
+                targets = set(self._everything)
+                targets.update(self._by_probe.get(probe.id, ()))
+                if probe.plateau_name is not None:
+                    targets.update(self._by_plateau.get(probe.plateau_name, ()))
+                if not targets:
+                    continue
+                payload = sse_event("pose", {
+                    "id": probe.id,
+                    "x": probe.position.x,
+                    "y": probe.position.y,
+                    "direction": probe.current_direction.value,
+                    "version": probe.version,
+                })
+                self.published += 1
+                for subscription in targets:
+                    subscription.push(probe.id, payload)
@@ -0,0 +1,95 @@
+"""
+Compara a pilha síncrona (rotas def + SQLAlchemy síncrono, rodando no threadpool)
+com a pilha assíncrona (rotas async def + aiosqlite) sob concorrência crescente.
+
+Uso:
+    python -m benchmarks.bench_async_stack --requests 2000 --concurrency 1 16 64 256
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.endpoints import async_probe_routes, probe_routes
+from app.api.endpoints.dependencies import get_async_probe_service, get_probe_service
+from app.database import Base
+from app.repositories.async_sqlalchemy_probe_repository import AsyncSQLAlchemyProbeRepository
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from app.services.async_probe_service import AsyncProbeService
+from app.services.probe_service import ProbeService
+from benchmarks.common import summarize, write_report
+
+
+def build_app(stack: str, database_path: Path) -> FastAPI:
+    app = FastAPI()
+    if stack == "async":
+        engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+        service = AsyncProbeService(AsyncSQLAlchemyProbeRepository(async_sessionmaker(engine, expire_on_commit=False)))
+        app.include_router(async_probe_routes.router, prefix="/api")
+        app.dependency_overrides[get_async_probe_service] = lambda: service
+    else:
+        engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+        service = ProbeService(SQLAlchemyProbeRepository(sessionmaker(bind=engine, autoflush=False)))
+        app.include_router(probe_routes.router, prefix="/api")
+        app.dependency_overrides[get_probe_service] = lambda: service
+    return app
+
+
+async def run_load(app: FastAPI, total_requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        launch = await client.post("/api/probes", json={"x": 1_000_000, "y": 1_000_000, "direction": "NORTH"})
+        probe_id = launch.json()["id"]
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+
+        async def one_request(index: int):
+            async with semaphore:
+                started = time.perf_counter()
+                if index % 2:
+                    await client.post(f"/api/probes/{probe_id}/move", json={"commands": "RRRR"})
+                else:
+                    await client.get("/api/probes")
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 1),
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for stack in ("sync", "async"):
+            database_path = Path(directory) / f"{stack}.db"
+            Base.metadata.create_all(create_engine(f"sqlite:///{database_path}"))
+            app = build_app(stack, database_path)
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_load(app, args.requests, concurrency))
+                results.append({"stack": stack, **result})
+
+    write_report("async_stack", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
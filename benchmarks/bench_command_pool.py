@@ -0,0 +1,85 @@
+"""
+Latência de movimentos curtos enquanto outras threads executam sequências longas,
+com as longas na própria thread (sem executor) e no pool de processos do
+CommandExecutor. Mede também a duração das próprias sequências longas.
+
+Uso:
+    python -m benchmarks.bench_command_pool --long-commands 2000000 --long-threads 2 --workers 2 --output pool.json
+"""
+import argparse
+import threading
+import time
+from typing import Optional
+
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.services.command_executor import CommandExecutor
+from app.services.probe_service import ProbeService
+from benchmarks.common import summarize, write_report
+
+
+def run_scenario(executor: Optional[CommandExecutor], long_commands: int, long_threads: int,
+                 short_moves: int) -> tuple[list[float], list[float]]:
+    """Devolve (latências dos movimentos curtos, durações dos longos), em segundos."""
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), executor=executor)
+    side = long_commands + 1
+    # Ida e volta: a sonda termina onde começou e a sequência pode ser repetida.
+    long_sequence = "M" * (long_commands // 2) + "RR" + "M" * (long_commands // 2) + "RR"
+    long_ids = [service.launch_probe(side, side, "NORTH").id for _ in range(long_threads)]
+    short_id = service.launch_probe(1000, 1000, "NORTH").id
+    stop = threading.Event()
+    long_durations: list[float] = []
+
+    def long_worker(probe_id: str) -> None:
+        # Sequências diferentes a cada vez, como as de clientes reais, para não cair no cache de compilação.
+        for iteration in range(1, 1 << 30):
+            if stop.is_set():
+                return
+            started = time.perf_counter()
+            service.move_probe(probe_id, "LR" * iteration + long_sequence)
+            long_durations.append(time.perf_counter() - started)
+
+    # A primeira sequência longa cria o pool de processos; fica fora da medição.
+    service.move_probe(long_ids[0], long_sequence)
+
+    threads = [threading.Thread(target=long_worker, args=(probe_id,)) for probe_id in long_ids]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    latencies = []
+    for _ in range(short_moves):
+        started = time.perf_counter()
+        service.move_probe(short_id, "RMLM" if _ % 2 == 0 else "LMRM")
+        latencies.append(time.perf_counter() - started)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, long_durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--long-commands", type=int, default=2_000_000)
+    parser.add_argument("--long-threads", type=int, default=2)
+    parser.add_argument("--short-moves", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threshold", type=int, default=20_000)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    results = []
+    for mode in ("inline", "pool"):
+        executor = CommandExecutor(args.threshold, args.workers, max_queue=args.long_threads) if mode == "pool" else None
+        try:
+            latencies, long_durations = run_scenario(executor, args.long_commands, args.long_threads, args.short_moves)
+        finally:
+            if executor is not None:
+                executor.close()
+        results.append({"name": f"command_pool.{mode}.short_move", **summarize(latencies)})
+        results.append({"name": f"command_pool.{mode}.long_move", "commands": args.long_commands + 4,
+                        **summarize(long_durations)})
+
+    write_report("command_pool", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Planejamento de rotas em malhas grandes: fórmula fechada (malha vazia), A* com
+obstáculos que bloqueiam os dois caminhos em "L" (mais outros espalhados pela
+malha), e o ganho do cache de planos.
+
+Uso:
+    python -m benchmarks.bench_planning --grid-sizes 100 10000 1000000 --obstacles 100 --output planning.json
+"""
+import argparse
+import random
+
+from app.domain.models import Grid, Position
+from app.domain.planning import plan_cached, plan_path
+from app.domain.state import Direction
+from benchmarks.common import measure, write_report
+
+
+def random_obstacles(size: int, count: int, start: Position, goal: Position,
+                     rng: random.Random) -> frozenset[tuple[int, int]]:
+    """Um obstáculo em cada lado do quadrado, para forçar o A*, e `count` espalhados."""
+    edge = size - 1
+    cells = {(0, rng.randrange(1, edge)), (rng.randrange(1, edge), edge),
+             (rng.randrange(1, edge), 0), (edge, rng.randrange(1, edge))}
+    cells.update((rng.randrange(size), rng.randrange(size)) for _ in range(count))
+    cells.discard((start.x, start.y))
+    cells.discard((goal.x, goal.y))
+    return frozenset(cells)
+
+
+def bench_grid(size: int, count: int, repeat: int, rng: random.Random) -> list[dict]:
+    grid = Grid(size - 1, size - 1)
+    start, goal = Position(0, 0), Position(size - 1, size - 1)
+    results = [
+        {"name": "plan.closed_form", "grid_size": size,
+         **measure(lambda: plan_path(grid, start, Direction.SOUTH, goal, Direction.WEST), repeat)},
+    ]
+
+    obstacles = random_obstacles(size, count, start, goal, rng)
+    plan = plan_path(grid, start, Direction.SOUTH, goal, Direction.WEST, obstacles)
+    results.append({"name": "plan.obstacles", "grid_size": size, "obstacles": len(obstacles),
+                    "algorithm": plan.algorithm, "commands": len(plan.commands),
+                    **measure(lambda: plan_path(grid, start, Direction.SOUTH, goal, Direction.WEST, obstacles),
+                              max(1, repeat // 10), warmup=1)})
+
+    plan_cached.cache_clear()
+    results.append({"name": "plan.cached", "grid_size": size, "obstacles": len(obstacles),
+                    **measure(lambda: plan_cached(size - 1, size - 1, start, Direction.SOUTH, goal,
+                                                  Direction.WEST, obstacles), repeat, warmup=1)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--obstacles", type=int, default=100, help="Obstáculos espalhados, além dos que bloqueiam o L")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for size in args.grid_sizes:
+        results.extend(bench_grid(size, args.obstacles, args.repeat, rng))
+
+    write_report("planning", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
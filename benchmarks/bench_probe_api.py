@@ -0,0 +1,128 @@
+"""
+Microbenchmarks do serviço, do repositório SQLAlchemy e das rotas.
+
+- service.move_probe: sequências de comandos de tamanho crescente;
+- repository.save / get_by_id / get_all: frotas de tamanhos diferentes em SQLite;
+- route.*: latência ponta a ponta pelo app FastAPI (sem rede).
+
+Uso:
+    python -m benchmarks.bench_probe_api --output bench.json
+    python -m benchmarks.bench_probe_api --fleet-sizes 100 1000 --command-lengths 10 1000 --repeat 50
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from app.domain.commands import compile_commands
+from app.domain.models import Grid, Probe
+from app.domain.state import Direction
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from app.services.probe_service import ProbeService
+from benchmarks.bench_async_stack import build_app
+from benchmarks.common import measure, sqlite_session_factory, summarize, write_report
+
+GRID_SIZE = 1_000_000
+
+
+def random_commands(length: int, rng: random.Random) -> str:
+    # Giros e blocos de ida e volta: a sonda, lançada no centro da malha, nunca se afasta dele.
+    blocks = [rng.choice(("L", "R", "MRRMRR")) for _ in range(length // 3 + 1)]
+    return "".join(blocks)[:length]
+
+
+def bench_move_probe(command_lengths: list[int], repeat: int, rng: random.Random) -> list[dict]:
+    results = []
+    service = ProbeService(InMemoryProbeRepository())
+    probe = service.launch_probe(GRID_SIZE, GRID_SIZE, "NORTH", x=GRID_SIZE // 2, y=GRID_SIZE // 2)
+    for length in command_lengths:
+        commands = random_commands(length, rng)
+        stats = measure(lambda: service.move_probe(probe.id, commands), repeat)
+        results.append({"name": "service.move_probe", "command_length": length, **stats})
+
+        def uncached():
+            # Sem o cache de compilação, mede também a compilação da sequência.
+            compile_commands.cache_clear()
+            service.move_probe(probe.id, commands)
+
+        results.append({"name": "service.move_probe_uncached", "command_length": length, **measure(uncached, repeat)})
+    return results
+
+
+def bench_repository(fleet_sizes: list[int], repeat: int, directory: Path, rng: random.Random) -> list[dict]:
+    results = []
+    for size in fleet_sizes:
+        repository = SQLAlchemyProbeRepository(sqlite_session_factory(directory / f"fleet_{size}.db"))
+        probes = [Probe(grid=Grid(GRID_SIZE, GRID_SIZE), initial_direction=Direction.NORTH) for _ in range(size)]
+        repository.add_many(probes)
+
+        def save():
+            probe = rng.choice(probes)
+            probe.turn_right()
+            repository.save(probe)
+
+        results.append({"name": "repository.save", "fleet_size": size, **measure(save, repeat)})
+        results.append({"name": "repository.get_by_id", "fleet_size": size,
+                        **measure(lambda: repository.get_by_id(rng.choice(probes).id), repeat)})
+        results.append({"name": "repository.get_all", "fleet_size": size,
+                        **measure(repository.get_all, max(1, repeat // 10), warmup=1)})
+    return results
+
+
+async def _route_latencies(app, repeat: int) -> list[dict]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        launch = await client.post("/api/probes", json={
+            "x": GRID_SIZE, "y": GRID_SIZE, "direction": "NORTH", "start_x": GRID_SIZE // 2, "start_y": GRID_SIZE // 2,
+        })
+        probe_id = launch.json()["id"]
+        requests = {
+            "route.launch": lambda: client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}),
+            "route.move": lambda: client.post(f"/api/probes/{probe_id}/move", json={"commands": "MRRMRR"}),
+            "route.list": lambda: client.get("/api/probes", params={"limit": 100}),
+        }
+        results = []
+        for name, request in requests.items():
+            latencies = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await request()
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            results.append({"name": name, **summarize(latencies)})
+        return results
+
+
+def bench_routes(repeat: int, directory: Path) -> list[dict]:
+    return asyncio.run(_route_latencies(build_app("sync", directory / "routes.db"), repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--command-lengths", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        sqlite_session_factory(directory / "routes.db")
+        results = (
+            bench_move_probe(args.command_lengths, args.repeat, rng)
+            + bench_repository(args.fleet_sizes, args.repeat, directory, rng)
+            + bench_routes(args.repeat, directory)
+        )
+
+    write_report("probe_api", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Custo por sonda da listagem: caminho ORM + domínio + ProbeResponse (como era o
+GET /api/probes) contra o read model com SQLAlchemy Core, com e sem o JSON de
+cada sonda em cache, e a latência ponta a ponta da rota (completa e com 304).
+
+Uso:
+    python -m benchmarks.bench_read_model --fleet-sizes 1000 10000 100000 --output read_model.json
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.endpoints import probe_routes
+from app.api.endpoints.dependencies import get_probe_service
+from app.api.schemas import AllProbesResponse, ProbeResponse
+from app.api.serialization import join_probe_list, view_to_json_bytes
+from app.domain.models import Grid, Probe
+from app.domain.state import Direction
+from app.repositories.sqlalchemy_probe_read_model import SQLAlchemyProbeReadModel
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from app.services.probe_json_cache import ProbeJsonCache
+from app.services.probe_service import ProbeService
+from benchmarks.common import measure, sqlite_session_factory, summarize, write_report
+
+
+def orm_listing(repository: SQLAlchemyProbeRepository) -> str:
+    probes = repository.get_all()
+    responses = [
+        ProbeResponse(id=p.id, x=p.position.x, y=p.position.y, direction=p.current_direction) for p in probes
+    ]
+    return AllProbesResponse(probes=responses).model_dump_json()
+
+
+def read_model_listing(read_model: SQLAlchemyProbeReadModel) -> str:
+    """Corpo da listagem montado direto das projeções, sem o JSON de cada sonda em cache."""
+    probes = [{"id": v.id, "x": v.x, "y": v.y, "direction": v.direction} for v in read_model.get_all()]
+    return json.dumps({"probes": probes, "next_after": None})
+
+
+def cached_listing(read_model: SQLAlchemyProbeReadModel, json_cache: ProbeJsonCache) -> bytes:
+    return join_probe_list(map(json_cache.get, read_model.get_all()))
+
+
+async def _route_latency(app: FastAPI, repeat: int, limit: int, conditional: bool = False) -> dict:
+    """Latência de GET /api/probes; com `conditional`, revalidando com a ETag da primeira resposta (304)."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {}
+        if conditional:
+            headers["If-None-Match"] = (await client.get("/api/probes", params={"limit": limit})).headers["ETag"]
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = await client.get("/api/probes", params={"limit": limit}, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def _per_row(stats: dict, rows: int) -> float:
+    return round(stats["p50_ms"] * 1000 / rows, 3)
+
+
+def bench_fleet(size: int, repeat: int, directory: Path) -> list[dict]:
+    session_factory = sqlite_session_factory(directory / f"fleet_{size}.db")
+    repository = SQLAlchemyProbeRepository(session_factory)
+    read_model = SQLAlchemyProbeReadModel(session_factory.kw["bind"])
+    repository.add_many([Probe(grid=Grid(100, 100), initial_direction=Direction.NORTH) for _ in range(size)])
+
+    orm = measure(lambda: orm_listing(repository), repeat, warmup=1)
+    core = measure(lambda: read_model_listing(read_model), repeat, warmup=1)
+    json_cache = ProbeJsonCache(view_to_json_bytes, max_entries=size)
+    cached = measure(lambda: cached_listing(read_model, json_cache), repeat, warmup=1)
+
+    app = FastAPI()
+    app.include_router(probe_routes.router, prefix="/api")
+    service = ProbeService(repository, read_model=read_model)
+    app.dependency_overrides[get_probe_service] = lambda: service
+    limit = min(size, probe_routes.MAX_PAGE_SIZE)
+    route = asyncio.run(_route_latency(app, repeat, limit))
+    not_modified = asyncio.run(_route_latency(app, repeat, limit, conditional=True))
+
+    return [
+        {"name": "listing.orm", "fleet_size": size, "per_row_us": _per_row(orm, size), **orm},
+        {"name": "listing.read_model", "fleet_size": size, "per_row_us": _per_row(core, size), **core},
+        {"name": "listing.json_cache", "fleet_size": size, "per_row_us": _per_row(cached, size), **cached},
+        {"name": "route.get_probes", "fleet_size": size, "page_size": limit, **route},
+        {"name": "route.get_probes_304", "fleet_size": size, "page_size": limit, **not_modified},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.fleet_sizes:
+            results.extend(bench_fleet(size, args.repeat, Path(directory)))
+
+    write_report("read_model", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Consultas espaciais por tamanho de frota, com densidade constante (a área cresce
+com a frota, então cada consulta encontra em média o mesmo número de sondas):
+região pelo índice (x, y) do banco contra get_all com filtro, e sondas mais
+próximas pelo SpatialIndex contra a varredura completa. Com os índices, o tempo
+deve ficar quase constante enquanto o das varreduras cresce com a frota.
+
+Uso:
+    python -m benchmarks.bench_spatial --fleet-sizes 1000 10000 100000 --output spatial.json
+"""
+import argparse
+import math
+import random
+import tempfile
+from pathlib import Path
+
+from app.domain.models import Grid, Position, Probe
+from app.domain.state import Direction
+from app.repositories.probe_read_model import Region
+from app.repositories.sqlalchemy_probe_read_model import SQLAlchemyProbeReadModel
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from app.services.spatial_index import SpatialIndex, nearest_by_scan
+from benchmarks.common import measure, sqlite_session_factory, write_report
+
+# Em média, uma sonda a cada DENSITY células.
+DENSITY = 100
+REGION_SIDE = 100
+
+
+def seed(repository: SQLAlchemyProbeRepository, fleet_size: int, side: int, rng: random.Random) -> None:
+    grid = Grid(side, side)
+    for offset in range(0, fleet_size, 5000):
+        repository.add_many([
+            Probe(grid=grid, initial_direction=Direction.NORTH,
+                  initial_position=Position(rng.randrange(side), rng.randrange(side)))
+            for _ in range(min(5000, fleet_size - offset))
+        ])
+
+
+def bench_fleet(fleet_size: int, k: int, repeat: int, rng: random.Random) -> list[dict]:
+    side = int(math.sqrt(fleet_size * DENSITY))
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = sqlite_session_factory(Path(directory) / "spatial.db")
+        seed(SQLAlchemyProbeRepository(session_factory), fleet_size, side, rng)
+        read_model = SQLAlchemyProbeReadModel(session_factory.kw["bind"])
+        views = read_model.get_all()
+        index = SpatialIndex()
+        index.rebuild(views)
+
+        def random_region() -> Region:
+            x, y = rng.randrange(side - REGION_SIDE), rng.randrange(side - REGION_SIDE)
+            return Region(x, y, x + REGION_SIDE, y + REGION_SIDE)
+
+        def random_point() -> tuple[int, int]:
+            return rng.randrange(side), rng.randrange(side)
+
+        common = {"fleet_size": fleet_size, "area_side": side}
+        return [
+            {"name": "spatial.within.xy_index", **common,
+             **measure(lambda: read_model.get_within(random_region()), repeat)},
+            {"name": "spatial.within.full_scan", **common,
+             **measure(lambda: [v for v in read_model.get_all() if random_region().contains(v.x, v.y)], repeat)},
+            {"name": "spatial.nearest.grid_index", "k": k, **common,
+             **measure(lambda: index.nearest(*random_point(), k), repeat)},
+            {"name": "spatial.nearest.full_scan", "k": k, **common,
+             **measure(lambda: nearest_by_scan(views, *random_point(), k), repeat)},
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for fleet_size in args.fleet_sizes:
+        results.extend(bench_fleet(fleet_size, args.k, args.repeat, rng))
+
+    write_report("spatial", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
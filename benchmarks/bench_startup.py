@@ -0,0 +1,109 @@
+"""
+Tempo de inicialização: importação de `main` em um processo novo e tempo até a
+primeira requisição (do início do processo do uvicorn até o primeiro 200 em
+/ready), com bancos vazios e com frotas já gravadas. Inclui as etapas do
+lifespan informadas pelo próprio /ready.
+
+Uso:
+    python -m benchmarks.bench_startup --fleet-sizes 0 10000 --repeat 5 --output startup.json
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from app.domain.models import Grid, Probe
+from app.domain.state import Direction
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from benchmarks.common import sqlite_session_factory, summarize, write_report
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(database_path: Path, fleet_size: int) -> None:
+    repository = SQLAlchemyProbeRepository(sqlite_session_factory(database_path))
+    for offset in range(0, fleet_size, 5000):
+        repository.add_many([
+            Probe(grid=Grid(1000, 1000), initial_direction=Direction.NORTH)
+            for _ in range(min(5000, fleet_size - offset))
+        ])
+
+
+def measure_import(env: dict, repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, capture_output=True, text=True, check=True)
+        durations.append(float(output.stdout.strip().splitlines()[-1]))
+    return summarize(durations)
+
+
+def first_request(env: dict, timeout: float = 30.0) -> tuple[float, dict]:
+    """Sobe o uvicorn e espera o primeiro 200 em /ready. Retorna (segundos, etapas do lifespan)."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    response = client.get("/ready")
+                    if response.status_code == 200:
+                        return time.perf_counter() - started, response.json()["startup"]
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError("O servidor não ficou pronto a tempo.")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_fleet(fleet_size: int, repeat: int) -> list[dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = Path(directory) / "startup.db"
+        if fleet_size:
+            seed(database_path, fleet_size)
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}", "PYTHONPATH": os.getcwd()}
+
+        results = [{"name": "startup.import_main", "fleet_size": fleet_size, **measure_import(env, repeat)}]
+        durations, stages = [], []
+        for _ in range(repeat):
+            duration, startup = first_request(env)
+            durations.append(duration)
+            stages.append(startup)
+        results.append({"name": "startup.first_request", "fleet_size": fleet_size, **summarize(durations),
+                        "lifespan_ms": stages[-1]})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=[0, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    results = []
+    for fleet_size in args.fleet_sizes:
+        results.extend(bench_fleet(fleet_size, args.repeat))
+
+    write_report("startup", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
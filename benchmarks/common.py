@@ -0,0 +1,80 @@
+"""Utilitários compartilhados pelos benchmarks: medição, percentis e relatório JSON."""
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+
+
+def summarize(latencies: list[float]) -> dict:
+    """Percentis p50/p95/p99, média e máximo, em milissegundos, de uma lista de latências em segundos."""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 4)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def measure(operation: Callable[[], object], repeat: int, warmup: int = 3) -> dict:
+    """Executa `operation` `repeat` vezes (depois de `warmup` execuções descartadas) e resume as latências."""
+    for _ in range(warmup):
+        operation()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def sqlite_session_factory(database_path: Path) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(name: str, results: list[dict], output: Optional[str], parameters: Optional[dict] = None) -> dict:
+    """Monta o relatório com os metadados da execução e o grava em `output` (ou na saída padrão)."""
+    report = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters or {},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+    return report
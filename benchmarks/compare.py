@@ -0,0 +1,69 @@
+"""
+Compara dois relatórios JSON dos benchmarks (por exemplo, de dois commits) e
+aponta as medições cuja latência piorou mais do que o limite.
+
+Uso:
+    python -m benchmarks.compare base.json head.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+# Campos medidos; os demais campos escalares (nome, tamanho da frota, concorrência...) identificam a medição.
+MEASURED = {"count", "errors", "elapsed_s", "throughput_rps", "mean_ms", "max_ms", *METRICS}
+
+
+def _flatten(result: dict, prefix: str = "") -> dict[str, dict]:
+    """Separa os resumos de latência de um resultado, inclusive os aninhados (ex.: por operação)."""
+    key = prefix + ",".join(
+        f"{name}={value}" for name, value in result.items() if not isinstance(value, dict) and name not in MEASURED
+    )
+    flattened = {}
+    if "p50_ms" in result:
+        flattened[key] = result
+    for name, value in result.items():
+        if isinstance(value, dict):
+            flattened.update(_flatten(value, prefix=f"{key}/{name}" if key else name))
+    return flattened
+
+
+def load_entries(path: str) -> dict[str, dict]:
+    report = json.loads(Path(path).read_text())
+    entries: dict[str, dict] = {}
+    for result in report["results"]:
+        entries.update(_flatten(result))
+    return entries
+
+
+def compare(base: dict[str, dict], head: dict[str, dict], threshold: float) -> list[dict]:
+    rows = []
+    for key in sorted(base.keys() & head.keys()):
+        for metric in METRICS:
+            before, after = base[key].get(metric), head[key].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            rows.append({"key": key, "metric": metric, "base": before, "head": after,
+                         "change": round(change, 4), "regression": change > threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Piora relativa tolerada (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    rows = compare(load_entries(args.base), load_entries(args.head), args.threshold)
+    regressions = [row for row in rows if row["regression"]]
+    print(json.dumps({"threshold": args.threshold, "compared": len(rows), "regressions": regressions}, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
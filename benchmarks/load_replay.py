@@ -0,0 +1,164 @@
+"""
+Gerador de carga sintética: reproduz uma mistura de lançamentos, movimentos e
+listagens com concorrência configurável e relata vazão e latência p50/p95/p99,
+no total e por operação, em JSON.
+
+Sem --base-url, a carga vai para o app em processo (rotas síncronas sobre um
+SQLite temporário); com --base-url, vai para um servidor já em execução.
+
+Uso:
+    python -m benchmarks.load_replay --requests 5000 --concurrency 32 --mix launch=1 move=8 list=1
+    python -m benchmarks.load_replay --base-url http://localhost:8000 --duration 30 --output load.json
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_async_stack import build_app
+from benchmarks.common import sqlite_session_factory, summarize, write_report
+
+GRID_SIZE = 1_000
+OPERATIONS = ("launch", "move", "list")
+
+
+def parse_mix(items: list[str]) -> dict[str, int]:
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"Item de mistura inválido: '{item}' (use, por exemplo, move=8).")
+        mix[name] = int(weight)
+    return mix
+
+
+class LoadReplay:
+    """Escolhe cada operação pelo peso da mistura, com uma semente fixa para que execuções sejam comparáveis."""
+    def __init__(self, client: httpx.AsyncClient, mix: dict[str, int], seed: int, initial_probes: int):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.operations = [name for name in mix for _ in range(mix[name])]
+        self.initial_probes = initial_probes
+        self.probe_ids: list[str] = []
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def _launch_body(self) -> dict:
+        # Malhas grandes e sondas espalhadas: os movimentos aleatórios raramente saem da malha.
+        return {"x": GRID_SIZE, "y": GRID_SIZE, "direction": self.rng.choice(("NORTH", "EAST", "SOUTH", "WEST")),
+                "start_x": self.rng.randrange(GRID_SIZE), "start_y": self.rng.randrange(GRID_SIZE)}
+
+    async def seed_fleet(self) -> None:
+        response = await self.client.post(
+            "/api/probes/launch:batch", json={"probes": [self._launch_body() for _ in range(self.initial_probes)]}
+        )
+        response.raise_for_status()
+        self.probe_ids.extend(response.json()["ids"])
+
+    async def _request(self, operation: str) -> httpx.Response:
+        if operation == "launch":
+            response = await self.client.post("/api/probes", json=self._launch_body())
+            if response.status_code == 201:
+                self.probe_ids.append(response.json()["id"])
+            return response
+        if operation == "move":
+            commands = "".join(self.rng.choice("LRM") for _ in range(self.rng.randint(1, 20)))
+            return await self.client.post(f"/api/probes/{self.rng.choice(self.probe_ids)}/move",
+                                          json={"commands": commands})
+        after = self.rng.choice(self.probe_ids) if self.probe_ids else None
+        return await self.client.get("/api/probes", params={"limit": 100, **({"after": after} if after else {})})
+
+    async def one(self) -> None:
+        operation = self.rng.choice(self.operations)
+        started = time.perf_counter()
+        try:
+            response = await self._request(operation)
+            # 400 de um movimento que sairia da malha faz parte da carga, não é um erro do servidor.
+            if response.status_code >= 500:
+                self.errors[operation] += 1
+        except httpx.HTTPError:
+            self.errors[operation] += 1
+        self.latencies[operation].append(time.perf_counter() - started)
+
+    async def run(self, concurrency: int, total_requests: Optional[int], duration: Optional[float]) -> dict:
+        deadline = time.perf_counter() + duration if duration else None
+        issued = 0
+
+        async def worker():
+            nonlocal issued
+            while True:
+                if total_requests is not None and issued >= total_requests:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                issued += 1
+                await self.one()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            "concurrency": concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(all_latencies) / elapsed, 1),
+            "errors": sum(self.errors.values()),
+            "overall": summarize(all_latencies),
+            "operations": {
+                name: {**summarize(latencies), "errors": self.errors[name]}
+                for name, latencies in sorted(self.latencies.items())
+            },
+        }
+
+
+async def replay(client: httpx.AsyncClient, args) -> list[dict]:
+    results = []
+    for concurrency in args.concurrency:
+        load = LoadReplay(client, args.mix, args.seed, args.initial_probes)
+        await load.seed_fleet()
+        results.append(await load.run(concurrency, args.requests, args.duration))
+    return results
+
+
+async def run(args) -> list[dict]:
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+            return await replay(client, args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = Path(directory) / "load.db"
+        sqlite_session_factory(database_path)
+        transport = httpx.ASGITransport(app=build_app(args.stack, database_path))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await replay(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Servidor alvo; sem ele, usa o app em processo")
+    parser.add_argument("--stack", choices=("sync", "async"), default="sync", help="Pilha do app em processo")
+    parser.add_argument("--requests", type=int, default=2_000, help="Requisições por nível de concorrência")
+    parser.add_argument("--duration", type=float, help="Duração em segundos (em vez de --requests)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--mix", nargs="+", default=["launch=1", "move=8", "list=1"])
+    parser.add_argument("--initial-probes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+    if args.duration:
+        args.requests = None
+
+    results = asyncio.run(run(args))
+    write_report("load_replay", results, args.output, parameters=vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,64 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.middleware import MetricsMiddleware
 from app.api.endpoints.probe_routes import router as probe_router
-from app.database import engine
-from app.repositories import database_models
+from app.api.endpoints.async_probe_routes import router as async_probe_router
+from app.api.endpoints.dependencies import close_repositories, initialize
+from app.core.config import settings
+from app.core.events import events
+from app.core.metrics import PROMETHEUS_MEDIA_TYPE, metrics, profiles
 
-database_models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema, repositórios, cache e planaltos são preparados aqui, e não na importação.
+    app.state.startup = initialize()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    close_repositories()
+    events.stop()
 
 app = FastAPI(
     title="Sonda em Marte API",
     description="API para controlar sondas de exploração em Marte.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+app.state.ready = False
+app.add_middleware(
+    MetricsMiddleware,
+    profiling_enabled=settings.profiling_enabled,
+    sample_rate=settings.profile_sample_rate,
+    slow_ms=settings.profile_slow_ms,
 )
 
-app.include_router(probe_router, prefix="/api", tags=["Probes"])
+# API_MODE=async troca as rotas síncronas pelas rotas async def, com driver de banco assíncrono.
+if settings.api_mode == "async":
+    app.include_router(async_probe_router, prefix="/api", tags=["Probes"])
+else:
+    app.include_router(probe_router, prefix="/api", tags=["Probes"])
 
 @app.get("/", tags=["Root"])
 def read_root():
-    return {"message": "Bem-vindo à API da Sonda em Marte! Acesse /docs para a documentação."}
\ No newline at end of file
+    return {"message": "Bem-vindo à API da Sonda em Marte! Acesse /docs para a documentação."}
+
+@app.get("/ready", tags=["Root"])
+def read_ready():
+    """200 depois da inicialização (com a duração de cada etapa); 503 antes dela e durante o desligamento."""
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "startup": app.state.startup}
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+def read_metrics():
+    """Histogramas de latência por rota, método do service e chamada ao repositório, e contadores, no formato do Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+# Os perfis só existem com PROFILING_ENABLED (cabeçalho X-Profile) ou com amostragem.
+if settings.profiling_enabled or settings.profile_sample_rate > 0:
+    @app.get("/debug/profiles", tags=["Root"])
+    def read_profiles():
+        """Perfis das requisições mais recentes (pedidos com X-Profile ou amostrados e lentos), do mais novo ao mais antigo."""
+        return {"profiles": profiles.recent()}
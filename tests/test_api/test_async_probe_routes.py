@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints.async_probe_routes import router as async_probe_router
+from app.api.endpoints.dependencies import get_async_probe_service
+from app.domain.models import Grid, Probe
+from app.domain.state import Direction
+from app.services.async_probe_service import AsyncProbeService
+from app.repositories.async_probe_repository import AsyncInMemoryProbeRepository
+
+
+# --- Configuração do Ambiente de Teste ---
+
+@pytest.fixture
+def async_client():
+    app = FastAPI()
+    app.include_router(async_probe_router, prefix="/api")
+    test_service = AsyncProbeService(probe_repository=AsyncInMemoryProbeRepository())
+    app.dependency_overrides[get_async_probe_service] = lambda: test_service
+
+    with TestClient(app) as client:
+        yield client
+
+
+# Teste para verificar o lançamento e a movimentação de uma Sonda pelas rotas assíncronas
+def test_async_launch_and_move_probe(async_client):
+    probe_id = async_client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+
+    response = async_client.post(f"/api/probes/{probe_id}/move", json={"commands": "MRM"})
+
+    assert response.status_code == 200
+    assert response.json() == {"id": probe_id, "x": 1, "y": 1, "direction": "EAST"}
+    assert len(async_client.get("/api/probes").json()["probes"]) == 1
+
+# Teste para verificar os erros das rotas assíncronas
+def test_async_move_probe_errors(async_client):
+    probe_id = async_client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+
+    assert async_client.post("/api/probes/fake-id-123/move", json={"commands": "M"}).status_code == 404
+    assert async_client.post(f"/api/probes/{probe_id}/move", json={"commands": "MMMMMM"}).status_code == 400
+
+# Teste para verificar que as rotas assíncronas não movem sondas de planaltos compartilhados
+def test_async_move_rejects_plateau_probe():
+    repository = AsyncInMemoryProbeRepository()
+    probe = Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH, probe_id="p1", plateau_name="alpha")
+    asyncio.run(repository.save(probe))
+    app = FastAPI()
+    app.include_router(async_probe_router, prefix="/api")
+    app.dependency_overrides[get_async_probe_service] = lambda: AsyncProbeService(probe_repository=repository)
+
+    with TestClient(app) as client:
+        assert client.post("/api/probes/p1/move", json={"commands": "M"}).status_code == 400
+        response = client.post("/api/probes/move:batch", json={"items": [{"probe_id": "p1", "commands": "M"}]})
+        assert response.status_code == 400
+    assert asyncio.run(repository.get_by_id("p1")).position.y == 0
+
+# Teste para verificar o lançamento e a movimentação em lote pelas rotas assíncronas
+def test_async_batch_routes(async_client):
+    ids = async_client.post("/api/probes/launch:batch", json={"probes": [
+        {"x": 5, "y": 5, "direction": "NORTH"},
+        {"x": 5, "y": 5, "direction": "EAST"},
+    ]}).json()["ids"]
+
+    response = async_client.post("/api/probes/move:batch", json={"items": [
+        {"probe_id": ids[0], "commands": "M"},
+        {"probe_id": ids[1], "commands": "MM"},
+    ]})
+
+    assert response.json()["committed"] is True
+    assert [r["probe"]["x"] for r in response.json()["results"]] == [0, 2]
+
+# Teste para verificar a paginação e o NDJSON pelas rotas assíncronas
+def test_async_get_probes_pagination_and_ndjson(async_client):
+    async_client.post("/api/probes/launch:batch", json={"probes": [{"x": 5, "y": 5, "direction": "NORTH"}] * 3})
+
+    page = async_client.get("/api/probes", params={"limit": 2}).json()
+    stream = async_client.get("/api/probes", params={"format": "ndjson"})
+
+    assert len(page["probes"]) == 2 and page["next_after"] == page["probes"][-1]["id"]
+    assert len(stream.text.splitlines()) == 3
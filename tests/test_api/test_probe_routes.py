@@ -1,10 +1,16 @@
+import asyncio
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 
 from main import app
-from app.api.endpoints.dependencies import get_probe_service
+from app.api.endpoints.dependencies import get_probe_service, get_telemetry_hub
+from app.services.command_executor import CommandExecutor
 from app.services.probe_service import ProbeService
 from app.repositories.probe_repository import InMemoryProbeRepository
+from app.repositories.trajectory_repository import InMemoryTrajectoryRepository
+from app.services.telemetry import TelemetryHub
 
 
 # --- Configuração do Ambiente de Teste ---
@@ -12,7 +18,7 @@ from app.repositories.probe_repository import InMemoryProbeRepository
 @pytest.fixture
 def client_with_clean_db():
     test_repo = InMemoryProbeRepository()
-    test_service = ProbeService(probe_repository=test_repo)
+    test_service = ProbeService(probe_repository=test_repo, trajectory_repository=InMemoryTrajectoryRepository())
 
     def get_test_probe_service():
         return test_service
@@ -86,4 +92,331 @@ def test_move_probe_off_grid_returns_400(client_with_clean_db):
     move_response = client.post(f"/api/probes/{probe_id}/move", json={"commands": "MMMMMM"})
 
     assert move_response.status_code == 400
-    assert "movimento inválido" in move_response.json()["detail"]
\ No newline at end of file
+    assert "movimento inválido" in move_response.json()["detail"]
+
+# Teste para verificar a movimentação de várias Sondas em lote
+def test_move_probes_batch_reports_each_item(client_with_clean_db):
+    client = client_with_clean_db
+    first_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+    second_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "EAST"}).json()["id"]
+
+    response = client.post("/api/probes/move:batch", json={"items": [
+        {"probe_id": first_id, "commands": "MRM"},
+        {"probe_id": second_id, "commands": "MMMMMMM"},
+        {"probe_id": "fake-id-123", "commands": "M"},
+    ]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["committed"] is True
+    assert [r["success"] for r in data["results"]] == [True, False, False]
+    assert data["results"][0]["probe"] == {"id": first_id, "x": 1, "y": 1, "direction": "EAST"}
+
+    probes = {p["id"]: p for p in client.get("/api/probes").json()["probes"]}
+    assert (probes[first_id]["x"], probes[first_id]["y"]) == (1, 1)
+    assert (probes[second_id]["x"], probes[second_id]["y"]) == (0, 0)
+
+# Teste para verificar que um lote atômico com falha não altera nenhuma Sonda
+def test_move_probes_batch_atomic_rolls_back_all(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+
+    response = client.post("/api/probes/move:batch", json={"atomic": True, "items": [
+        {"probe_id": probe_id, "commands": "MM"},
+        {"probe_id": "fake-id-123", "commands": "M"},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json()["committed"] is False
+    assert client.get("/api/probes").json()["probes"][0]["y"] == 0
+
+# Teste para verificar o lançamento de várias Sondas em uma única requisição
+def test_launch_probes_batch_returns_ids_in_order(client_with_clean_db):
+    client = client_with_clean_db
+    request_body = {"probes": [
+        {"x": 5, "y": 5, "direction": "NORTH"},
+        {"x": 2, "y": 8, "direction": "SOUTH"},
+    ]}
+
+    response = client.post("/api/probes/launch:batch", json=request_body)
+
+    assert response.status_code == 201
+    ids = response.json()["ids"]
+    assert len(ids) == 2
+    probes = {p["id"]: p for p in client.get("/api/probes").json()["probes"]}
+    assert [probes[probe_id]["direction"] for probe_id in ids] == ["NORTH", "SOUTH"]
+
+# Teste para verificar que uma Sonda não se move para a célula de outra no mesmo planalto
+def test_move_probe_into_occupied_cell_returns_400(client_with_clean_db):
+    client = client_with_clean_db
+    base = {"x": 5, "y": 5, "direction": "NORTH", "plateau": "alpha"}
+    probe_id = client.post("/api/probes", json=base).json()["id"]
+    client.post("/api/probes", json={**base, "start_y": 1})
+
+    assert client.post("/api/probes", json={**base, "start_y": 1}).status_code == 400
+    response = client.post(f"/api/probes/{probe_id}/move", json={"commands": "M"})
+
+    assert response.status_code == 400
+    assert "ocupada" in response.json()["detail"]
+
+# Teste para verificar que um planalto com mais de 64 bytes em UTF-8 é recusado com 422
+def test_launch_probe_with_plateau_over_64_bytes_returns_422(client_with_clean_db):
+    client = client_with_clean_db
+    base = {"x": 5, "y": 5, "direction": "NORTH"}
+
+    assert client.post("/api/probes", json={**base, "plateau": "é" * 40}).status_code == 422
+    assert client.post("/api/probes", json={**base, "plateau": "é" * 32}).status_code == 201
+
+# Teste para verificar a consulta de uma Sonda pelo ID
+def test_get_probe_by_id(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "EAST"}).json()["id"]
+
+    response = client.get(f"/api/probes/{probe_id}")
+
+    assert response.status_code == 200
+    assert response.json() == {"id": probe_id, "x": 0, "y": 0, "direction": "EAST"}
+    assert client.get("/api/probes/fake-id").status_code == 404
+
+# Teste para verificar a paginação por cursor da listagem de Sondas
+def test_get_probes_paginates_with_cursor(client_with_clean_db):
+    client = client_with_clean_db
+    client.post("/api/probes/launch:batch", json={"probes": [{"x": 5, "y": 5, "direction": "NORTH"}] * 5})
+
+    first_page = client.get("/api/probes", params={"limit": 2}).json()
+    second_page = client.get("/api/probes", params={"limit": 2, "after": first_page["next_after"]}).json()
+    last_page = client.get("/api/probes", params={"limit": 2, "after": second_page["next_after"]}).json()
+
+    ids = [p["id"] for page in (first_page, second_page, last_page) for p in page["probes"]]
+    assert len(ids) == 5
+    assert ids == sorted(ids)
+    assert last_page["next_after"] is None
+
+# Teste para verificar a listagem de Sondas em NDJSON
+def test_get_probes_streams_ndjson(client_with_clean_db):
+    client = client_with_clean_db
+    client.post("/api/probes/launch:batch", json={"probes": [{"x": 5, "y": 5, "direction": "EAST"}] * 3})
+
+    response = client.get("/api/probes", params={"format": "ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3
+    assert all(line["direction"] == "EAST" for line in lines)
+
+# Teste para verificar a reconstrução da pose de uma Sonda em qualquer ponto do histórico
+def test_get_probe_pose_at_sequence(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+    client.post(f"/api/probes/{probe_id}/move", json={"commands": "MM"})
+    client.post(f"/api/probes/{probe_id}/move", json={"commands": "RMM"})
+
+    poses = [client.get(f"/api/probes/{probe_id}/trajectory/{seq}").json() for seq in (0, 2, 3, 5)]
+
+    assert [(p["x"], p["y"], p["direction"]) for p in poses] == [
+        (0, 0, "NORTH"), (0, 2, "NORTH"), (0, 2, "EAST"), (2, 2, "EAST")
+    ]
+    assert client.get(f"/api/probes/{probe_id}/trajectory/6").status_code == 404
+
+# Teste para verificar o planejamento de rota, com desvio de obstáculos e execução do plano
+def test_plan_probe_route_avoids_obstacles_and_executes(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+
+    plan = client.post(f"/api/probes/{probe_id}/plan", json={"x": 2, "y": 2})
+    assert plan.status_code == 200
+    assert plan.json()["commands"] == "MMRMM"
+    assert plan.json()["algorithm"] == "closed_form"
+    assert plan.json()["executed"] is False
+
+    body = {"x": 0, "y": 3, "direction": "EAST", "obstacles": [[0, 2]], "execute": True}
+    response = client.post(f"/api/probes/{probe_id}/plan", json=body)
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["algorithm"] == "astar"
+    assert len(data["commands"]) == 10
+    assert data["probe"] == {"id": probe_id, "x": 0, "y": 3, "direction": "EAST"}
+
+    unreachable = client.post(f"/api/probes/{probe_id}/plan", json={"x": 9, "y": 9})
+    assert unreachable.status_code == 400
+
+# Teste para verificar a execução de uma fita de comandos enviada em pedaços
+def test_move_probe_stream_executes_chunks_and_reports_offset(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+
+    def tape():
+        yield b"MMRM"
+        yield b"M\nLL"
+
+    response = client.post(f"/api/probes/{probe_id}/move:stream", params={"checkpoint_every": 3}, content=tape())
+
+    assert response.status_code == 200
+    assert response.json() == {"id": probe_id, "executed": 7, "checkpoints": 3, "x": 2, "y": 2, "direction": "WEST"}
+
+    failed = client.post(f"/api/probes/{probe_id}/move:stream", content=b"MM\nX")
+
+    assert failed.status_code == 400
+    assert failed.json()["detail"]["offset"] == 3
+    assert failed.json()["detail"]["probe"]["x"] == 0
+
+# Teste para verificar que a prontidão só é sinalizada depois da inicialização no lifespan
+def test_ready_reports_startup_after_lifespan(monkeypatch):
+    import main
+    monkeypatch.setattr(main, "initialize", lambda: {"total_ms": 1.0})
+    monkeypatch.setattr(main, "close_repositories", lambda: None)
+
+    assert TestClient(app).get("/ready").status_code == 503
+    with TestClient(app) as client:
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "startup": {"total_ms": 1.0}}
+
+# Teste para verificar as ETags da listagem e da consulta, com 304 enquanto nada muda
+def test_probe_reads_return_not_modified_until_a_write(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+
+    listing = client.get("/api/probes")
+    lookup = client.get(f"/api/probes/{probe_id}")
+    assert client.get("/api/probes", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+    assert client.get(f"/api/probes/{probe_id}", headers={"If-None-Match": lookup.headers["ETag"]}).status_code == 304
+
+    client.post(f"/api/probes/{probe_id}/move", json={"commands": "M"})
+
+    listing_after = client.get("/api/probes", headers={"If-None-Match": listing.headers["ETag"]})
+    lookup_after = client.get(f"/api/probes/{probe_id}", headers={"If-None-Match": lookup.headers["ETag"]})
+    assert listing_after.status_code == 200 and listing_after.headers["ETag"] != listing.headers["ETag"]
+    assert listing_after.json()["probes"] == [{"id": probe_id, "x": 0, "y": 1, "direction": "NORTH"}]
+    assert lookup_after.status_code == 200 and lookup_after.json()["y"] == 1
+
+# Teste para verificar que /metrics expõe a latência por rota e os contadores de comandos e movimentos inválidos
+def test_metrics_endpoint_reports_routes_and_command_counters(client_with_clean_db):
+    client = client_with_clean_db
+    probe_id = client.post("/api/probes", json={"x": 5, "y": 5, "direction": "NORTH"}).json()["id"]
+    client.post(f"/api/probes/{probe_id}/move", json={"commands": "MMR"})
+    client.post(f"/api/probes/{probe_id}/move", json={"commands": "L" + "M" * 10})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'mars_http_request_seconds_count{method="POST",route="/api/probes/{probe_id}/move",status="400"}' in body
+    assert 'mars_service_seconds_bucket{method="move_probe",le="+Inf"}' in body
+    assert "mars_commands_executed_total" in body and "mars_invalid_moves_total" in body
+
+# Teste para verificar que um movimento longo com o pool de processos cheio responde 503
+def test_move_probe_returns_503_when_command_pool_is_full():
+    executor = CommandExecutor(threshold=10, workers=1, max_queue=0)
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), executor=executor)
+    app.dependency_overrides[get_probe_service] = lambda: service
+    client = TestClient(app)
+    probe_id = client.post("/api/probes", json={"x": 50, "y": 50, "direction": "NORTH"}).json()["id"]
+
+    executor._slots.acquire()
+    try:
+        busy = client.post(f"/api/probes/{probe_id}/move", json={"commands": "M" * 20})
+        short = client.post(f"/api/probes/{probe_id}/move", json={"commands": "M"})
+    finally:
+        executor._slots.release()
+        app.dependency_overrides.clear()
+
+    assert (busy.status_code, busy.headers["Retry-After"]) == (503, "1")
+    assert short.status_code == 200 and short.json()["y"] == 1
+
+# Teste para verificar a listagem por região e a consulta das sondas mais próximas
+def test_probes_within_region_and_nearest(client_with_clean_db):
+    client = client_with_clean_db
+    ids = {}
+    for x, y in [(0, 0), (2, 3), (4, 4), (9, 9)]:
+        ids[(x, y)] = client.post("/api/probes", json={"x": 9, "y": 9, "direction": "NORTH", "start_x": x, "start_y": y}).json()["id"]
+    client.post(f"/api/probes/{ids[(9, 9)]}/move", json={"commands": "LM"})
+
+    within = client.get("/api/probes", params={"within": "5,5,1,1"})
+    nearest = client.get("/api/probes:nearest", params={"x": 8, "y": 8, "k": 2})
+
+    assert within.status_code == 200
+    assert sorted((p["x"], p["y"]) for p in within.json()["probes"]) == [(2, 3), (4, 4)]
+    assert client.get("/api/probes", params={"within": "1,2,3"}).status_code == 422
+    assert [(p["id"], p["x"], p["distance"]) for p in nearest.json()["probes"]] == [
+        (ids[(9, 9)], 8, 1.0), (ids[(4, 4)], 4, 32 ** 0.5)
+    ]
+
+def _sse_events(chunk: bytes) -> list[tuple[str, dict]]:
+    """Eventos (nome, dados) de um pedaço do corpo SSE."""
+    events = []
+    for message in chunk.decode().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+# Teste para verificar o snapshot, a fusão de poses e o novo snapshot da telemetria por SSE, pela rota
+def test_probe_telemetry_streams_snapshot_coalesced_pose_and_resync():
+    hub = TelemetryHub(max_pending=1)
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), telemetry=hub)
+    first = service.launch_probe(max_x=5, max_y=5, direction_str="NORTH", plateau="alpha")
+    second = service.launch_probe(max_x=5, max_y=5, direction_str="NORTH", plateau="alpha", x=1)
+    service.launch_probe(max_x=5, max_y=5, direction_str="NORTH")
+    app.dependency_overrides[get_probe_service] = lambda: service
+    app.dependency_overrides[get_telemetry_hub] = lambda: hub
+
+    # O TestClient lê o corpo inteiro antes de responder; o SSE não termina, então a rota é chamada pelo ASGI.
+    async def scenario():
+        chunks: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                await chunks.put(message["body"])
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/api/probes:telemetry", "raw_path": b"/api/probes:telemetry", "query_string": b"plateau=alpha",
+            "root_path": "", "headers": [(b"host", b"test")], "client": ("test", 1), "server": ("test", 80),
+        }
+        connection = asyncio.create_task(app(scope, receive, send))
+
+        async def next_events():
+            return _sse_events(await asyncio.wait_for(chunks.get(), 5))
+
+        try:
+            [(name, data)] = await next_events()
+            assert name == "snapshot"
+            assert sorted(probe["id"] for probe in data["probes"]) == sorted([first.id, second.id])
+
+            # Duas gravações antes de o consumidor acordar chegam fundidas na pose mais recente.
+            service.move_probe(first.id, "M")
+            service.move_probe(first.id, "M")
+            [(name, data)] = await next_events()
+            assert (name, data["id"], data["y"], data["version"]) == ("pose", first.id, 2, 2)
+
+            # Com max_pending=1, uma segunda sonda pendente descarta as poses e gera um novo snapshot.
+            service.move_probe(first.id, "R")
+            service.move_probe(second.id, "M")
+            [(name, data)] = await next_events()
+            assert name == "snapshot"
+            poses = {probe["id"]: (probe["y"], probe["direction"]) for probe in data["probes"]}
+            assert poses == {first.id: (2, "EAST"), second.id: (1, "NORTH")}
+        finally:
+            disconnected.set()
+            await asyncio.wait_for(connection, 5)
+        assert hub.subscribers == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,71 @@
+import json
+import logging
+
+import pytest
+
+from app.core.events import DEBUG, INFO, EventSink, JsonEventFormatter
+from app.domain.models import Grid, Probe
+from app.domain.state import Direction
+
+
+class _CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JsonEventFormatter())
+        self.lines: list[dict] = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+@pytest.fixture
+def handler():
+    return _CollectingHandler()
+
+
+# Teste para verificar que eventos abaixo do nível configurado são descartados
+def test_event_sink_filters_by_level(handler):
+    sink = EventSink(level=INFO, handler=handler, name="test.events.level")
+
+    sink.debug("ignored")
+    sink.info("probe.launched", probe_id="a")
+    sink.stop()
+
+    assert handler.lines == [{"ts": handler.lines[0]["ts"], "level": "INFO", "event": "probe.launched", "probe_id": "a"}]
+    assert sink.enabled(DEBUG) is False
+
+# Teste para verificar a amostragem de eventos
+def test_event_sink_sampling_drops_events(handler):
+    sink = EventSink(level=DEBUG, sample_rate=0.0, handler=handler, name="test.events.sampling")
+
+    for _ in range(100):
+        sink.debug("probe.moved")
+    sink.stop()
+
+    assert handler.lines == []
+
+# Teste para verificar que a fila cheia descarta eventos em vez de bloquear quem emite
+def test_event_sink_full_queue_does_not_block():
+    class _BlockedHandler(logging.Handler):
+        def emit(self, record):
+            pass
+
+    sink = EventSink(level=DEBUG, queue_size=1, handler=_BlockedHandler(), name="test.events.full")
+    sink._start()
+    sink._listener.stop()  # ninguém consome a fila
+
+    for _ in range(10):
+        sink.warning("probe.moved")
+
+    assert sink.dropped >= 9
+
+# Teste para verificar que os comandos da Sonda não escrevem mais no stdout
+def test_probe_commands_do_not_print(capsys):
+    probe = Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH)
+
+    probe.turn_left()
+    probe.turn_right()
+    probe.move()
+    probe.execute("MRM")
+
+    assert capsys.readouterr().out == ""
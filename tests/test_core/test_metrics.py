@@ -0,0 +1,116 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.api.middleware import MetricsMiddleware
+from app.core.metrics import MetricsRegistry, ProfileStore
+
+
+def _lines(registry: MetricsRegistry) -> set[str]:
+    return set(registry.render().splitlines())
+
+
+# Teste para verificar que histogramas e contadores gravados em várias threads são somados na exportação
+def test_metrics_registry_merges_threads_into_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    registry.describe("op_seconds", "Duração da operação.")
+
+    def record(seconds: float) -> None:
+        registry.observe("op_seconds", seconds, method="save")
+        registry.inc("ops_total", 2)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(record, [0.005, 0.05, 0.5]))
+    registry.register_collector(lambda: [("queue_size", "gauge", "Tamanho da fila.", (("name", 'a"b'),), 7)])
+
+    lines = _lines(registry)
+    assert {
+        "# HELP op_seconds Duração da operação.",
+        "# TYPE op_seconds histogram",
+        'op_seconds_bucket{method="save",le="0.01"} 1',
+        'op_seconds_bucket{method="save",le="0.1"} 2',
+        'op_seconds_bucket{method="save",le="+Inf"} 3',
+        'op_seconds_count{method="save"} 3',
+        "# TYPE ops_total counter",
+        "ops_total 6",
+        "# TYPE queue_size gauge",
+        'queue_size{name="a\\"b"} 7',
+    } <= lines
+    assert any(line.startswith('op_seconds_sum{method="save"} 0.55') for line in lines)
+
+# Teste para verificar que o registro desativado não grava nada
+def test_metrics_registry_disabled_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+
+    @registry.timed("service_seconds", "service")
+    def work():
+        return 42
+
+    registry.inc("ops_total")
+    assert work() == 42
+    assert registry.render() == "\n"
+
+# Teste para verificar o modelo da rota nas métricas e o perfil pedido pelo cabeçalho X-Profile
+def test_metrics_middleware_labels_route_and_profiles_on_request():
+    registry, store = MetricsRegistry(), ProfileStore()
+
+    @registry.timed("service_seconds", "service", profile_boundary=True)
+    def load(thing_id: str) -> dict:
+        return {"id": thing_id, "total": sum(range(1000))}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry, store=store, profiling_enabled=True)
+    app.get("/things/{thing_id}")(lambda thing_id: load(thing_id))
+    client = TestClient(app)
+
+    assert "server-timing" not in client.get("/things/a").headers
+    wall = client.get("/things/b", headers={"X-Profile": "wall"})
+    profiled = client.get("/things/c", headers={"X-Profile": "cprofile"})
+
+    assert "service.load;dur=" in wall.headers["server-timing"]
+    lines = _lines(registry)
+    assert 'service_seconds_count{method="load"} 3' in lines
+    assert 'mars_http_request_seconds_count{method="GET",route="/things/{thing_id}",status="200"} 3' in lines
+    newest, oldest = store.recent()
+    assert newest["id"] == int(profiled.headers["x-profile-id"])
+    assert (newest["mode"], newest["route"], oldest["mode"]) == ("cprofile", "/things/{thing_id}", "wall")
+    assert "service.load" in newest["layers_ms"]
+    assert any("load" in entry["function"] for entry in newest["functions"])
+    assert oldest["functions"] == []
+
+# Teste para verificar que requisições amostradas só são guardadas quando passam do limite de lentidão
+def test_metrics_middleware_keeps_only_slow_sampled_requests():
+    fast, slow = ProfileStore(), ProfileStore()
+    for store, slow_ms in ((fast, 60_000), (slow, 0)):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, registry=MetricsRegistry(), store=store, sample_rate=1.0, slow_ms=slow_ms)
+        app.get("/ping")(lambda: {"ok": True})
+        response = TestClient(app).get("/ping", headers={"X-Profile": "cprofile"})
+        assert "server-timing" not in response.headers
+
+    assert fast.recent() == []
+    assert [(p["path"], p["mode"], p["status"]) for p in slow.recent()] == [("/ping", "wall", 200)]
+
+# Teste para verificar que uma resposta em streaming é medida só até o início, sem gerar request.slow
+def test_metrics_middleware_times_streaming_responses_until_response_start():
+    registry, store = MetricsRegistry(), ProfileStore()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry, store=store, sample_rate=1.0, slow_ms=100)
+
+    def lines():
+        for index in range(3):
+            time.sleep(0.1)
+            yield f'{{"index": {index}}}\n'
+
+    app.get("/feed")(lambda: StreamingResponse(lines(), media_type="application/x-ndjson"))
+    response = TestClient(app).get("/feed")
+
+    assert response.text.count("\n") == 3
+    assert store.recent() == []
+    histograms, _ = registry.snapshot()
+    [(labels, histogram)] = [(labels, h) for (name, labels), h in histograms.items() if name == "mars_http_request_seconds"]
+    assert dict(labels)["route"] == "/feed"
+    assert histogram[-1] < 0.1
@@ -1,6 +1,7 @@
 import pytest
 from app.domain.models import Grid, Probe, Position, InvalidMoveError
 from app.domain.state import Direction
+from app.domain.commands import compile_commands
 
 
 # Teste para verificar se a Grid reconhece posições válidas
@@ -88,4 +89,50 @@ def test_probe_should_raise_error_when_moving_outside_grid_limits(default_grid):
 
     assert "ultrapassa os limites da malha" in str(excinfo.value)
 
-    assert probe.position == Position(x=0, y=5)
\ No newline at end of file
+    assert probe.position == Position(x=0, y=5)
+
+# --- Testes para a execução compilada de comandos ---
+
+def _run_stepwise(probe, commands):
+    for command in commands:
+        if command == 'L':
+            probe.turn_left()
+        elif command == 'R':
+            probe.turn_right()
+        else:
+            probe.move()
+
+# Teste para verificar se a execução compilada chega ao mesmo estado da execução passo a passo
+@pytest.mark.parametrize("direction", list(Direction))
+@pytest.mark.parametrize("commands", ["MRM", "LMLMLMLMM", "MMRMMRMRRM", "RRRRLLLL", "MMMMRMMLLM"])
+def test_probe_execute_should_match_stepwise_execution(direction, commands):
+    grid = Grid(max_x=10, max_y=10)
+    compiled_probe = Probe(grid=grid, initial_direction=direction, initial_position=Position(5, 5))
+    stepwise_probe = Probe(grid=grid, initial_direction=direction, initial_position=Position(5, 5))
+
+    compiled_probe.execute(commands)
+    _run_stepwise(stepwise_probe, commands)
+
+    assert compiled_probe.position == stepwise_probe.position
+    assert compiled_probe.current_direction == stepwise_probe.current_direction
+
+# Teste para verificar se a execução compilada detecta passos intermediários fora da malha
+def test_probe_execute_should_raise_same_error_as_stepwise_and_keep_state(default_grid):
+    probe = Probe(grid=default_grid, initial_direction=Direction.NORTH, initial_position=Position(0, 4))
+
+    with pytest.raises(InvalidMoveError) as excinfo:
+        probe.execute("MMRRMMM")
+
+    assert str(excinfo.value) == "Movimento para Position(x=0, y=6) é inválido e ultrapassa os limites da malha."
+    assert probe.position == Position(x=0, y=4)
+    assert probe.current_direction == Direction.NORTH
+
+# Teste para verificar se sequências longas são compiladas em uma única transformação
+def test_compile_commands_should_return_net_transform():
+    compiled = compile_commands("M" * 50_000 + "R" + "M" * 3)
+
+    assert compiled.rotation == 1
+    assert (compiled.dx, compiled.dy) == (3, 50_000)
+    assert compiled.bounds(start=0) == (0, 0, 3, 50_000)
+    assert compiled.bounds(start=2) == (-3, -50_000, 0, 0)
+    assert compile_commands("M" * 50_000 + "R" + "M" * 3) is compiled
@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+
+from app.domain.commands import DIRECTION_INDEX
+from app.domain.models import Grid, Position, Probe
+from app.domain.planning import ASTAR, CLOSED_FORM, NoPathError, _astar, plan_cached, plan_path
+from app.domain.state import Direction
+
+
+def _execute(grid, start, heading, commands):
+    probe = Probe(grid=grid, initial_direction=heading, initial_position=start)
+    probe.execute(commands)
+    return probe.position, probe.current_direction
+
+# Teste para verificar que a fórmula fechada tem o mesmo tamanho do caminho mínimo do A* na malha vazia
+def test_closed_form_should_match_astar_on_empty_grid():
+    grid = Grid(3, 3)
+    no_obstacles = frozenset()
+    for sx, sy, gx, gy in itertools.product(range(4), repeat=4):
+        for heading, goal_heading in itertools.product(Direction, [None, *Direction]):
+            plan = plan_path(grid, Position(sx, sy), heading, Position(gx, gy), goal_heading)
+            shortest = _astar(grid, (sx, sy, DIRECTION_INDEX[heading]), gx, gy,
+                              DIRECTION_INDEX[goal_heading] if goal_heading else None, no_obstacles, 10_000)
+
+            assert plan.algorithm == CLOSED_FORM
+            assert len(plan.commands) == len(shortest)
+            position, direction = _execute(grid, Position(sx, sy), heading, plan.commands)
+            assert position == Position(gx, gy)
+            assert goal_heading is None or direction == goal_heading
+
+# Teste para verificar que o A* contorna uma parede e chega ao alvo
+def test_plan_should_use_astar_around_obstacles():
+    grid = Grid(4, 4)
+    wall = {(1, 0), (1, 1), (1, 2), (1, 3)}
+
+    plan = plan_path(grid, Position(0, 0), Direction.NORTH, Position(2, 0), obstacles=wall)
+
+    assert plan.algorithm == ASTAR
+    assert plan.commands == "MMMMRMMRMMMM"
+    position, _ = _execute(grid, Position(0, 0), Direction.NORTH, plan.commands)
+    assert position == Position(2, 0)
+
+# Teste para verificar o erro quando o alvo está fora da malha ou é inalcançável
+def test_plan_should_fail_without_path():
+    grid = Grid(2, 2)
+    enclosed = {(1, 0), (0, 1)}
+
+    with pytest.raises(NoPathError):
+        plan_path(grid, Position(0, 0), Direction.NORTH, Position(2, 2), obstacles=enclosed)
+    with pytest.raises(NoPathError, match="ocupado"):
+        plan_path(grid, Position(2, 2), Direction.NORTH, Position(1, 0), obstacles=enclosed)
+    with pytest.raises(Exception, match="fora da malha"):
+        plan_cached(2, 2, Position(0, 0), Direction.NORTH, Position(3, 0))
+
+# Teste para verificar que o A* na malha comprimida encontra o caminho mínimo em uma malha enorme
+def test_plan_should_detour_on_large_grid():
+    grid = Grid(999_999, 999_999)
+    obstacles = frozenset({(0, 500_000), (500_000, 999_999), (400_000, 0), (999_999, 300_000)})
+
+    plan = plan_path(grid, Position(0, 0), Direction.NORTH, Position(999_999, 999_999), obstacles=obstacles)
+
+    assert plan.algorithm == ASTAR
+    assert plan.commands.count("M") == 2 * 999_999
+    assert len(plan.commands) == 2 * 999_999 + 2
+
+# Teste para verificar que planos com obstáculos fixos são reaproveitados pelo cache
+def test_plan_cached_should_reuse_plans():
+    plan_cached.cache_clear()
+    args = (1_000_000, 1_000_000, Position(0, 0), Direction.NORTH, Position(999_999, 999_999))
+
+    first = plan_cached(*args)
+    second = plan_cached(*args)
+
+    assert first is second
+    assert len(first.commands) == 2 * 999_999 + 1
+    assert plan_cached.cache_info().hits == 1
@@ -0,0 +1,72 @@
+import pytest
+
+from app.domain.models import Grid, Probe, Position, InvalidMoveError
+from app.domain.plateau import Plateau, CellOccupiedError
+from app.domain.state import Direction
+from app.services.plateau_registry import PlateauRegistry, PlateauMismatchError
+
+
+def _probe_on(plateau, x, y, direction=Direction.NORTH):
+    probe = Probe(grid=plateau.grid, initial_direction=direction, initial_position=Position(x, y),
+                  plateau_name=plateau.name)
+    plateau.occupy(probe.position)
+    probe.occupancy = plateau
+    return probe
+
+# Teste para verificar o índice de ocupação com bitmap e com conjunto
+@pytest.mark.parametrize("max_x", [5, 5_000])
+def test_plateau_should_track_occupied_cells(max_x):
+    plateau = Plateau("alpha", Grid(max_x, 5_000 if max_x > 5 else 5))
+
+    plateau.occupy(Position(2, 3))
+
+    assert plateau.is_occupied(Position(2, 3))
+    assert not plateau.is_occupied(Position(3, 2))
+    with pytest.raises(CellOccupiedError):
+        plateau.occupy(Position(2, 3))
+
+    plateau.relocate(Position(2, 3), Position(3, 2))
+    assert not plateau.is_occupied(Position(2, 3))
+    assert plateau.is_occupied(Position(3, 2))
+    assert plateau.occupied_count == 1
+
+# Teste para verificar que uma sonda não entra na célula de outra, nem passa por ela
+@pytest.mark.parametrize("commands", ["M", "MMM"])
+def test_probe_should_not_move_into_occupied_cell(commands):
+    plateau = Plateau("alpha", Grid(5, 5))
+    probe = _probe_on(plateau, 1, 1)
+    _probe_on(plateau, 1, 2)
+
+    with pytest.raises(InvalidMoveError, match="ocupada"):
+        probe.execute(commands)
+
+    assert probe.position == Position(1, 1)
+    assert plateau.is_occupied(Position(1, 1))
+
+# Teste para verificar que o índice acompanha a sonda e que ela pode voltar à célula inicial
+def test_probe_execute_should_update_occupancy_index():
+    plateau = Plateau("alpha", Grid(5, 5))
+    probe = _probe_on(plateau, 1, 1)
+    _probe_on(plateau, 4, 4)
+
+    probe.execute("MRRM")
+    assert probe.position == Position(1, 1)
+
+    probe.execute("LMM")
+    assert probe.position == Position(3, 1)
+    assert plateau.is_occupied(Position(3, 1))
+    assert not plateau.is_occupied(Position(1, 1))
+
+# Teste para verificar a reconstrução do registro e a recusa de malhas diferentes
+def test_plateau_registry_should_rebuild_from_probes():
+    registry = PlateauRegistry()
+    probes = [
+        Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH, initial_position=Position(1, 1), plateau_name="alpha"),
+        Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH, initial_position=Position(2, 2), plateau_name="alpha"),
+        Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH),
+    ]
+
+    assert registry.rebuild(probes) == 2
+    assert registry.get("alpha").is_occupied(Position(2, 2))
+    with pytest.raises(PlateauMismatchError):
+        registry.get_or_create("alpha", Grid(9, 9))
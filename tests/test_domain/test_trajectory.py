@@ -0,0 +1,30 @@
+import pytest
+
+from app.domain.models import Grid, Probe, Position
+from app.domain.state import Direction
+from app.domain.trajectory import build_segments, decode_commands, encode_commands
+
+
+# Teste para verificar que a codificação run-length é compacta e reversível
+def test_encode_commands_is_compact_and_reversible():
+    commands = "M" * 100 + "RR" + "L" + "M" * 5
+
+    encoded = encode_commands(commands)
+
+    assert len(encoded) == 5
+    assert decode_commands(encoded) == commands
+    assert decode_commands(encoded, limit=64) == "M" * 64
+    assert decode_commands(encoded, limit=0) == ""
+
+# Teste para verificar que cada trecho guarda o checkpoint correto e reconstrói qualquer pose
+@pytest.mark.parametrize("seq", [0, 1, 3, 4, 7, 9, 10])
+def test_segments_rebuild_pose_at_any_sequence(seq):
+    commands = "MMRMMLMRMM"
+    segments = build_segments("a", 0, Position(1, 1), Direction.NORTH, commands, checkpoint_interval=4)
+
+    probe = Probe(grid=Grid(10, 10), initial_direction=Direction.NORTH, initial_position=Position(1, 1))
+    probe.execute(commands[:seq])
+    segment = [s for s in segments if s.start_seq <= seq][-1]
+
+    assert [s.start_seq for s in segments] == [0, 4, 8]
+    assert segment.pose_at(seq) == (probe.position, probe.current_direction)
@@ -0,0 +1,124 @@
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.domain.models import Grid, Probe, Position
+from app.domain.state import Direction
+from app.repositories.caching_probe_repository import CachingProbeRepository
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+
+
+def _probe(probe_id="a"):
+    return Probe(probe_id=probe_id, grid=Grid(5, 5), initial_direction=Direction.NORTH)
+
+@pytest.fixture
+def inner():
+    return Mock(wraps=InMemoryProbeRepository())
+
+
+# Teste para verificar que as leituras de sondas quentes são servidas da memória
+def test_cached_reads_do_not_hit_inner_repository(inner):
+    inner.save(_probe())
+    repository = CachingProbeRepository(inner, flush_interval=0)
+
+    repository.get_by_id("a")
+    repository.get_by_id("a")
+
+    inner.get_by_id.assert_called_once_with("a")
+
+# Teste para verificar que as gravações só chegam ao repositório interno no flush, em lote
+def test_dirty_probes_are_flushed_in_one_batch(inner):
+    repository = CachingProbeRepository(inner, flush_interval=0, flush_threshold=100)
+    first, second = _probe("a"), _probe("b")
+    repository.save(first)
+    first.execute("MM")
+    repository.save(first)
+    repository.save(second)
+
+    inner.save_many.assert_not_called()
+    assert repository.get_by_id("a").position == Position(0, 2)
+
+    assert repository.flush() == 2
+    inner.save_many.assert_called_once()
+    assert inner.get_by_id("a").position == Position(0, 2)
+    assert repository.dirty_count == 0
+
+# Teste para verificar o flush automático ao atingir o limite de sondas sujas
+def test_flush_threshold_triggers_flush(inner):
+    repository = CachingProbeRepository(inner, flush_interval=0, flush_threshold=2)
+
+    repository.save(_probe("a"))
+    inner.save_many.assert_not_called()
+    repository.save(_probe("b"))
+
+    inner.save_many.assert_called_once()
+    assert repository.dirty_count == 0
+
+# Teste para verificar que sondas sujas não se perdem ao sair do LRU e que close() grava tudo
+def test_eviction_keeps_dirty_probes_and_close_flushes(inner):
+    repository = CachingProbeRepository(inner, max_entries=1, flush_interval=60, flush_threshold=100)
+    repository.save(_probe("a"))
+    repository.save(_probe("b"))
+
+    assert repository.get_by_id("a") is not None
+    inner.get_by_id.assert_not_called()
+
+    repository.close()
+    assert set(p.id for p in inner.get_all()) == {"a", "b"}
+
+# Teste para verificar que o aquecimento carrega sondas no cache até o limite de entradas
+def test_warm_preloads_up_to_max_entries(inner):
+    for probe_id in "abc":
+        inner.save(_probe(probe_id))
+    repository = CachingProbeRepository(inner, max_entries=2, flush_interval=0)
+
+    assert repository.warm() == 2
+    repository.get_by_id("a")
+    repository.get_by_id("b")
+
+    inner.get_by_id.assert_not_called()
+
+# Teste para verificar que uma falha no flush não desfaz uma gravação aceita e que o limite de sondas sujas recusa as novas
+def test_flush_failures_do_not_fail_accepted_writes_until_max_dirty(inner):
+    inner.save_many.side_effect = RuntimeError("banco fora do ar")
+    repository = CachingProbeRepository(inner, flush_interval=0, flush_threshold=1, max_dirty=2)
+    first = _probe("a")
+    first.execute("MM")
+
+    repository.save(first)
+    repository.save(_probe("b"))
+    assert repository.get_by_id("a").position == Position(0, 2)
+    with pytest.raises(RuntimeError):
+        repository.save(_probe("c"))
+
+    assert repository.get_by_id("c") is None
+    inner.save_many.side_effect = None
+    repository.save(_probe("c"))
+    assert {p.id for p in inner.get_all()} == {"a", "b", "c"}
+    assert repository.dirty_count == 0
+
+# Teste para verificar que a versão de uma sonda não volta depois de sair do LRU e ser relida do banco
+def test_version_survives_eviction_and_reload(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'probes.db'}")
+    Base.metadata.create_all(engine)
+    repository = CachingProbeRepository(SQLAlchemyProbeRepository(sessionmaker(bind=engine)),
+                                        max_entries=1, flush_interval=0, flush_threshold=100)
+    repository.add_many([_probe("a"), _probe("b")])
+    for _ in range(3):
+        probe = repository.get_by_id("a")
+        probe.execute("M")
+        assert repository.save_if_unchanged([probe])
+    assert repository.flush() == 1
+    repository.get_by_id("b")
+
+    probe = repository.get_by_id("a")
+    assert (probe.position, probe.version) == (Position(0, 3), 3)
+    probe.execute("M")
+    assert repository.save_if_unchanged([probe])
+    repository.flush()
+    repository.get_by_id("b")
+    assert repository.get_by_id("a").version == 4
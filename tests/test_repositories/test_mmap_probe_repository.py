@@ -0,0 +1,78 @@
+import pytest
+
+from app.domain.models import Grid, Probe, Position
+from app.domain.state import Direction
+from app.repositories.mmap_probe_repository import MmapProbeRepository, DATA_OFFSET, RECORD_SIZE
+
+
+def _probe(probe_id, plateau=None):
+    return Probe(probe_id=probe_id, grid=Grid(5, 5), initial_direction=Direction.NORTH, plateau_name=plateau)
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "probes.rec")
+
+
+# Teste para verificar leitura, atualização e crescimento do arquivo de registros
+def test_mmap_repository_should_store_and_update_records(path):
+    repository = MmapProbeRepository(path, initial_capacity=1)
+    repository.add_many([_probe("b"), _probe("a", plateau="alpha"), _probe("c")])
+    probe = repository.get_by_id("a")
+    probe.execute("MRM")
+    repository.save(probe)
+
+    stored = repository.get_by_id("a")
+    assert (stored.position, stored.current_direction, stored.plateau_name) == (Position(1, 1), Direction.EAST, "alpha")
+    assert [p.id for p in repository.get_page(2, after="a")] == ["b", "c"]
+    assert repository.get_by_id("missing") is None
+    repository.close()
+
+# Teste para verificar que as sondas sobrevivem à reabertura e que um registro corrompido é ignorado
+def test_mmap_repository_should_reopen_and_skip_corrupt_records(path):
+    repository = MmapProbeRepository(path)
+    repository.save_many([_probe("a"), _probe("b")])
+    repository.close()
+
+    with open(path, "r+b") as f:
+        f.seek(DATA_OFFSET + RECORD_SIZE + 2)
+        f.write(b"\xff")
+
+    reopened = MmapProbeRepository(path)
+    assert [p.id for p in reopened.iter_all(batch_size=1)] == ["a"]
+    reopened.close()
+
+# Teste para verificar que um lote com um campo grande demais não grava nenhuma sonda
+def test_mmap_repository_should_reject_oversized_fields(path):
+    repository = MmapProbeRepository(path)
+
+    with pytest.raises(ValueError):
+        repository.add_many([_probe("a"), _probe("x" * 40)])
+
+    assert len(repository) == 0
+    repository.close()
+
+# Teste para verificar que uma atualização interrompida perde só a atualização, não a sonda
+def test_mmap_repository_should_keep_previous_record_when_update_is_torn(path):
+    repository = MmapProbeRepository(path)
+    repository.add_many([_probe("a"), _probe("b")])
+    probe = repository.get_by_id("a")
+    probe.execute("MM")
+    repository.save(probe)
+    probe.execute("M")
+    repository.save(probe)
+    torn_slot = repository._index["a"]
+    repository.close()
+
+    with open(path, "r+b") as f:
+        f.seek(DATA_OFFSET + torn_slot * RECORD_SIZE + 40)
+        f.write(b"\xff")
+
+    reopened = MmapProbeRepository(path)
+    stored = reopened.get_by_id("a")
+    assert (stored.position, stored.version) == (Position(0, 2), 1)
+    assert len(reopened) == 2
+    probe = reopened.get_by_id("b")
+    probe.execute("M")
+    reopened.save(probe)
+    assert reopened._count == 3
+    reopened.close()
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.repositories.database_models import FleetStateDB, ProbeDB
+from app.domain.models import Grid, Probe, Position
+from app.domain.state import Direction
+from app.repositories.probe_read_model import Region
+from app.repositories.sharded_probe_read_model import ShardedProbeReadModel
+from app.repositories.sharded_probe_repository import ShardedProbeRepository, shard_for
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from tools.reshard import reshard
+
+
+def shard_engines(tmp_path, count: int, name: str = "shard"):
+    engines = [create_engine(f"sqlite:///{tmp_path / f'{name}{index}.db'}") for index in range(count)]
+    for engine in engines:
+        Base.metadata.create_all(engine)
+    return engines
+
+@pytest.fixture
+def engines(tmp_path):
+    return shard_engines(tmp_path, 3)
+
+@pytest.fixture
+def repository(engines):
+    return ShardedProbeRepository([sessionmaker(bind=engine, autoflush=False) for engine in engines])
+
+def make_probes(count: int) -> list[Probe]:
+    return [Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH, probe_id=f"probe-{index:03d}")
+            for index in range(count)]
+
+
+# Teste para verificar que cada sonda é gravada apenas no shard do hash do seu ID
+def test_sharded_repository_spreads_probes_by_id_hash(repository):
+    probes = make_probes(30)
+    repository.add_many(probes)
+
+    for index, shard in enumerate(repository.shards):
+        stored = {probe.id for probe in shard.get_all()}
+        assert stored == {probe.id for probe in probes if shard_for(probe.id, 3) == index}
+        assert stored
+    assert repository.get_by_id("probe-007").position == Position(0, 0)
+    assert set(repository.get_many(["probe-001", "probe-020", "fake-id"])) == {"probe-001", "probe-020"}
+
+# Teste para verificar que listagem e paginação intercalam os shards na ordem de ID
+def test_sharded_repository_merges_pages_across_shards(repository, engines):
+    probes = make_probes(25)
+    repository.add_many(probes)
+    read_model = ShardedProbeReadModel(engines)
+    expected = sorted(probe.id for probe in probes)
+
+    pages, after = [], None
+    while page := repository.get_page(10, after):
+        pages.append([probe.id for probe in page])
+        after = page[-1].id
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == expected
+    assert [probe.id for probe in repository.get_all()] == expected
+    assert [view.id for view in read_model.get_page(10, "probe-009")] == expected[10:20]
+    assert [view.id for view in read_model.get_within(Region(0, 0, 0, 0), limit=4, after="probe-002")] == expected[3:7]
+
+# Teste para verificar que a gravação condicional em vários shards é desfeita por inteiro num conflito
+def test_sharded_repository_save_if_unchanged_is_all_or_nothing(repository):
+    probes = make_probes(10)
+    repository.add_many(probes)
+    stale = repository.get_by_id(probes[-1].id)
+    repository.save_if_unchanged([repository.get_by_id(probes[-1].id)])
+
+    for probe in probes[:-1]:
+        probe.execute("M")
+    stale.execute("MM")
+
+    assert repository.save_if_unchanged(probes[:-1] + [stale]) is False
+    assert all(repository.get_by_id(probe.id).position == Position(0, 0) for probe in probes[:-1])
+    fleet_version = repository.fleet_version()
+    assert repository.save_if_unchanged(probes[:-1]) is True
+    assert {repository.get_by_id(probe.id).version for probe in probes[:-1]} == {1}
+    assert repository.fleet_version() > fleet_version
+
+# Teste para verificar que a ferramenta de resharding copia as sondas do banco único para os shards
+def test_reshard_moves_single_database_into_shards(tmp_path):
+    source_url = f"sqlite:///{tmp_path / 'single.db'}"
+    source_engine = create_engine(source_url)
+    Base.metadata.create_all(source_engine, tables=[ProbeDB.__table__, FleetStateDB.__table__])
+    probes = make_probes(40)
+    source_repository = SQLAlchemyProbeRepository(sessionmaker(bind=source_engine))
+    for probe in probes:
+        source_repository.add_many([probe])
+    target_urls = [f"sqlite:///{tmp_path / f'target{index}.db'}" for index in range(4)]
+
+    summary = reshard([source_url], target_urls, batch_size=7)
+
+    assert summary["copied"] == 40 and sum(summary["per_shard"]) == 40
+    engines = [create_engine(url) for url in target_urls]
+    target = ShardedProbeRepository([sessionmaker(bind=engine) for engine in engines])
+    assert [probe.id for probe in target.get_all()] == [probe.id for probe in probes]
+    # A origem não é migrada, e a versão da frota não volta para trás (o que repetiria ETags).
+    assert set(inspect(source_engine).get_table_names()) == {"probes", "fleet_state"}
+    assert target.fleet_version() > source_repository.fleet_version() == 40
+    with pytest.raises(ValueError):
+        reshard([source_url], target_urls)
@@ -0,0 +1,260 @@
+import asyncio
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database import Base, create_configured_engine
+from app.repositories.database_models import missing_schema, prepare_schema, upgrade_schema
+from app.domain.models import Grid, Probe, Position
+from app.domain.state import Direction
+from app.repositories.async_sqlalchemy_probe_repository import AsyncSQLAlchemyProbeRepository
+from app.domain.trajectory import build_segments
+from app.repositories.probe_read_model import ProbeView, Region
+from app.repositories.sqlalchemy_probe_read_model import SQLAlchemyProbeReadModel
+from app.repositories.sqlalchemy_probe_repository import SQLAlchemyProbeRepository
+from app.repositories.sqlalchemy_trajectory_repository import SQLAlchemyTrajectoryRepository
+from app.services.probe_service import ProbeService
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = tmp_path / "probes.db"
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    return path
+
+@pytest.fixture
+def repository(database_path):
+    engine = create_engine(f"sqlite:///{database_path}")
+    return SQLAlchemyProbeRepository(db_session_factory=sessionmaker(bind=engine, autoflush=False))
+
+
+# Teste para verificar a gravação e a leitura em lote no SQLAlchemy
+def test_sqlalchemy_repository_batch_roundtrip(repository):
+    probes = [Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH) for _ in range(3)]
+    ids = repository.add_many(probes)
+
+    probes[0].execute("MM")
+    repository.save_many([probes[0], probes[0]])
+
+    found = repository.get_many(ids + ["fake-id"])
+    assert set(found) == set(ids)
+    assert found[ids[0]].position == Position(0, 2)
+
+# Teste para verificar que o save grava uma sonda nova ou existente com um único comando
+def test_sqlalchemy_repository_save_is_a_single_upsert(repository):
+    statements = []
+    engine = repository.db_session_factory.kw["bind"]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    probe = Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH)
+
+    repository.save(probe)
+    probe.execute("MM")
+    repository.save(probe)
+
+    # Cada gravação é um upsert da sonda mais o incremento da versão da frota, também um upsert.
+    assert len(statements) == 4
+    assert all("ON CONFLICT" in statement for statement in statements)
+    assert sum("INSERT INTO probes" in statement for statement in statements) == 2
+    assert repository.get_by_id(probe.id).position == Position(0, 2)
+
+# Teste para verificar que a gravação condicional recusa uma sonda lida antes de outra gravação
+def test_sqlalchemy_repository_save_if_unchanged_detects_stale_version(repository):
+    probe = Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH)
+    repository.add_many([probe])
+    first, second = repository.get_by_id(probe.id), repository.get_by_id(probe.id)
+
+    first.execute("M")
+    second.execute("MM")
+
+    assert repository.save_if_unchanged([first]) is True
+    assert repository.save_if_unchanged([second]) is False
+    stored = repository.get_by_id(probe.id)
+    assert (stored.position, stored.version) == (Position(0, 1), 1)
+
+# Teste para verificar que a versão da frota cresce a cada gravação confirmada, e só nelas
+def test_sqlalchemy_repository_fleet_version_tracks_commits(repository):
+    read_model = SQLAlchemyProbeReadModel(repository.db_session_factory.kw["bind"])
+    probe = Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH)
+    assert repository.fleet_version() == 0
+
+    repository.add_many([probe])
+    stale = repository.get_by_id(probe.id)
+    probe.execute("M")
+    repository.save_if_unchanged([probe])
+    repository.save_if_unchanged([stale])
+    repository.save(probe)
+
+    assert repository.fleet_version() == read_model.fleet_version() == 3
+    assert read_model.get(probe.id).version == 2
+
+# Teste para verificar que o upgrade acrescenta a coluna de versão a uma tabela antiga
+def test_upgrade_schema_adds_version_column(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE probes (id VARCHAR PRIMARY KEY, x INTEGER NOT NULL, y INTEGER NOT NULL, "
+            "direction VARCHAR NOT NULL, max_x INTEGER NOT NULL, max_y INTEGER NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO probes VALUES ('a', 1, 2, 'NORTH', 5, 5)"))
+
+    assert "probes.ix_probes_x_y" in missing_schema(engine)
+    upgrade_schema(engine)
+
+    repository = SQLAlchemyProbeRepository(db_session_factory=sessionmaker(bind=engine))
+    stored = repository.get_by_id("a")
+    assert (stored.position, stored.version, stored.plateau_name) == (Position(1, 2), 0, None)
+    assert "probes.ix_probes_x_y" not in missing_schema(engine)
+
+# Teste para verificar que vários workers preparando o schema ao mesmo tempo não falham e que o verify detecta o que falta
+def test_prepare_schema_migrates_once_and_verifies(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    engines = [create_engine(url) for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda engine: prepare_schema([engine], "migrate"), engines))
+
+    assert missing_schema(engines[0]) == []
+    prepare_schema(engines, "verify")
+    empty = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    with pytest.raises(RuntimeError, match="probes"):
+        prepare_schema([empty], "verify")
+    assert missing_schema(empty)
+
+# Teste para verificar que o read model lê as colunas direto do banco, sem passar pelo domínio
+def test_sqlalchemy_read_model_returns_views(repository):
+    read_model = SQLAlchemyProbeReadModel(repository.db_session_factory.kw["bind"])
+    probes = [Probe(probe_id=probe_id, grid=Grid(5, 5), initial_direction=Direction.WEST) for probe_id in "cab"]
+    repository.add_many(probes)
+
+    assert read_model.get("a") == ProbeView("a", 0, 0, "WEST")
+    assert read_model.get("missing") is None
+    assert [v.id for v in read_model.get_page(2, after="a")] == ["b", "c"]
+    assert [v.id for v in read_model.iter_all(batch_size=1)] == ["a", "b", "c"]
+    assert len(read_model.get_all()) == 3
+
+# Teste para verificar a consulta por região, paginada por cursor e feita pelo índice (x, y)
+def test_sqlalchemy_read_model_queries_region_through_xy_index(repository):
+    engine = repository.db_session_factory.kw["bind"]
+    read_model = SQLAlchemyProbeReadModel(engine)
+    repository.add_many([
+        Probe(probe_id=f"p{x}{y}", grid=Grid(9, 9), initial_direction=Direction.NORTH, initial_position=Position(x, y))
+        for x in range(5) for y in range(5)
+    ])
+    region = Region(1, 2, 2, 3)
+
+    assert [v.id for v in read_model.get_within(region)] == ["p12", "p13", "p22", "p23"]
+    assert [v.id for v in read_model.get_within(region, limit=3, after="p12")] == ["p13", "p22", "p23"]
+    with engine.connect() as connection:
+        plan = connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM probes WHERE x BETWEEN 1 AND 2 AND y BETWEEN 2 AND 3 ORDER BY id"
+        )).all()
+    assert any("ix_probes_x_y" in row[-1] for row in plan)
+
+# Teste para verificar que os PRAGMAs configurados são aplicados a cada conexão SQLite
+def test_configured_engine_applies_sqlite_pragmas(tmp_path):
+    config = dataclasses.replace(settings, sqlite_journal_mode="WAL", sqlite_synchronous="NORMAL",
+                                 sqlite_cache_size=-2000, sqlite_mmap_size=1 << 20, database_pool_size=3)
+    engine = create_configured_engine(f"sqlite:///{tmp_path / 'tuned.db'}", config)
+
+    with engine.connect() as connection:
+        pragmas = [connection.execute(text(f"PRAGMA {name}")).scalar()
+                   for name in ("journal_mode", "synchronous", "cache_size", "mmap_size")]
+
+    assert pragmas == ["wal", 1, -2000, 1 << 20]
+    assert engine.pool.size() == 3
+    with pytest.raises(ValueError):
+        create_configured_engine("sqlite://", dataclasses.replace(config, sqlite_synchronous="FAST"))
+
+# Teste para verificar que o repositório assíncrono lê o que o síncrono grava no mesmo banco
+def test_async_repository_reads_and_writes_same_database(repository, database_path):
+    async_repository = AsyncSQLAlchemyProbeRepository(
+        db_session_factory=async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{database_path}"), expire_on_commit=False)
+    )
+    probe = Probe(grid=Grid(5, 5), initial_direction=Direction.EAST)
+    repository.save(probe)
+
+    async def scenario():
+        loaded = await async_repository.get_by_id(probe.id)
+        loaded.execute("MM")
+        await async_repository.save(loaded)
+        return await async_repository.get_all()
+
+    probes = asyncio.run(scenario())
+
+    assert [p.position for p in probes] == [Position(2, 0)]
+    assert repository.get_by_id(probe.id).position == Position(2, 0)
+
+# Teste para verificar a paginação por cursor e a leitura em streaming no SQLAlchemy
+def test_sqlalchemy_repository_pages_and_streams_in_id_order(repository):
+    ids = sorted(repository.add_many([Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH) for _ in range(5)]))
+
+    first_page = repository.get_page(limit=3)
+    second_page = repository.get_page(limit=3, after=first_page[-1].id)
+
+    assert [p.id for p in first_page + second_page] == ids
+    assert [p.id for p in repository.iter_all(batch_size=2)] == ids
+
+# Teste para verificar a gravação em lote e a busca indexada do histórico de trajetória
+def test_sqlalchemy_trajectory_repository_buffers_and_finds_segments(database_path):
+    engine = create_engine(f"sqlite:///{database_path}")
+    trajectory = SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine), flush_threshold=100)
+    trajectory.append(build_segments("a", 0, Position(0, 0), Direction.NORTH, "MMRMM", checkpoint_interval=2))
+
+    assert trajectory.end_seq("a") == 5
+    assert SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine)).end_seq("a") is None
+
+    segment = trajectory.find_segment("a", 3)
+    assert (segment.start_seq, segment.count) == (2, 2)
+    assert segment.pose_at(3) == (Position(0, 2), Direction.EAST)
+    assert SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine)).end_seq("a") == 5
+
+# Teste para verificar que o lançamento não grava trecho e o primeiro movimento começa no comando 0
+def test_sqlalchemy_trajectory_records_first_move_after_launch(repository, database_path):
+    engine = create_engine(f"sqlite:///{database_path}")
+    trajectory = SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine), flush_threshold=1)
+    service = ProbeService(probe_repository=repository, trajectory_repository=trajectory)
+    probe = service.launch_probe(max_x=5, max_y=5, direction_str="NORTH")
+
+    assert trajectory.end_seq(probe.id) is None
+    assert service.get_pose_at(probe.id, 0) == (Position(0, 0), Direction.NORTH)
+
+    service.move_probe(probe.id, "MM")
+    service.move_probe(probe.id, "")
+    service.move_probe(probe.id, "RM")
+
+    segments = [trajectory.find_segment(probe.id, seq) for seq in (0, 2)]
+    assert [(s.start_seq, s.count) for s in segments] == [(0, 2), (2, 2)]
+    assert service.get_pose_at(probe.id, 0) == (Position(0, 0), Direction.NORTH)
+    assert service.get_pose_at(probe.id, 4) == (Position(1, 2), Direction.EAST)
+
+# Teste para verificar que dois processos gravando o histórico da mesma sonda não perdem trechos
+def test_sqlalchemy_trajectory_repository_continues_history_of_other_writer(database_path):
+    engine = create_engine(f"sqlite:///{database_path}")
+    first = SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine), flush_threshold=100)
+    second = SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine), flush_threshold=100)
+    first.append(build_segments("a", 0, Position(0, 0), Direction.NORTH, "MM", checkpoint_interval=2))
+    second.append(build_segments("a", 0, Position(0, 2), Direction.NORTH, "RM", checkpoint_interval=2))
+    second.append(build_segments("b", 0, Position(0, 0), Direction.NORTH, "M", checkpoint_interval=2))
+
+    second.flush()
+    first.flush()
+
+    assert second.find_segment("a", 0).pose_at(2) == (Position(1, 2), Direction.EAST)
+    assert (first.find_segment("a", 3).start_seq, first.end_seq("a")) == (2, 4)
+    assert first.find_segment("a", 3).pose_at(3) == (Position(0, 1), Direction.NORTH)
+    assert first.end_seq("b") == 1
+
+# Teste para verificar que os trechos de um flush que falhou voltam para o buffer e são gravados depois
+def test_sqlalchemy_trajectory_repository_keeps_segments_when_flush_fails(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    trajectory = SQLAlchemyTrajectoryRepository(sessionmaker(bind=engine), flush_threshold=1)
+    trajectory.append(build_segments("a", 0, Position(0, 0), Direction.NORTH, "MM", checkpoint_interval=2))
+
+    Base.metadata.create_all(engine)
+    trajectory.flush()
+
+    assert trajectory.find_segment("a", 1).pose_at(2) == (Position(0, 2), Direction.NORTH)
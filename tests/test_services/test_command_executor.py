@@ -0,0 +1,58 @@
+import pytest
+
+from app.domain.models import Grid, Position, Probe
+from app.domain.state import Direction
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.repositories.trajectory_repository import InMemoryTrajectoryRepository
+from app.services.command_executor import CommandExecutor, CommandPoolBusyError
+from app.services.probe_service import InvalidCommandError, ProbeService
+
+
+@pytest.fixture
+def executor():
+    executor = CommandExecutor(threshold=10, workers=1, max_queue=0)
+    yield executor
+    executor.close()
+
+
+# Teste para verificar que sequências longas rodam no pool com o mesmo resultado da execução local
+def test_command_executor_offloads_long_sequences(executor):
+    commands = "MMRMMLM" * 5
+    local = Probe(grid=Grid(100, 100), initial_direction=Direction.NORTH)
+    local.execute(commands)
+    remote = Probe(grid=Grid(100, 100), initial_direction=Direction.NORTH)
+
+    executor.execute(remote, "MRL")
+    assert executor.offloaded == 0
+    executor.execute(remote, "LR" + commands)
+
+    assert local.position == Position(10, 15)
+    assert (remote.position, remote.current_direction) == (Position(10, 16), local.current_direction)
+    assert executor.offloaded == 1
+
+# Teste para verificar que um movimento inválido no pool não altera a sonda, pelo ProbeService
+def test_probe_service_keeps_probe_unchanged_when_pool_reports_invalid_move(executor):
+    repository = InMemoryProbeRepository()
+    service = ProbeService(probe_repository=repository, trajectory_repository=InMemoryTrajectoryRepository(),
+                           executor=executor)
+    probe = service.launch_probe(max_x=3, max_y=3, direction_str="NORTH")
+
+    with pytest.raises(InvalidCommandError, match="ultrapassa os limites"):
+        service.move_probe(probe.id, "M" * 20)
+
+    assert repository.get_by_id(probe.id).position == Position(0, 0)
+    assert executor.offloaded == 1
+
+# Teste para verificar que, com o pool cheio, o movimento é recusado em vez de esperar
+def test_command_executor_rejects_when_pool_is_full(executor):
+    probe = Probe(grid=Grid(100, 100), initial_direction=Direction.NORTH)
+    executor._slots.acquire()
+    try:
+        with pytest.raises(CommandPoolBusyError):
+            executor.execute(probe, "M" * 20)
+    finally:
+        executor._slots.release()
+
+    assert (probe.position, executor.rejected) == (Position(0, 0), 1)
+    executor.execute(probe, "M" * 20)
+    assert probe.position == Position(0, 20)
@@ -0,0 +1,96 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.domain.models import Grid, Probe, Position, InvalidMoveError
+from app.domain.state import Direction
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.repositories.trajectory_repository import InMemoryTrajectoryRepository
+from app.services import fleet_engine
+from app.services.fleet_engine import FleetEngine
+from app.services.probe_service import ProbeConflictError, ProbeService
+
+
+def _run_scalar(probe, commands):
+    """Executa os comandos na Probe escalar, devolvendo o índice do comando que falhou (ou -1)."""
+    for offset, command in enumerate(commands):
+        try:
+            if command == 'L':
+                probe.turn_left()
+            elif command == 'R':
+                probe.turn_right()
+            else:
+                probe.move()
+        except InvalidMoveError:
+            return offset
+    return -1
+
+# Teste para verificar se a frota vetorizada reproduz a semântica da Probe escalar
+@pytest.mark.parametrize("block_size", [1024, 7])
+def test_fleet_engine_should_match_scalar_probe(monkeypatch, block_size):
+    monkeypatch.setattr(fleet_engine, "BLOCK_SIZE", block_size)
+    rng = random.Random(42)
+    probes, scalar_probes, commands = [], [], []
+    for index in range(200):
+        max_x, max_y = rng.randint(0, 8), rng.randint(0, 8)
+        position = Position(rng.randint(0, max_x), rng.randint(0, max_y))
+        direction = rng.choice(list(Direction))
+        for target in (probes, scalar_probes):
+            target.append(Probe(grid=Grid(max_x, max_y), initial_direction=direction,
+                                probe_id=f"probe-{index}", initial_position=position))
+        commands.append("".join(rng.choice("LRMM") for _ in range(rng.randint(0, 40))))
+
+    engine = FleetEngine.from_probes(probes)
+    engine.run(FleetEngine.encode(commands))
+
+    for index, scalar in enumerate(scalar_probes):
+        failed_at = _run_scalar(scalar, commands[index])
+        assert engine.out_of_bounds[index] == (failed_at >= 0)
+        assert engine.failed_at[index] == failed_at
+        assert (engine.x[index], engine.y[index]) == (scalar.position.x, scalar.position.y)
+        assert engine.to_probes(include_out_of_bounds=True)[index].current_direction == scalar.current_direction
+
+# Teste para verificar se um tick marca as sondas que saíram da malha e ignora os comandos seguintes
+def test_fleet_engine_tick_should_mark_out_of_bounds_probes():
+    engine = FleetEngine(ids=["a", "b"], x=[0, 0], y=[0, 5], direction=[0, 0], max_x=[5, 5], max_y=[5, 5])
+
+    failed = engine.tick(np.array([fleet_engine.MOVE, fleet_engine.MOVE]))
+    assert failed.tolist() == [False, True]
+
+    engine.tick(np.array([fleet_engine.RIGHT, fleet_engine.RIGHT]))
+    assert engine.direction.tolist() == [1, 0]
+    assert (engine.y.tolist(), engine.out_of_bounds.tolist()) == ([1, 5], [False, True])
+
+# Teste para verificar a carga da frota e a gravação pelo ProbeService, com histórico e versão
+def test_fleet_engine_should_load_and_store_through_service():
+    repository = InMemoryProbeRepository()
+    repository.save(Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH, probe_id="ok"))
+    repository.save(Probe(grid=Grid(5, 5), initial_direction=Direction.SOUTH, probe_id="out"))
+    service = ProbeService(probe_repository=repository, trajectory_repository=InMemoryTrajectoryRepository())
+
+    engine = FleetEngine.load(repository, probe_ids=["ok", "out"])
+    engine.run(FleetEngine.encode(["MRM", "M"]))
+    saved = service.store_fleet(engine)
+
+    assert saved == 1
+    assert repository.get_by_id("ok").position == Position(1, 1)
+    assert repository.get_by_id("ok").current_direction == Direction.EAST
+    assert repository.get_by_id("ok").version == 1
+    assert repository.get_by_id("out").position == Position(0, 0)
+    assert service.trajectory.end_seq("ok") == 3
+
+# Teste para verificar se a frota não sobrescreve uma sonda movida depois do carregamento
+def test_store_fleet_should_reject_probe_changed_after_load():
+    repository = InMemoryProbeRepository()
+    repository.save(Probe(grid=Grid(5, 5), initial_direction=Direction.NORTH, probe_id="a"))
+    service = ProbeService(probe_repository=repository)
+
+    engine = FleetEngine.load(repository, probe_ids=["a"])
+    engine.run(FleetEngine.encode(["M"]))
+    service.move_probe("a", "R")
+
+    with pytest.raises(ProbeConflictError):
+        service.store_fleet(engine)
+    assert repository.get_by_id("a").position == Position(0, 0)
+    assert repository.get_by_id("a").current_direction == Direction.EAST
@@ -1,8 +1,16 @@
+import threading
+
 import pytest
 from unittest.mock import Mock
 
-from app.services.probe_service import ProbeService, ProbeNotFoundError, InvalidCommandError
-from app.domain.models import Probe, Grid
+from app.services.move_coalescer import MoveCoalescer
+from app.services.probe_json_cache import ProbeJsonCache
+from app.services.probe_service import (
+    ProbeService, ProbeNotFoundError, InvalidCommandError, ProbeConflictError, StreamMoveError,
+)
+from app.domain.models import Probe, Grid, Position
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.repositories.trajectory_repository import InMemoryTrajectoryRepository
 from app.domain.state import Direction
 
 # Teste para verificar o lançamento de uma nova Probe
@@ -41,7 +49,7 @@ def test_move_probe_should_succeed_and_save_final_state():
     assert final_probe.position.y == 1
     assert final_probe.current_direction == Direction.EAST
 
-    mock_repo.save.assert_called_once_with(final_probe)
+    mock_repo.save_if_unchanged.assert_called_once_with([final_probe])
 
 # Teste para verificar o erro de uma movimentação de uma Probe que não existe
 def test_move_probe_should_raise_error_if_probe_not_found():
@@ -53,7 +61,7 @@ def test_move_probe_should_raise_error_if_probe_not_found():
     with pytest.raises(ProbeNotFoundError):
         service.move_probe(probe_id="non-existent-id", commands="M")
 
-    mock_repo.save.assert_not_called()
+    mock_repo.save_if_unchanged.assert_not_called()
 
 # Teste para verificar o erro de uma movimentação invalida
 def test_move_probe_should_raise_error_and_not_save_on_invalid_move():
@@ -73,4 +81,205 @@ def test_move_probe_should_raise_error_and_not_save_on_invalid_move():
     with pytest.raises(InvalidCommandError):
         service.move_probe(probe_id=probe_id, commands="M")
 
-    mock_repo.save.assert_not_called()
\ No newline at end of file
+    mock_repo.save_if_unchanged.assert_not_called()
+
+# Teste para verificar que, em um lote, a falha de uma sonda não impede as demais
+def test_move_probes_batch_should_isolate_failures_and_save_once():
+    probe = Probe(probe_id="a", grid=Grid(5, 5), initial_direction=Direction.NORTH)
+    mock_repo = Mock()
+    mock_repo.get_many.return_value = {"a": probe}
+
+    service = ProbeService(probe_repository=mock_repo)
+
+    report = service.move_probes_batch([("a", "MRM"), ("missing", "M"), ("a", "MMMMMMM")])
+
+    mock_repo.get_many.assert_called_once_with(["a", "missing", "a"])
+    mock_repo.save_if_unchanged.assert_called_once_with([probe])
+    assert report.committed is True
+    assert [r.success for r in report.results] == [True, False, False]
+    assert (report.results[0].position.x, report.results[0].position.y) == (1, 1)
+    assert "não encontrada" in report.results[1].error
+
+# Teste para verificar que um lote atômico não persiste nada quando algum item falha
+def test_move_probes_batch_atomic_should_not_save_on_failure():
+    probe = Probe(probe_id="a", grid=Grid(5, 5), initial_direction=Direction.NORTH)
+    mock_repo = Mock()
+    mock_repo.get_many.return_value = {"a": probe}
+
+    service = ProbeService(probe_repository=mock_repo)
+
+    report = service.move_probes_batch([("a", "M"), ("missing", "M")], atomic=True)
+
+    mock_repo.save_if_unchanged.assert_not_called()
+    assert report.committed is False
+    assert [r.success for r in report.results] == [True, False]
+
+# Teste para verificar o lançamento de várias Probes com uma única inserção em lote
+def test_launch_probes_should_add_all_in_one_call_and_keep_order():
+    mock_repo = Mock()
+    mock_repo.add_many.side_effect = lambda probes: [p.id for p in probes]
+
+    service = ProbeService(probe_repository=mock_repo)
+
+    ids = service.launch_probes([(5, 5, "NORTH"), (3, 2, "west")])
+
+    mock_repo.add_many.assert_called_once()
+    launched = mock_repo.add_many.call_args.args[0]
+    assert ids == [p.id for p in launched]
+    assert [p.current_direction for p in launched] == [Direction.NORTH, Direction.WEST]
+    assert (launched[1].grid.max_x, launched[1].grid.max_y) == (3, 2)
+
+# Teste para verificar que os movimentos são registrados no histórico de trajetória
+def test_move_probe_should_append_trajectory_segments():
+    probe = Probe(probe_id="a", grid=Grid(5, 5), initial_direction=Direction.NORTH)
+    mock_repo = Mock()
+    mock_repo.get_by_id.return_value = probe
+    trajectory = Mock()
+    trajectory.end_seq.return_value = 3
+
+    service = ProbeService(probe_repository=mock_repo, trajectory_repository=trajectory, checkpoint_interval=2)
+
+    service.move_probe(probe_id="a", commands="mrm")
+
+    segments = trajectory.append.call_args.args[0]
+    assert [(s.start_seq, s.count) for s in segments] == [(3, 2), (5, 1)]
+    assert (segments[0].x, segments[0].y, segments[0].direction) == (0, 0, Direction.NORTH)
+
+# Teste para verificar que duas sondas de um planalto compartilhado não ocupam a mesma célula
+def test_shared_plateau_should_reject_occupied_start_and_collisions():
+    service = ProbeService(probe_repository=InMemoryProbeRepository())
+
+    first = service.launch_probe(5, 5, "NORTH", plateau="alpha", x=1, y=1)
+    with pytest.raises(InvalidCommandError):
+        service.launch_probe(5, 5, "NORTH", plateau="alpha", x=1, y=1)
+    second = service.launch_probe(5, 5, "SOUTH", plateau="alpha", x=1, y=3)
+
+    with pytest.raises(InvalidCommandError, match="ocupada"):
+        service.move_probe(first.id, "MM")
+    service.move_probe(first.id, "M")
+
+    report = service.move_probes_batch([(first.id, "RM"), (second.id, "MMMM")], atomic=True)
+
+    plateau = service.plateaus.get("alpha")
+    assert report.committed is False
+    assert plateau.is_occupied(Position(1, 2)) and not plateau.is_occupied(Position(2, 2))
+    assert service.repository.get_by_id(first.id).position == Position(1, 2)
+
+# Teste para verificar que movimentos concorrentes na mesma sonda não se sobrescrevem
+def test_concurrent_moves_on_same_probe_are_not_lost():
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), max_retries=1_000, retry_backoff=0.0001)
+    probe = service.launch_probe(max_x=500, max_y=500, direction_str="NORTH")
+
+    def move_many():
+        for _ in range(25):
+            service.move_probe(probe.id, "M")
+
+    threads = [threading.Thread(target=move_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = service.repository.get_by_id(probe.id)
+    assert stored.position == Position(0, 200)
+    assert stored.version == 200
+
+# Teste para verificar que o serviço desiste com ProbeConflictError depois das novas tentativas
+def test_move_probe_should_raise_conflict_after_retries():
+    mock_repo = Mock()
+    mock_repo.get_by_id.side_effect = lambda probe_id: Probe(probe_id=probe_id, grid=Grid(5, 5), initial_direction=Direction.NORTH)
+    mock_repo.save_if_unchanged.return_value = False
+
+    service = ProbeService(probe_repository=mock_repo, max_retries=2, retry_backoff=0)
+
+    with pytest.raises(ProbeConflictError):
+        service.move_probe(probe_id="a", commands="M")
+    assert mock_repo.save_if_unchanged.call_count == 3
+
+# Teste para verificar que movimentos simultâneos da mesma sonda são gravados juntos, cada um com seu resultado
+def test_coalescer_should_commit_concurrent_moves_once_with_each_callers_outcome():
+    coalescer = MoveCoalescer(window=1.0, max_batch=5)
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), coalescer=coalescer)
+    probe = service.launch_probe(max_x=5, max_y=5, direction_str="NORTH")
+    results = {}
+
+    def move(name, commands):
+        try:
+            results[name] = service.move_probe(probe.id, commands).position
+        except InvalidCommandError as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=move, args=(i, "M")) for i in range(4)]
+    threads.append(threading.Thread(target=move, args=("invalid", "MMMMMMM")))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = service.repository.get_by_id(probe.id)
+    assert isinstance(results.pop("invalid"), InvalidCommandError)
+    assert sorted(position.y for position in results.values()) == [1, 2, 3, 4]
+    assert stored.position == Position(0, 4)
+    assert stored.version == 1
+    assert coalescer.stats() == {"requests": 5, "groups": 1, "coalescing_ratio": 5.0}
+
+# Teste para verificar que uma fita em pedaços grava a pose a cada checkpoint e para no comando inválido
+def test_command_stream_should_checkpoint_and_stop_at_exact_offset():
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), trajectory_repository=InMemoryTrajectoryRepository())
+    probe = service.launch_probe(max_x=5, max_y=5, direction_str="NORTH")
+    stream = service.open_command_stream(probe.id, checkpoint_interval=4)
+
+    stream.feed(b"MRM\nLM")
+    assert stream.checkpoints == 1
+    assert service.repository.get_by_id(probe.id).position == Position(1, 1)
+
+    with pytest.raises(StreamMoveError) as error:
+        stream.feed(b"mmmmmm")
+
+    assert error.value.offset == 9
+    stored = service.repository.get_by_id(probe.id)
+    assert (stored.position, stored.current_direction) == (Position(1, 5), Direction.NORTH)
+    assert service.get_pose_at(probe.id, 8) == (Position(1, 5), Direction.NORTH)
+
+# Teste para verificar que uma fita interrompida libera no planalto a pose que não foi gravada
+def test_command_stream_abort_should_release_unsaved_cell():
+    service = ProbeService(probe_repository=InMemoryProbeRepository())
+    first = service.launch_probe(5, 5, "NORTH", plateau="p")
+    second = service.launch_probe(5, 5, "EAST", plateau="p", x=0, y=4)
+    stream = service.open_command_stream(first.id)
+
+    stream.feed(b"MM")
+    stream.abort()
+
+    assert service.repository.get_by_id(first.id).position == Position(0, 0)
+    assert service.plateaus.get("p").occupied_cells() == {(0, 0), (0, 4)}
+    assert service.move_probe(second.id, "RMM").position == Position(0, 2)
+
+# Teste para verificar que, após um conflito, o índice de ocupação fica com a pose de quem gravou a sonda
+def test_command_stream_conflict_should_keep_winning_pose_in_index():
+    service = ProbeService(probe_repository=InMemoryProbeRepository())
+    first = service.launch_probe(5, 5, "NORTH", plateau="p")
+    service.launch_probe(5, 5, "NORTH", plateau="p", x=5, y=5)
+    stream = service.open_command_stream(first.id)
+
+    stream.feed(b"M")
+    service.move_probe(first.id, "RM")
+    with pytest.raises(ProbeConflictError):
+        stream.close()
+
+    assert service.repository.get_by_id(first.id).position == Position(1, 0)
+    assert service.plateaus.get("p").occupied_cells() == {(1, 0), (5, 5)}
+
+# Teste para verificar que o JSON em cache é reaproveitado e descartado quando a sonda é gravada
+def test_json_cache_should_reuse_encoding_until_probe_is_saved():
+    json_cache = ProbeJsonCache(lambda view: repr(view).encode())
+    service = ProbeService(probe_repository=InMemoryProbeRepository(), json_cache=json_cache)
+    probe = service.launch_probe(max_x=5, max_y=5, direction_str="NORTH")
+
+    first = json_cache.get(service.get_probe(probe.id))
+    assert json_cache.get(service.get_probe(probe.id)) is first
+    service.move_probe(probe.id, "M")
+
+    assert len(json_cache) == 0
+    assert json_cache.get(service.get_probe(probe.id)) != first
+    assert (json_cache.hits, json_cache.misses) == (1, 2)
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from app.repositories.probe_read_model import ProbeView
+from app.services.spatial_index import SpatialIndex, nearest_by_scan
+
+
+# Teste para verificar que a busca em anéis de baldes devolve as mesmas sondas que a varredura completa
+@pytest.mark.parametrize("cell_size", [1, 8, 64])
+def test_spatial_index_nearest_matches_full_scan(cell_size):
+    rng = random.Random(cell_size)
+    views = [ProbeView(f"p{i:04d}", rng.randrange(2000), rng.randrange(2000), "NORTH") for i in range(500)]
+    # Uma frota concentrada longe do resto, para passar pela troca dos anéis pela ordem dos baldes.
+    views += [ProbeView(f"q{i:02d}", 900_000 + i, 900_000, "EAST") for i in range(10)]
+    index = SpatialIndex(cell_size=cell_size)
+    assert index.rebuild(views) == 510
+
+    for x, y, k in [(0, 0, 1), (1000, 1000, 7), (1999, 5, 25), (850_000, 850_000, 12), (-50, 3000, 3)]:
+        expected = nearest_by_scan(views, x, y, k)
+        assert [(d, v.id) for d, v in index.nearest(x, y, k)] == [(d, v.id) for d, v in expected]
+
+# Teste para verificar que o índice acompanha as gravações e ignora versões mais antigas
+def test_spatial_index_follows_updates():
+    index = SpatialIndex(cell_size=4)
+    index.update([ProbeView("a", 0, 0, "NORTH", 1), ProbeView("b", 10, 10, "NORTH", 1)])
+
+    index.update([ProbeView("a", 20, 20, "NORTH", 2)])
+    index.update([ProbeView("a", 1, 1, "NORTH", 1)])
+
+    assert [(d, v.id) for d, v in index.nearest(0, 0, 5)] == [(10 * 2 ** 0.5, "b"), (20 * 2 ** 0.5, "a")]
+    assert len(index) == 2 and index.nearest(0, 0, 0) == []
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+from app.repositories.probe_repository import InMemoryProbeRepository
+from app.services.probe_service import ProbeService
+from app.services.telemetry import TelemetryHub
+
+
+def _in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+# Teste para verificar que as gravações chegam aos assinantes filtrados, com as poses intermediárias fundidas
+def test_hub_should_fan_out_latest_pose_per_probe():
+    async def scenario():
+        hub = TelemetryHub()
+        service = ProbeService(probe_repository=InMemoryProbeRepository(), telemetry=hub)
+        first = service.launch_probe(5, 5, "NORTH", plateau="alpha")
+        second = service.launch_probe(5, 5, "NORTH")
+        loop = asyncio.get_running_loop()
+        everything = hub.subscribe(loop)
+        only_plateau = hub.subscribe(loop, plateau="alpha")
+
+        def moves():
+            service.move_probe(first.id, "M")
+            service.move_probe(first.id, "M")
+            service.move_probe(second.id, "R")
+
+        _in_thread(moves)
+        resync, batch = await asyncio.wait_for(everything.next_batch(), 1)
+        _, plateau_batch = await asyncio.wait_for(only_plateau.next_batch(), 1)
+
+        assert resync is False
+        assert len(batch) == 2 and everything.coalesced == 1
+        assert plateau_batch == [batch[0]]
+        assert b'"y": 2' in batch[0] and b'"version": 2' in batch[0]
+        assert hub.published == 3
+
+        hub.unsubscribe(everything)
+        hub.unsubscribe(only_plateau)
+        assert hub.subscribers == 0
+
+    asyncio.run(scenario())
+
+# Teste para verificar que um assinante muito atrasado descarta as poses e pede um novo snapshot
+def test_subscription_should_resync_when_too_far_behind():
+    async def scenario():
+        hub = TelemetryHub(max_pending=2)
+        service = ProbeService(probe_repository=InMemoryProbeRepository(), telemetry=hub)
+        subscription = hub.subscribe(asyncio.get_running_loop())
+
+        _in_thread(lambda: service.launch_probes([(5, 5, "NORTH")] * 3))
+        resync, batch = await asyncio.wait_for(subscription.next_batch(), 1)
+
+        assert resync is True and batch == []
+        assert subscription.resyncs == 1
+
+    asyncio.run(scenario())
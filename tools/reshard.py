@@ -0,0 +1,146 @@
+"""
+Redistribui as sondas entre shards, com a aplicação parada. A origem é o banco
+único (--source) ou um conjunto de shards (--source-template com --source-shards);
+o destino são --shards bancos novos, nomeados pelo modelo --target-template. As
+sondas são copiadas em lotes, na ordem de ID, e as contagens são conferidas no fim.
+A origem é aberta só para leitura e nunca é migrada; a versão da frota dos shards
+de destino começa acima da versão da origem, para que as ETags não se repitam.
+
+Uso:
+    python -m tools.reshard --source sqlite:///./mars_probe.db \\
+        --target-template "sqlite:///./mars_probe_shard{shard}.db" --shards 4
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import create_engine, func, insert, inspect, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_configured_engine, shard_urls
+from app.repositories.database_models import FleetStateDB, ProbeDB, missing_schema, upgrade_schema
+from app.repositories.sharded_probe_repository import ShardedProbeRepository
+from app.repositories.sqlalchemy_probe_repository import FLEET_ROW_ID, FLEET_VERSION_QUERY
+
+
+def open_shards(urls: list[str]) -> tuple[list, ShardedProbeRepository]:
+    engines = [create_configured_engine(url) for url in urls]
+    for engine in engines:
+        Base.metadata.create_all(engine)
+        upgrade_schema(engine)
+    return engines, ShardedProbeRepository([sessionmaker(bind=engine, autoflush=False) for engine in engines])
+
+
+def read_only_engine(url: str):
+    """Engine que não altera o banco: no SQLite, o arquivo é aberto com mode=ro; no PostgreSQL, em transações read-only."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+        return create_engine(f"sqlite:///file:{parsed.database}?mode=ro&uri=true")
+    if parsed.get_backend_name() == "postgresql":
+        return create_engine(url, execution_options={"postgresql_readonly": True})
+    return create_engine(url)
+
+
+def open_source(urls: list[str]) -> tuple[list, ShardedProbeRepository]:
+    """Abre a origem só para leitura; o schema das sondas precisa estar atualizado (a ferramenta não o migra)."""
+    engines = [read_only_engine(url) for url in urls]
+    for url, engine in zip(urls, engines):
+        missing = [name for name in missing_schema(engine) if name.split(".")[0] == ProbeDB.__tablename__]
+        if missing:
+            raise ValueError(
+                f"A origem {url} está com o schema desatualizado ({', '.join(missing)}); "
+                "suba a aplicação uma vez sobre ela antes de redistribuir."
+            )
+    return engines, ShardedProbeRepository([sessionmaker(bind=engine, autoflush=False) for engine in engines])
+
+
+def fleet_version(engines) -> int:
+    """Soma das versões da frota dos bancos (0 nos que não têm a tabela fleet_state)."""
+    total = 0
+    for engine in engines:
+        if not inspect(engine).has_table(FleetStateDB.__tablename__):
+            continue
+        with engine.connect() as connection:
+            total += connection.execute(FLEET_VERSION_QUERY).scalar() or 0
+    return total
+
+
+def seed_fleet_version(engine, offset: int) -> None:
+    """Soma `offset` à versão da frota do shard, criando a linha se ela ainda não existir."""
+    with engine.begin() as connection:
+        bumped = connection.execute(
+            update(FleetStateDB).where(FleetStateDB.id == FLEET_ROW_ID).values(version=FleetStateDB.version + offset)
+        )
+        if bumped.rowcount == 0:
+            connection.execute(insert(FleetStateDB).values(id=FLEET_ROW_ID, version=offset))
+
+
+def count_probes(engines) -> list[int]:
+    counts = []
+    for engine in engines:
+        with engine.connect() as connection:
+            counts.append(connection.execute(select(func.count()).select_from(ProbeDB)).scalar_one())
+    return counts
+
+
+def reshard(source_urls: list[str], target_urls: list[str], batch_size: int = 1000) -> dict:
+    """Copia as sondas da origem para os shards de destino, que precisam estar vazios."""
+    overlap = set(source_urls) & set(target_urls)
+    if overlap:
+        raise ValueError(f"Origem e destino não podem ser o mesmo banco: {', '.join(sorted(overlap))}.")
+    source_engines, source = open_source(source_urls)
+    target_engines, target = open_shards(target_urls)
+    if any(count_probes(target_engines)):
+        raise ValueError("Os shards de destino já contêm sondas.")
+
+    started = time.perf_counter()
+    copied = 0
+    batch = []
+    for probe in source.iter_all(batch_size):
+        batch.append(probe)
+        if len(batch) >= batch_size:
+            copied += len(target.add_many(batch))
+            batch = []
+    if batch:
+        copied += len(target.add_many(batch))
+
+    source_total = sum(count_probes(source_engines))
+    target_counts = count_probes(target_engines)
+    if sum(target_counts) != source_total:
+        raise RuntimeError(f"Contagens divergentes: origem {source_total}, destino {sum(target_counts)}.")
+    # Cada lote copiado já incrementou algum shard; somando a versão da origem, a frota só avança.
+    seed_fleet_version(target_engines[0], fleet_version(source_engines))
+    return {
+        "copied": copied,
+        "source_shards": len(source_urls),
+        "target_shards": len(target_urls),
+        "per_shard": target_counts,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--source", help="URL do banco único de origem")
+    source.add_argument("--source-template", help="Modelo de URL dos shards de origem, com {shard}")
+    parser.add_argument("--source-shards", type=int, default=1)
+    parser.add_argument("--target-template", required=True, help="Modelo de URL dos shards de destino, com {shard}")
+    parser.add_argument("--shards", type=int, required=True)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    source_urls = [args.source] if args.source else shard_urls(args.source_template, args.source_shards)
+    try:
+        summary = reshard(source_urls, shard_urls(args.target_template, args.shards), args.batch_size)
+    except (ValueError, RuntimeError) as error:
+        print(f"Erro: {error}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())